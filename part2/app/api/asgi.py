@@ -0,0 +1,222 @@
+"""ASGI front end: the Flask app's routes, served by an event loop.
+
+A threaded WSGI server needs one thread per open connection, so idle
+keep-alive clients use up its threads. Under ASGI the connections wait
+on the event loop, and only the work is done in threads:
+
+- GET requests to the routes in app/api/v1/async_handlers.py run as
+  coroutines calling the AsyncFacade (no thread at all with the memory
+  and durable backends);
+- every other request (writes, batches, exports, Swagger, errors) is
+  passed to the Flask app in a thread pool, through a small WSGI bridge,
+  so it behaves exactly as under a WSGI server.
+
+Routing uses the Flask app's own URL map, so both see the same routes.
+"""
+import asyncio
+import io
+import sys
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_etags
+from werkzeug.routing import RequestRedirect
+
+from app.api.v1.async_handlers import HANDLERS
+
+# Chunks of a streamed WSGI response (exports) waiting to be sent; the
+# WSGI thread pauses while the queue is full
+STREAM_QUEUE_SIZE = 8
+
+INTERNAL_ERROR = b'{"message": "Internal Server Error"}'
+
+
+class Request:
+    """What the async handlers need to know about a request."""
+
+    __slots__ = ("path", "query_string", "args", "headers")
+
+    def __init__(self, scope):
+        self.path = scope["path"]
+        self.query_string = scope["query_string"].decode("latin-1")
+        pairs = parse_qsl(self.query_string, keep_blank_values=True)
+        self.args = dict(pairs)
+        if len(self.args) != len(pairs):
+            raise ValueError("repeated query argument")
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1")
+                        for k, v in scope["headers"]}
+
+    @property
+    def full_path(self):
+        """Path and query string, as flask.request.full_path."""
+        return f"{self.path}?{self.query_string}"
+
+    def not_modified(self, etag):
+        """True if If-None-Match already names this ETag."""
+        header = self.headers.get("if-none-match")
+        return bool(header) and parse_etags(header).contains_weak(
+            etag.strip('"'))
+
+
+class ASGIApp:
+    """ASGI application serving a Flask app (see the module docstring).
+
+    native=False sends every request through the Flask app, e.g. so
+    that its metrics hooks see all of them.
+    """
+
+    def __init__(self, wsgi_app, async_facade, native=True):
+        self.wsgi_app = wsgi_app
+        self.facade = async_facade
+        self.executor = async_facade.executor
+        self.urls = wsgi_app.url_map.bind("localhost")
+        self.native = native
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        if self.native and scope["method"] == "GET":
+            response = await self._native(scope)
+            if response is not None:
+                status, body, headers = response
+                await _respond(send, status, headers, body)
+                return
+        await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.facade.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _native(self, scope):
+        """Answer with an async handler, or None to use the Flask app."""
+        try:
+            endpoint, values = self.urls.match(scope["path"], "GET")
+        except (HTTPException, RequestRedirect):
+            return None
+        handler = HANDLERS.get(endpoint)
+        if handler is None:
+            return None
+        try:
+            return await handler(self.facade, Request(scope), **values)
+        except ValueError:
+            return None
+
+    # --- WSGI bridge --------------------------------------------------------
+
+    async def _wsgi(self, scope, receive, send):
+        """Run the Flask app in the thread pool and relay its response."""
+        body = []
+        more = True
+        while more:
+            message = await receive()
+            body.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        environ = _environ(scope, b"".join(body))
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        closed = False  # set when the client is gone: stop queueing
+
+        def put(item):
+            if not closed:
+                asyncio.run_coroutine_threadsafe(
+                    queue.put(item), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put(("start", int(status.split(" ", 1)[0]), headers))
+
+        def run():
+            try:
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    for chunk in result:
+                        if chunk:
+                            put(("body", chunk))
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            finally:
+                put(("end", None))
+
+        task = loop.run_in_executor(self.executor, run)
+        started = False
+        try:
+            while True:
+                kind, *data = await queue.get()
+                if kind == "start":
+                    status, headers = data
+                    await send({"type": "http.response.start",
+                                "status": status,
+                                "headers": [(k.encode("latin-1"),
+                                             v.encode("latin-1"))
+                                            for k, v in headers]})
+                    started = True
+                elif kind == "body":
+                    await send({"type": "http.response.body",
+                                "body": data[0], "more_body": True})
+                else:
+                    break
+        except BaseException:
+            closed = True
+            while not queue.empty():  # unblock the WSGI thread
+                queue.get_nowait()
+            raise
+        if not started:  # the Flask app raised before responding
+            await _respond(send, 500, {}, INTERNAL_ERROR)
+        else:
+            await send({"type": "http.response.body", "body": b""})
+        await task  # re-raises an exception from the Flask app
+
+
+async def _respond(send, status, headers, body):
+    headers = [(k.encode("latin-1"), v.encode("latin-1"))
+               for k, v in headers.items()]
+    if status != 304:
+        headers += [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status,
+                "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _environ(scope, body):
+    """WSGI environ of an ASGI http scope (PEP 3333)."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ[name] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = (f"{environ[key]},{value}" if key in environ
+                            else value)
+    return environ
@@ -0,0 +1,273 @@
+"""Opt-in request instrumentation, exported on GET /metrics.
+
+init_metrics(app, facade, config) is called by create_app() when
+config.METRICS_ENABLED is set; otherwise nothing here is installed and
+requests run exactly as before. When enabled it records:
+
+- a latency histogram and a request counter per endpoint (the URL rule,
+  e.g. /places/<string:place_id>, so ids do not create new series);
+- how many repository calls each request makes, per endpoint, to catch
+  N+1 lookups (a request above REPOSITORY_CALLS_WARN is also logged);
+- the place cache counters;
+- a cProfile dump of a random PROFILE_SAMPLE_RATE share of requests,
+  written to PROFILE_DIR (open them with `python -m pstats`).
+
+Everything is exposed in the Prometheus text format.
+"""
+import contextvars
+import cProfile
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, request
+
+# Upper bounds of the histogram buckets (a +Inf bucket is added)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0)
+REPOSITORY_CALL_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# _RequestState of the request being handled, or None
+_current = contextvars.ContextVar("hbnb_metrics_request", default=None)
+
+
+class _RequestState:
+    """What start_request() set up for one request."""
+
+    __slots__ = ("start", "calls", "profile", "token")
+
+    def __init__(self):
+        self.calls = {}  # repository method -> calls
+        self.profile = None
+        self.token = None
+        self.start = 0.0
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one: +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, count of values <= le)], ending with ("+Inf", count)."""
+        total, result = 0, []
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+
+class CountingRepository:
+    """Wraps a repository and counts the calls made through it.
+
+    Only calls from the facade are counted: the repository's calls to
+    its own methods do not go through the wrapper.
+    """
+
+    def __init__(self, repo, metrics):
+        self.wrapped = repo
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.wrapped, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        count = self._metrics.count_repository_call
+
+        def counted(*args, **kwargs):
+            count(name)
+            return attr(*args, **kwargs)
+        # Cached on the instance, so __getattr__ runs once per method
+        self.__dict__[name] = counted
+        return counted
+
+
+class Metrics:
+    """Everything recorded about requests, safe to share between threads."""
+
+    def __init__(self, place_cache=None, calls_warn=None, logger=None,
+                 profile_rate=0.0, profile_dir="profiles"):
+        self.place_cache = place_cache
+        self.calls_warn = calls_warn
+        self.logger = logger
+        self.profile_rate = profile_rate
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        self.latency = {}         # (method, endpoint) -> Histogram
+        self.repo_calls = {}      # (method, endpoint) -> Histogram
+        self.requests = {}        # (method, endpoint, status) -> count
+        self.repository = {}      # repository method -> count
+        self.profiles = 0
+        self._profile_seq = itertools.count(1)
+        # cProfile allows one active profiler per process
+        self._profiling = threading.Lock()
+
+    # --- recording ----------------------------------------------------------
+
+    @staticmethod
+    def count_repository_call(name):
+        """Tally one call for the current request (calls made outside a
+        request, e.g. by a CLI command, are not counted)."""
+        state = _current.get()
+        if state is not None:
+            calls = state.calls
+            calls[name] = calls.get(name, 0) + 1
+
+    def start_request(self):
+        """before_request hook."""
+        state = _RequestState()
+        state.token = _current.set(state)
+        if self.profile_rate and random.random() < self.profile_rate:
+            if self._profiling.acquire(blocking=False):
+                state.profile = cProfile.Profile()
+                state.profile.enable()
+        state.start = time.perf_counter()
+
+    def end_request(self, response):
+        """after_request hook: record the request, return the response."""
+        state = _current.get()
+        if state is None:  # before_request did not run
+            return response
+        elapsed = time.perf_counter() - state.start
+        self._finish(state)
+        calls = sum(state.calls.values())
+        rule = request.url_rule
+        key = (request.method, rule.rule if rule else "unmatched")
+        with self._lock:
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.repo_calls[key] = Histogram(REPOSITORY_CALL_BUCKETS)
+            self.latency[key].observe(elapsed)
+            self.repo_calls[key].observe(calls)
+            status_key = key + (response.status_code,)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+            for name, n in state.calls.items():
+                self.repository[name] = self.repository.get(name, 0) + n
+        if self.calls_warn is not None and calls > self.calls_warn:
+            self.logger.warning("%s %s made %d repository calls",
+                                request.method, request.full_path, calls)
+        if state.profile is not None:
+            self._save_profile(state.profile, key[1])
+        return response
+
+    def teardown(self, exc):
+        """teardown_request hook: undo start_request if end_request did
+        not run (an unhandled exception skips after_request hooks)."""
+        state = _current.get()
+        if state is not None:
+            self._finish(state)
+
+    def _finish(self, state):
+        """Stop tracking the request (and its profiler, if any)."""
+        _current.reset(state.token)
+        if state.profile is not None:
+            state.profile.disable()
+            self._profiling.release()
+
+    def _save_profile(self, profile, endpoint):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", endpoint).strip("_") or "root"
+        path = os.path.join(
+            self.profile_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{slug}-"
+            f"{os.getpid()}-{next(self._profile_seq)}.prof")
+        profile.dump_stats(path)
+        with self._lock:
+            self.profiles += 1
+
+    # --- export -------------------------------------------------------------
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            _histograms(lines, "hbnb_request_duration_seconds",
+                        "Request latency, by endpoint", self.latency)
+            _histograms(lines, "hbnb_request_repository_calls",
+                        "Repository calls per request, by endpoint",
+                        self.repo_calls)
+            _header(lines, "hbnb_requests_total", "counter",
+                    "Requests, by endpoint and status")
+            for (method, endpoint, status), n in sorted(
+                    self.requests.items()):
+                lines.append("hbnb_requests_total" + _labels(
+                    method=method, endpoint=endpoint, status=status)
+                    + f" {n}")
+            _header(lines, "hbnb_repository_calls_total", "counter",
+                    "Repository calls made by the facade, by method")
+            for name, n in sorted(self.repository.items()):
+                lines.append("hbnb_repository_calls_total"
+                             + _labels(method=name) + f" {n}")
+            _header(lines, "hbnb_profiles_total", "counter",
+                    "Requests saved as cProfile dumps")
+            lines.append(f"hbnb_profiles_total {self.profiles}")
+        if self.place_cache is not None:
+            stats = self.place_cache.stats()
+            for name in ("hits", "misses", "evictions", "expirations",
+                         "invalidations"):
+                metric = f"hbnb_place_cache_{name}_total"
+                _header(lines, metric, "counter", f"Place cache {name}")
+                lines.append(f"{metric} {stats[name]}")
+            _header(lines, "hbnb_place_cache_entries", "gauge",
+                    "Extended places currently cached")
+            lines.append(f"hbnb_place_cache_entries {stats['size']}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"')
+               .replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"'
+                          for k, v in zip(labels, escaped)) + "}"
+
+
+def _header(lines, name, kind, help_text):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _histograms(lines, name, help_text, histograms):
+    _header(lines, name, "histogram", help_text)
+    for (method, endpoint), hist in sorted(histograms.items()):
+        for bound, n in hist.cumulative():
+            lines.append(f"{name}_bucket" + _labels(
+                method=method, endpoint=endpoint, le=bound) + f" {n}")
+        labels = _labels(method=method, endpoint=endpoint)
+        lines.append(f"{name}_sum{labels} {hist.sum}")
+        lines.append(f"{name}_count{labels} {hist.count}")
+
+
+def init_metrics(app, facade, config):
+    """Install the hooks, wrap facade.repo and add GET /metrics."""
+    metrics = Metrics(
+        place_cache=facade.place_cache,
+        calls_warn=config.REPOSITORY_CALLS_WARN,
+        logger=app.logger,
+        profile_rate=config.PROFILE_SAMPLE_RATE,
+        profile_dir=config.PROFILE_DIR)
+    if isinstance(facade.repo, CountingRepository):  # a second create_app()
+        facade.repo = facade.repo.wrapped
+    facade.repo = CountingRepository(facade.repo, metrics)
+    app.before_request(metrics.start_request)
+    app.after_request(metrics.end_request)
+    app.teardown_request(metrics.teardown)
+    app.add_url_rule(
+        "/metrics", "metrics",
+        lambda: Response(metrics.render(), content_type=PROMETHEUS_TYPE))
+    app.extensions["hbnb_metrics"] = metrics
+    return metrics
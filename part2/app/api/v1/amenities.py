@@ -1,6 +1,10 @@
 """Amenity endpoints – /api/v1/amenities/"""
 from flask_restx import Namespace, Resource, fields
 from app.services.facade import facade
+from app.api.v1.common import (
+    NEXT_CURSOR_HEADER, batch_parser, collection_etag, create_batch,
+    json_body, make_etag, not_modified, page_headers, pagination_parser)
+from app.api.v1.serializers import serialize_with
 
 ns = Namespace("amenities", description="Amenity operations")
 
@@ -19,43 +23,71 @@ amenity_output_model = ns.model("AmenityOutput", {
 @ns.route("/")
 class AmenityList(Resource):
 
-    @ns.marshal_list_with(amenity_output_model)
+    @ns.expect(pagination_parser)
+    @ns.header(NEXT_CURSOR_HEADER, "Cursor of the next page, if any")
+    @serialize_with(ns, amenity_output_model, as_list=True)
     def get(self):
-        """List all amenities."""
-        return [a.to_dict() for a in facade.list_amenities()], 200
+        """List amenities, one page at a time."""
+        args = pagination_parser.parse_args()
+        etag = collection_etag(facade.collection_version("Amenity"))
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        try:
+            amenities, next_cursor = facade.list_amenities(
+                args["limit"], args["cursor"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return ([a.to_dict() for a in amenities], 200,
+                {"ETag": etag, **page_headers(next_cursor)})
 
-    @ns.expect(amenity_input_model, validate=True)
+    @ns.expect(amenity_input_model)
     @ns.response(201, "Created")
     @ns.response(400, "Bad Request")
     def post(self):
         """Create a new amenity."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             amenity = facade.create_amenity(data)
-        except (ValueError, KeyError) as e:
+        except ValueError as e:
             ns.abort(400, str(e))
         return amenity.to_dict(), 201
 
 
+@ns.route("/batch")
+class AmenityBatch(Resource):
+
+    @ns.expect(batch_parser, [amenity_input_model])
+    @ns.response(201, "Created; body: {ids, errors: []}")
+    @ns.response(207, "Some items failed (atomic=false)")
+    @ns.response(400, "Bad Request (atomic: nothing created)")
+    def post(self):
+        """Create many amenities from a JSON array or NDJSON lines."""
+        return create_batch(ns, facade.create_amenities)
+
+
 @ns.route("/<string:amenity_id>")
 class AmenityDetail(Resource):
 
-    @ns.marshal_with(amenity_output_model)
+    @serialize_with(ns, amenity_output_model)
+    @ns.response(304, "Not Modified")
     @ns.response(404, "Not Found")
     def get(self, amenity_id):
         """Get a single amenity."""
         amenity = facade.get_amenity(amenity_id)
         if amenity is None:
             ns.abort(404, "Amenity not found")
-        return amenity.to_dict(), 200
+        etag = make_etag(amenity.id, amenity.updated_at)
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        return amenity.to_dict(), 200, {"ETag": etag}
 
-    @ns.expect(amenity_input_model, validate=True)
+    @ns.expect(amenity_input_model)
     @ns.response(200, "Updated")
     @ns.response(400, "Bad Request")
     @ns.response(404, "Not Found")
     def put(self, amenity_id):
         """Update an amenity."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             amenity = facade.update_amenity(amenity_id, data)
         except ValueError as e:
@@ -0,0 +1,165 @@
+"""Async versions of the hot v1 GET routes, for the ASGI front end.
+
+Each handler takes the AsyncFacade, the request (app/api/asgi.py) and the
+URL values, and returns (status, body, headers) built from the same
+models, serializers and ETags as the Resource it mirrors. Returning None
+or raising ValueError hands the request to that Resource instead: ids
+that are not found, invalid query strings and every other error are
+answered by the Flask app, so they look the same under both servers.
+"""
+from app.api.v1.amenities import amenity_output_model
+from app.api.v1.common import MAX_PAGE_SIZE, PAGE_SIZE, make_etag, page_headers
+from app.api.v1.places import EXTENDED_FROM, _projection, place_output_model
+from app.api.v1.reviews import review_output_model
+from app.api.v1.serializers import dumps, serializer
+from app.api.v1.users import user_output_model
+
+
+def _limit(args):
+    """?limit=, checked like pagination_parser does."""
+    if "limit" not in args:
+        return PAGE_SIZE
+    limit = int(args["limit"])
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError("limit out of range")
+    return limit
+
+
+def _optional(args, name, convert):
+    value = args.get(name)
+    return None if value is None else convert(value)
+
+
+def _natural(value):
+    number = int(value)
+    if number < 0:
+        raise ValueError("not a natural number")
+    return number
+
+
+def _ok(body, etag, headers=None):
+    return 200, dumps(body), {"ETag": etag, **(headers or {})}
+
+
+def _not_modified(etag):
+    return 304, b"", {"ETag": etag}
+
+
+# ------------------------------------------------------------------
+# Collections
+# ------------------------------------------------------------------
+async def list_users(facade, request):
+    args = request.args
+    limit, cursor = _limit(args), args.get("cursor")
+    etag = make_etag(await facade.collection_version("User"),
+                     request.full_path)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    serialize = serializer(user_output_model)
+    if args.get("email") is not None:
+        user = await facade.get_user_by_email(args["email"])
+        return _ok([serialize(user.to_dict())] if user else [], etag)
+    users, next_cursor = await facade.list_users(limit, cursor)
+    return _ok([serialize(u.to_dict()) for u in users], etag,
+               page_headers(next_cursor))
+
+
+async def list_amenities(facade, request):
+    args = request.args
+    limit, cursor = _limit(args), args.get("cursor")
+    etag = make_etag(await facade.collection_version("Amenity"),
+                     request.full_path)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    amenities, next_cursor = await facade.list_amenities(limit, cursor)
+    serialize = serializer(amenity_output_model)
+    return _ok([serialize(a.to_dict()) for a in amenities], etag,
+               page_headers(next_cursor))
+
+
+async def list_places(facade, request):
+    args = request.args
+    keys, embed = _projection(args.get("fields"), args.get("embed"))
+    limit, cursor = _limit(args), args.get("cursor")
+    min_price = _optional(args, "min_price", float)
+    max_price = _optional(args, "max_price", float)
+    amenity_ids = _optional(args, "amenity_ids", lambda v: v.split(","))
+    reviews_limit = _optional(args, "reviews_limit", _natural)
+    sort = args.get("sort")
+    if sort not in (None, "rating"):
+        raise ValueError("unknown sort")
+    etag = make_etag(await facade.collection_version(*EXTENDED_FROM),
+                     request.full_path)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    places, next_cursor = await facade.list_places(
+        limit, cursor, min_price=min_price, max_price=max_price,
+        amenity_ids=amenity_ids, sort=sort, embed=embed,
+        reviews_limit=reviews_limit)
+    serialize = serializer(place_output_model, keys)
+    return _ok([serialize(p) for p in places], etag,
+               page_headers(next_cursor))
+
+
+# ------------------------------------------------------------------
+# Items
+# ------------------------------------------------------------------
+async def get_user(facade, request, user_id):
+    user = await facade.get_user(user_id)
+    if user is None:
+        return None
+    etag = make_etag(user.id, user.updated_at)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    return _ok(serializer(user_output_model)(user.to_dict()), etag)
+
+
+async def get_amenity(facade, request, amenity_id):
+    amenity = await facade.get_amenity(amenity_id)
+    if amenity is None:
+        return None
+    etag = make_etag(amenity.id, amenity.updated_at)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    return _ok(serializer(amenity_output_model)(amenity.to_dict()), etag)
+
+
+async def get_place(facade, request, place_id):
+    args = request.args
+    keys, embed = _projection(args.get("fields"), args.get("embed"))
+    reviews_limit = _optional(args, "reviews_limit", _natural)
+    version = await facade.place_version(place_id)
+    if version is None:
+        return None
+    parts = (place_id, version)
+    if request.query_string:  # a projection is another representation
+        parts += (request.query_string,)
+    etag = make_etag(*parts)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    place = await facade.get_place(place_id, embed, reviews_limit)
+    if place is None:
+        return None
+    return _ok(serializer(place_output_model, keys)(place), etag)
+
+
+async def get_review(facade, request, review_id):
+    review = await facade.get_review(review_id)
+    if review is None:
+        return None
+    etag = make_etag(review.id, review.updated_at)
+    if request.not_modified(etag):
+        return _not_modified(etag)
+    return _ok(serializer(review_output_model)(review.to_dict()), etag)
+
+
+# Flask endpoint -> handler, for GET requests
+HANDLERS = {
+    "users_user_list": list_users,
+    "users_user_detail": get_user,
+    "amenities_amenity_list": list_amenities,
+    "amenities_amenity_detail": get_amenity,
+    "places_place_list": list_places,
+    "places_place_detail": get_place,
+    "reviews_review_detail": get_review,
+}
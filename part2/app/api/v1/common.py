@@ -0,0 +1,164 @@
+"""Helpers shared by every v1 namespace."""
+import hashlib
+import io
+import json
+
+from flask import Response, request, stream_with_context
+from flask_restx import inputs, reqparse
+
+from app.api.v1.serializers import dumps, serializer
+from config import get_config
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_config = get_config()
+PAGE_SIZE = _config.PAGE_SIZE
+MAX_PAGE_SIZE = _config.MAX_PAGE_SIZE
+MAX_BATCH_SIZE = _config.MAX_BATCH_SIZE
+
+# ?limit=&cursor= accepted by every collection endpoint
+pagination_parser = reqparse.RequestParser()
+pagination_parser.add_argument(
+    "limit", type=inputs.int_range(1, MAX_PAGE_SIZE),
+    default=PAGE_SIZE, location="args",
+    help=f"Page size (1-{MAX_PAGE_SIZE})")
+pagination_parser.add_argument(
+    "cursor", type=str, location="args",
+    help=f"Value of the {NEXT_CURSOR_HEADER} header of the previous page")
+
+
+def page_headers(next_cursor):
+    """Response headers pointing to the next page (none on the last page)."""
+    return {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+
+# --- conditional GET ---------------------------------------------------------
+# Handlers compute an ETag from cheap version data (updated_at, bucket
+# versions) and return `None, 304, {"ETag": tag}` when the client already
+# has that version, before any serialisation work.
+
+def make_etag(*parts):
+    """Strong ETag (quoted) for the given version parts."""
+    raw = "\x1f".join(str(p) for p in parts).encode()
+    return '"%s"' % hashlib.sha1(raw).hexdigest()
+
+
+def collection_etag(version):
+    """ETag of a listing: its version plus the URL (page, filters)."""
+    return make_etag(version, request.full_path)
+
+
+def not_modified(etag):
+    """True if the request's If-None-Match already names this ETag."""
+    return request.if_none_match.contains_weak(etag.strip('"'))
+
+
+# --- request bodies ----------------------------------------------------------
+# Input models are only documentation (@ns.expect without validate=True):
+# the fields are checked once, by the models' compiled schemas (see
+# app/models/schema.py), which raise ValueError for the handlers' 400.
+
+def json_body(ns):
+    """The request's JSON object, or abort 400 if the body is not one."""
+    data = ns.payload
+    if not isinstance(data, dict):
+        ns.abort(400, "body must be a JSON object")
+    return data
+
+
+# --- bulk creation -----------------------------------------------------------
+# POST /<resource>/batch takes a JSON array, or one JSON object per line
+# (Content-Type: application/x-ndjson). The facade builds every item (the
+# models' compiled schemas check the fields) and creates the whole batch
+# with bulk foreign-key lookups.
+
+batch_parser = reqparse.RequestParser()
+batch_parser.add_argument(
+    "atomic", type=inputs.boolean, default=True, location="args",
+    help="true: create every item or none; false: create the valid ones")
+
+
+def read_batch():
+    """Items of a batch request body: a JSON array or NDJSON lines."""
+    if request.mimetype == "application/x-ndjson":
+        items = []
+        # Buffered: the raw stream would be read one byte at a time
+        lines = io.BufferedReader(request.stream, 1 << 16)
+        for n, line in enumerate(lines, 1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    raise ValueError(f"line {n} is not valid JSON")
+        return items
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError("body must be a JSON array of objects")
+    return items
+
+
+def create_batch(ns, create):
+    """Handle POST /<resource>/batch.
+
+    `create(items, atomic)` is the facade's bulk method. Answers 201
+    with the new ids (in request order), 400 with the errors when atomic
+    and anything is invalid, or 207 with ids (null where an item failed)
+    and errors otherwise.
+    """
+    atomic = batch_parser.parse_args()["atomic"]
+    try:
+        items = read_batch()
+    except ValueError as e:
+        ns.abort(400, str(e))
+    if len(items) > MAX_BATCH_SIZE:
+        ns.abort(400, f"a batch holds at most {MAX_BATCH_SIZE} items")
+
+    errors = {}
+    valid = []  # indexes of the items that are JSON objects
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            valid.append(i)
+        else:
+            errors[i] = "item must be a JSON object"
+    if errors and atomic:
+        created, failed = [], []
+    else:
+        created, failed = create([items[i] for i in valid], atomic=atomic)
+    for j, message in failed:
+        errors[valid[j]] = message
+
+    error_list = [{"index": i, "message": m}
+                  for i, m in sorted(errors.items())]
+    if errors and atomic:
+        ns.abort(400, "batch rejected, nothing was created",
+                 errors=error_list)
+    ids = [None] * len(items)
+    for i, obj in zip(valid, created):
+        ids[i] = obj.id if obj is not None else None
+    return {"ids": ids, "errors": error_list}, 207 if errors else 201
+
+
+# --- NDJSON export -----------------------------------------------------------
+# GET /<resource>/export streams one JSON object per line from a generator:
+# the response has no Content-Length (chunked transfer encoding) and only
+# EXPORT_CHUNK lines are held in memory at any time.
+
+EXPORT_CHUNK = 100
+
+
+def ndjson_response(items, model):
+    """Stream dicts as NDJSON, each serialized with `model`."""
+    serialize = serializer(model)
+
+    def generate():
+        lines = []
+        for item in items:
+            lines.append(dumps(serialize(item)))
+            if len(lines) == EXPORT_CHUNK:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+    return Response(stream_with_context(generate()),
+                    mimetype="application/x-ndjson")
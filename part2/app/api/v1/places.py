@@ -1,9 +1,20 @@
 """Place endpoints – /api/v1/places/"""
-from flask_restx import Namespace, Resource, fields
-from app.services.facade import facade
+from flask import request
+from flask_restx import Namespace, Resource, fields, inputs, reqparse
+from app.models.timestamps import from_iso
+from app.services.facade import PLACE_EMBEDS, facade
+from app.api.v1.common import (
+    MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, PAGE_SIZE, batch_parser,
+    collection_etag, create_batch, json_body, make_etag, ndjson_response,
+    not_modified, page_headers, pagination_parser)
+from app.api.v1.serializers import serialize_with
 
 ns = Namespace("places", description="Place operations")
 
+# Extended places show data from all of these, so listings of them
+# change whenever any of these buckets does
+EXTENDED_FROM = ("Place", "User", "Amenity", "Review")
+
 # ------------------------------------------------------------------
 # Models
 # ------------------------------------------------------------------
@@ -44,21 +55,125 @@ review_brief = ns.model("ReviewBrief", {
 })
 
 place_output_model = ns.model("PlaceOutput", {
-    "id":          fields.String,
-    "title":       fields.String,
-    "description": fields.String,
-    "price":       fields.Float,
-    "latitude":    fields.Float,
-    "longitude":   fields.Float,
-    "owner_id":    fields.String,
-    "amenity_ids": fields.List(fields.String),
-    "owner":       fields.Nested(owner_brief, allow_null=True),
-    "amenities":   fields.List(fields.Nested(amenity_brief)),
-    "reviews":     fields.List(fields.Nested(review_brief)),
-    "created_at":  fields.String,
-    "updated_at":  fields.String,
+    "id":             fields.String,
+    "title":          fields.String,
+    "description":    fields.String,
+    "price":          fields.Float,
+    "latitude":       fields.Float,
+    "longitude":      fields.Float,
+    "owner_id":       fields.String,
+    "amenity_ids":    fields.List(fields.String),
+    "owner":          fields.Nested(owner_brief, allow_null=True),
+    "amenities":      fields.List(fields.Nested(amenity_brief)),
+    "reviews":        fields.List(fields.Nested(review_brief)),
+    "review_count":   fields.Integer,
+    "average_rating": fields.Float,
+    "created_at":     fields.String,
+    "updated_at":     fields.String,
 })
 
+# ?fields=id,title,... &embed=owner,... &reviews_limit=N on place GETs
+projection_parser = reqparse.RequestParser()
+projection_parser.add_argument(
+    "fields", type=str, location="args",
+    help="Comma-separated fields to return (default: all)")
+projection_parser.add_argument(
+    "embed", type=str, location="args",
+    help="Comma-separated owner, amenities, reviews to embed "
+         "(default: all of them, or those listed in fields)")
+projection_parser.add_argument(
+    "reviews_limit", type=inputs.natural, location="args",
+    help="Embed at most this many reviews per place")
+
+place_filter_parser = pagination_parser.copy()
+for _arg in projection_parser.args:
+    place_filter_parser.add_argument(_arg)
+place_filter_parser.add_argument("min_price", type=float, location="args")
+place_filter_parser.add_argument("max_price", type=float, location="args")
+place_filter_parser.add_argument(
+    "amenity_ids", type=str, location="args",
+    help="Comma-separated amenity ids; places must offer all of them")
+place_filter_parser.add_argument(
+    "sort", type=str, choices=("rating",), location="args",
+    help="rating: best rated first (default: oldest first)")
+
+# ?since= on a place's reviews
+place_reviews_parser = pagination_parser.copy()
+place_reviews_parser.add_argument(
+    "since", type=from_iso, location="args",
+    help="ISO-8601 time (UTC if no offset): only reviews created then "
+         "or later")
+
+place_search_model = ns.inherit("PlaceSearchResult", place_output_model, {
+    "distance_km": fields.Float,
+})
+
+search_parser = reqparse.RequestParser()
+search_parser.add_argument("lat", type=float, location="args")
+search_parser.add_argument("lon", type=float, location="args")
+search_parser.add_argument("radius_km", type=float, location="args")
+search_parser.add_argument(
+    "bbox", type=str, location="args",
+    help="min_lon,min_lat,max_lon,max_lat (instead of lat/lon/radius_km)")
+search_parser.add_argument(
+    "limit", type=inputs.int_range(1, MAX_PAGE_SIZE), default=PAGE_SIZE,
+    location="args")
+
+
+def _split(value):
+    """"a, b,,c" -> ["a", "b", "c"]."""
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _projection(fields_arg, embed_arg):
+    """Parse ?fields= and ?embed=: (keys to output or None, embed).
+
+    Only the relations in embed are looked up. When embed is not given
+    it is every relation, or only those listed in fields if fields is.
+    Embedded relations are always output.
+    """
+    keys = _split(fields_arg) if fields_arg is not None else None
+    if keys is not None:
+        unknown = sorted(set(keys) - set(place_output_model))
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    if embed_arg is None:
+        embed = PLACE_EMBEDS if keys is None else tuple(
+            r for r in PLACE_EMBEDS if r in keys)
+    else:
+        embed = tuple(_split(embed_arg))
+        unknown = sorted(set(embed) - set(PLACE_EMBEDS))
+        if unknown:
+            raise ValueError(f"embed must be among {', '.join(PLACE_EMBEDS)}")
+        if keys is not None:
+            missing = sorted(set(keys) & set(PLACE_EMBEDS) - set(embed))
+            if missing:
+                raise ValueError(f"fields {', '.join(missing)} "
+                                 "need to be embedded")
+    if keys is None and len(set(embed)) == len(PLACE_EMBEDS):
+        return None, PLACE_EMBEDS
+    # In model order, so equal projections share one compiled serializer
+    return tuple(k for k in place_output_model
+                 if (k in keys if keys is not None else k not in PLACE_EMBEDS)
+                 or k in embed), embed
+
+
+def _fields_mask():
+    """Fields to output for the current request (serialize_with mask)."""
+    return _projection(request.args.get("fields"),
+                       request.args.get("embed"))[0]
+
+
+def _parse_bbox(value):
+    """Parse "min_lon,min_lat,max_lon,max_lat" into a tuple of floats."""
+    try:
+        parts = tuple(float(v) for v in value.split(","))
+    except ValueError:
+        parts = ()
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    return parts
+
 
 # ------------------------------------------------------------------
 # Collection
@@ -66,46 +181,137 @@ place_output_model = ns.model("PlaceOutput", {
 @ns.route("/")
 class PlaceList(Resource):
 
-    @ns.marshal_list_with(place_output_model)
+    @ns.expect(place_filter_parser)
+    @ns.header(NEXT_CURSOR_HEADER, "Cursor of the next page, if any")
+    @serialize_with(ns, place_output_model, as_list=True, mask=_fields_mask)
     def get(self):
-        """List all places (extended)."""
-        return facade.list_places(), 200
+        """List places (extended), one page at a time, optionally filtered."""
+        args = place_filter_parser.parse_args()
+        try:
+            _, embed = _projection(args["fields"], args["embed"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        # Empty elements (?amenity_ids= or a stray comma) filter nothing
+        amenity_ids = (_split(args["amenity_ids"])
+                       if args["amenity_ids"] is not None else None)
+        etag = collection_etag(facade.collection_version(*EXTENDED_FROM))
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        try:
+            places, next_cursor = facade.list_places(
+                args["limit"], args["cursor"],
+                min_price=args["min_price"], max_price=args["max_price"],
+                amenity_ids=amenity_ids, sort=args["sort"],
+                embed=embed, reviews_limit=args["reviews_limit"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return places, 200, {"ETag": etag, **page_headers(next_cursor)}
 
-    @ns.expect(place_input_model, validate=True)
+    @ns.expect(place_input_model)
     @ns.response(201, "Created")
     @ns.response(400, "Bad Request")
     def post(self):
         """Create a new place."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             place = facade.create_place(data)
-        except (ValueError, KeyError) as e:
+        except ValueError as e:
             ns.abort(400, str(e))
         return facade._extend_place(place), 201
 
 
+# ------------------------------------------------------------------
+# Bulk: /api/v1/places/batch
+# ------------------------------------------------------------------
+@ns.route("/batch")
+class PlaceBatch(Resource):
+
+    @ns.expect(batch_parser, [place_input_model])
+    @ns.response(201, "Created; body: {ids, errors: []}")
+    @ns.response(207, "Some items failed (atomic=false)")
+    @ns.response(400, "Bad Request (atomic: nothing created)")
+    def post(self):
+        """Create many places from a JSON array or NDJSON lines."""
+        return create_batch(ns, facade.create_places)
+
+
+# ------------------------------------------------------------------
+# Export: /api/v1/places/export
+# ------------------------------------------------------------------
+@ns.route("/export")
+class PlaceExport(Resource):
+
+    @ns.produces(["application/x-ndjson"])
+    @ns.response(200, "One place per line (NDJSON)")
+    def get(self):
+        """Stream all places (extended) as NDJSON, oldest first."""
+        return ndjson_response(facade.export_places(), place_output_model)
+
+
+# ------------------------------------------------------------------
+# Search: /api/v1/places/search?lat=&lon=&radius_km=  or  ?bbox=
+# ------------------------------------------------------------------
+@ns.route("/search")
+class PlaceSearch(Resource):
+
+    @ns.expect(search_parser)
+    @serialize_with(ns, place_search_model, as_list=True)
+    @ns.response(400, "Bad Request")
+    def get(self):
+        """Find places around a point or inside a box, nearest first."""
+        args = search_parser.parse_args()
+        etag = collection_etag(facade.collection_version(*EXTENDED_FROM))
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        try:
+            bbox = _parse_bbox(args["bbox"]) if args["bbox"] else None
+            places = facade.search_places(
+                args["limit"], lat=args["lat"], lon=args["lon"],
+                radius_km=args["radius_km"], bbox=bbox)
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return places, 200, {"ETag": etag}
+
+
 # ------------------------------------------------------------------
 # Item
 # ------------------------------------------------------------------
 @ns.route("/<string:place_id>")
 class PlaceDetail(Resource):
 
-    @ns.marshal_with(place_output_model)
+    @ns.expect(projection_parser)
+    @serialize_with(ns, place_output_model, mask=_fields_mask)
+    @ns.response(304, "Not Modified")
+    @ns.response(400, "Bad Request")
     @ns.response(404, "Not Found")
     def get(self, place_id):
         """Get a single place (extended)."""
-        place = facade.get_place(place_id)
+        args = projection_parser.parse_args()
+        try:
+            _, embed = _projection(args["fields"], args["embed"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        version = facade.place_version(place_id)
+        if version is None:
+            ns.abort(404, "Place not found")
+        parts = (place_id, version)
+        if request.query_string:  # a projection is another representation
+            parts += (request.query_string.decode(),)
+        etag = make_etag(*parts)
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        place = facade.get_place(place_id, embed, args["reviews_limit"])
         if place is None:
             ns.abort(404, "Place not found")
-        return place, 200
+        return place, 200, {"ETag": etag}
 
-    @ns.expect(place_update_model, validate=True)
+    @ns.expect(place_update_model)
     @ns.response(200, "Updated")
     @ns.response(400, "Bad Request")
     @ns.response(404, "Not Found")
     def put(self, place_id):
         """Update a place."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             place = facade.update_place(place_id, data)
         except ValueError as e:
@@ -121,9 +327,20 @@ class PlaceDetail(Resource):
 @ns.route("/<string:place_id>/reviews")
 class PlaceReviews(Resource):
 
+    @ns.expect(place_reviews_parser)
+    @ns.header(NEXT_CURSOR_HEADER, "Cursor of the next page, if any")
     def get(self, place_id):
-        """List all reviews for a place."""
+        """List the reviews of a place, one page at a time."""
         if not facade.repo.exists("Place", place_id):
             ns.abort(404, "Place not found")
-        reviews = facade.list_reviews_for_place(place_id)
-        return [r.to_dict() for r in reviews], 200
+        args = place_reviews_parser.parse_args()
+        etag = collection_etag(facade.collection_version("Review"))
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        try:
+            reviews, next_cursor = facade.list_reviews_for_place(
+                place_id, args["limit"], args["cursor"], args["since"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return ([r.to_dict() for r in reviews], 200,
+                {"ETag": etag, **page_headers(next_cursor)})
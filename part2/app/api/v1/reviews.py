@@ -1,6 +1,10 @@
 """Review endpoints – /api/v1/reviews/"""
 from flask_restx import Namespace, Resource, fields
 from app.services.facade import facade
+from app.api.v1.common import (
+    batch_parser, create_batch, json_body, make_etag, ndjson_response,
+    not_modified)
+from app.api.v1.serializers import serialize_with
 
 ns = Namespace("reviews", description="Review operations")
 
@@ -33,41 +37,74 @@ review_output_model = ns.model("ReviewOutput", {
 @ns.route("/")
 class ReviewList(Resource):
 
-    @ns.expect(review_input_model, validate=True)
+    @ns.expect(review_input_model)
     @ns.response(201, "Created")
     @ns.response(400, "Bad Request")
     def post(self):
         """Create a new review."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             review = facade.create_review(data)
-        except (ValueError, KeyError) as e:
+        except ValueError as e:
             ns.abort(400, str(e))
         return review.to_dict(), 201
 
 
+# ------------------------------------------------------------------
+# Bulk: /api/v1/reviews/batch
+# ------------------------------------------------------------------
+@ns.route("/batch")
+class ReviewBatch(Resource):
+
+    @ns.expect(batch_parser, [review_input_model])
+    @ns.response(201, "Created; body: {ids, errors: []}")
+    @ns.response(207, "Some items failed (atomic=false)")
+    @ns.response(400, "Bad Request (atomic: nothing created)")
+    def post(self):
+        """Create many reviews from a JSON array or NDJSON lines."""
+        return create_batch(ns, facade.create_reviews)
+
+
+# ------------------------------------------------------------------
+# Export: /api/v1/reviews/export
+# ------------------------------------------------------------------
+@ns.route("/export")
+class ReviewExport(Resource):
+
+    @ns.produces(["application/x-ndjson"])
+    @ns.response(200, "One review per line (NDJSON)")
+    def get(self):
+        """Stream all reviews as NDJSON, oldest first."""
+        rows = (r.to_dict() for r in facade.export_reviews())
+        return ndjson_response(rows, review_output_model)
+
+
 # ------------------------------------------------------------------
 # Item: /api/v1/reviews/<id>
 # ------------------------------------------------------------------
 @ns.route("/<string:review_id>")
 class ReviewDetail(Resource):
 
-    @ns.marshal_with(review_output_model)
+    @serialize_with(ns, review_output_model)
+    @ns.response(304, "Not Modified")
     @ns.response(404, "Not Found")
     def get(self, review_id):
         """Get a single review."""
         review = facade.get_review(review_id)
         if review is None:
             ns.abort(404, "Review not found")
-        return review.to_dict(), 200
+        etag = make_etag(review.id, review.updated_at)
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        return review.to_dict(), 200, {"ETag": etag}
 
-    @ns.expect(review_update_model, validate=True)
+    @ns.expect(review_update_model)
     @ns.response(200, "Updated")
     @ns.response(400, "Bad Request")
     @ns.response(404, "Not Found")
     def put(self, review_id):
         """Update a review."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             review = facade.update_review(review_id, data)
         except ValueError as e:
@@ -0,0 +1,173 @@
+"""Precompiled serializers for the hot GET routes.
+
+marshal_with() walks an ns.model's field definitions for every object it
+outputs. compile_model() walks them once and generates a plain function
+that builds the same dict, so the models stay the single source of truth
+(Swagger docs included) without paying the walk per request.
+
+Responses are encoded with orjson when it is installed (pip install
+orjson), else with the standard json module.
+"""
+import functools
+import json
+
+from flask import Response
+from flask_restx import fields
+from flask_restx.inputs import boolean
+from flask_restx.utils import unpack
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Projections (keys=) are chosen by clients (?fields=), so only the most
+# recently used ones stay compiled; full serializers are few and all kept
+PROJECTION_CACHE_SIZE = 64
+
+_serializers = {}  # model name -> compiled function of every field
+_models = {}  # model name -> model, for _projection()
+
+
+def _scalar(field, fast_type, convert):
+    """Converter of one scalar field: None gives the field's default."""
+    default = field.format(field.default) if field.default else field.default
+
+    def convert_value(value):
+        if value is None:
+            return default
+        return value if type(value) is fast_type else convert(value)
+    return convert_value
+
+
+def _converter(field):
+    """Function turning one raw value into what `field` would output."""
+    if isinstance(field, fields.Nested):
+        nested = serializer(field.nested)
+        allow_null, default = field.allow_null, field.default
+
+        def convert_nested(value):
+            if value is None:
+                if allow_null:
+                    return None
+                if default is not None:
+                    return default
+                value = {}
+            return nested(value)
+        return convert_nested
+    if isinstance(field, fields.List):
+        item = _converter(field.container)
+        default = field.default
+
+        def convert_list(value):
+            if value is None:
+                return default
+            return [item(v) for v in value]
+        return convert_list
+    if isinstance(field, fields.String):
+        return _scalar(field, str, str)
+    if isinstance(field, fields.Integer):
+        return _scalar(field, int, int)
+    if isinstance(field, fields.Float):
+        return _scalar(field, float, float)
+    if isinstance(field, fields.Boolean):
+        return _scalar(field, bool, boolean)
+    if type(field) is fields.Raw:
+        return _scalar(field, object, lambda v: v)
+    return _scalar(field, type(None), field.format)
+
+
+def compile_model(model, keys=None):
+    """Generate a function dict -> dict with the output of marshal(d, model).
+
+    Only plain dicts are supported as input (what to_dict() and the
+    facade's extended documents are); nested models are compiled too.
+    keys, if given, restricts the output to those fields of the model.
+    """
+    env = {}
+    items = []
+    model_fields = getattr(model, "resolved", model)
+    if keys is not None:
+        unknown = set(keys) - set(model_fields)
+        if unknown:
+            raise ValueError(f"{model.name}: unknown fields {sorted(unknown)}")
+        model_fields = {k: f for k, f in model_fields.items() if k in keys}
+    for i, (name, field) in enumerate(model_fields.items()):
+        if isinstance(field, type):  # models may list a class: fields.String
+            field = field()
+        key = field.attribute or name
+        if not isinstance(key, str) or "." in key:
+            raise ValueError(f"{model.name}.{name}: unsupported attribute")
+        env[f"_f{i}"] = _converter(field)
+        items.append(f"{name!r}: _f{i}(get({key!r}))")
+    source = ("def serialize(data):\n"
+              "    get = data.get\n"
+              f"    return {{{', '.join(items)}}}\n")
+    exec(source, env)
+    return env["serialize"]
+
+
+@functools.lru_cache(maxsize=PROJECTION_CACHE_SIZE)
+def _projection(model_name, keys):
+    return compile_model(_models[model_name], keys)
+
+
+def serializer(model, keys=None):
+    """Compiled serializer of `model` (built on first use, then cached).
+
+    keys: tuple of fields to output instead of all of them. Only the
+    PROJECTION_CACHE_SIZE most recently used projections stay cached.
+    """
+    if keys is not None:
+        _models.setdefault(model.name, model)
+        return _projection(model.name, keys)
+    serialize = _serializers.get(model.name)
+    if serialize is None:
+        serialize = compile_model(model)
+        _serializers[model.name] = serialize
+    return serialize
+
+
+def dumps(data):
+    """Encode data as JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def json_response(data, status=200, headers=None):
+    return Response(dumps(data), status, headers, mimetype="application/json")
+
+
+def serialize_with(ns, model, as_list=False, description="Success",
+                   mask=None):
+    """Use instead of ns.marshal_with / ns.marshal_list_with.
+
+    The handler returns the same (data, status, headers) as before; data
+    is serialized with the compiled model and encoded by dumps(). A None
+    body (a 304) is passed through untouched. Swagger still documents
+    `model` as the 200 response.
+
+    mask, like flask-restx's X-Fields mask, is an optional function
+    called after the handler; it returns the tuple of fields to output
+    for the current request, or None for all of them.
+    """
+    full = serializer(model)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            data, status, headers = unpack(result)
+            if data is None:
+                return result
+            keys = mask() if mask is not None else None
+            serialize = full if keys is None else serializer(model, keys)
+            if as_list:
+                body = [serialize(d) for d in data]
+            else:
+                body = serialize(data)
+            return json_response(body, status, headers)
+        return ns.response(200, description,
+                           [model] if as_list else model)(wrapper)
+    return decorator
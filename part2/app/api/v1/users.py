@@ -1,6 +1,11 @@
 """User endpoints – /api/v1/users/"""
 from flask_restx import Namespace, Resource, fields
 from app.services.facade import facade
+from app.api.v1.common import (
+    NEXT_CURSOR_HEADER, batch_parser, collection_etag, create_batch,
+    json_body, make_etag, ndjson_response, not_modified, page_headers,
+    pagination_parser)
+from app.api.v1.serializers import serialize_with
 
 ns = Namespace("users", description="User operations")
 
@@ -22,14 +27,21 @@ user_update_model = ns.model("UserUpdate", {
 })
 
 user_output_model = ns.model("UserOutput", {
-    "id":         fields.String,
-    "first_name": fields.String,
-    "last_name":  fields.String,
-    "email":      fields.String,
-    "created_at": fields.String,
-    "updated_at": fields.String,
+    "id":             fields.String,
+    "first_name":     fields.String,
+    "last_name":      fields.String,
+    "email":          fields.String,
+    "review_count":   fields.Integer,
+    "average_rating": fields.Float,
+    "created_at":     fields.String,
+    "updated_at":     fields.String,
 })
 
+user_filter_parser = pagination_parser.copy()
+user_filter_parser.add_argument(
+    "email", type=str, location="args",
+    help="Only the user with this email (case-insensitive)")
+
 
 # ------------------------------------------------------------------
 # Collection: /api/v1/users/
@@ -37,46 +49,94 @@ user_output_model = ns.model("UserOutput", {
 @ns.route("/")
 class UserList(Resource):
 
-    @ns.marshal_list_with(user_output_model)
+    @ns.expect(user_filter_parser)
+    @ns.header(NEXT_CURSOR_HEADER, "Cursor of the next page, if any")
+    @serialize_with(ns, user_output_model, as_list=True)
     def get(self):
-        """List all users."""
-        return [u.to_dict() for u in facade.list_users()], 200
+        """List users, one page at a time, or look one up by email."""
+        args = user_filter_parser.parse_args()
+        etag = collection_etag(facade.collection_version("User"))
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        if args["email"] is not None:
+            user = facade.get_user_by_email(args["email"])
+            return ([user.to_dict()] if user else []), 200, {"ETag": etag}
+        try:
+            users, next_cursor = facade.list_users(
+                args["limit"], args["cursor"])
+        except ValueError as e:
+            ns.abort(400, str(e))
+        return ([u.to_dict() for u in users], 200,
+                {"ETag": etag, **page_headers(next_cursor)})
 
-    @ns.expect(user_input_model, validate=True)
+    @ns.expect(user_input_model)
     @ns.response(201, "Created")
     @ns.response(400, "Bad Request")
     def post(self):
         """Create a new user."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             user = facade.create_user(data)
-        except (ValueError, KeyError) as e:
+        except ValueError as e:
             ns.abort(400, str(e))
         return user.to_dict(), 201
 
 
+# ------------------------------------------------------------------
+# Bulk: /api/v1/users/batch
+# ------------------------------------------------------------------
+@ns.route("/batch")
+class UserBatch(Resource):
+
+    @ns.expect(batch_parser, [user_input_model])
+    @ns.response(201, "Created; body: {ids, errors: []}")
+    @ns.response(207, "Some items failed (atomic=false)")
+    @ns.response(400, "Bad Request (atomic: nothing created)")
+    def post(self):
+        """Create many users from a JSON array or NDJSON lines."""
+        return create_batch(ns, facade.create_users)
+
+
+# ------------------------------------------------------------------
+# Export: /api/v1/users/export
+# ------------------------------------------------------------------
+@ns.route("/export")
+class UserExport(Resource):
+
+    @ns.produces(["application/x-ndjson"])
+    @ns.response(200, "One user per line (NDJSON)")
+    def get(self):
+        """Stream all users as NDJSON, oldest first."""
+        rows = (u.to_dict() for u in facade.export_users())
+        return ndjson_response(rows, user_output_model)
+
+
 # ------------------------------------------------------------------
 # Item: /api/v1/users/<id>
 # ------------------------------------------------------------------
 @ns.route("/<string:user_id>")
 class UserDetail(Resource):
 
-    @ns.marshal_with(user_output_model)
+    @serialize_with(ns, user_output_model)
+    @ns.response(304, "Not Modified")
     @ns.response(404, "Not Found")
     def get(self, user_id):
         """Get a single user."""
         user = facade.get_user(user_id)
         if user is None:
             ns.abort(404, "User not found")
-        return user.to_dict(), 200
+        etag = make_etag(user.id, user.updated_at)
+        if not_modified(etag):
+            return None, 304, {"ETag": etag}
+        return user.to_dict(), 200, {"ETag": etag}
 
-    @ns.expect(user_update_model, validate=True)
+    @ns.expect(user_update_model)
     @ns.response(200, "Updated")
     @ns.response(400, "Bad Request")
     @ns.response(404, "Not Found")
     def put(self, user_id):
         """Update a user."""
-        data = ns.payload
+        data = json_body(ns)
         try:
             user = facade.update_user(user_id, data)
         except ValueError as e:
@@ -1,26 +1,110 @@
 """Base class that all models inherit from."""
-import uuid
-from datetime import datetime
+from app.models import ids, timestamps
+from app.models.id_set import IdSet
+from app.models.schema import Schema
 
 
 class BaseModel:
-    """Every object in our app gets an id and timestamps from here."""
+    """Every object in our app gets an id and timestamps from here.
+
+    Models use __slots__ instead of a per-object __dict__, which saves a
+    lot of memory when millions of objects are kept in the repository.
+    created_at / updated_at are epoch microseconds (app/models/
+    timestamps.py), rendered as ISO-8601 strings by to_dict().
+    Each subclass lists its own slots and its fields:
+
+    - FIELDS: what to_dict() returns, in this order
+    - PRIVATE_FIELDS: stored (to_record) but never sent to a client
+    - READ_ONLY: fields update() must never change
+    - DEFAULTS: values for fields missing from an older saved record
+    - SET_FIELDS: id lists kept as an IdSet, rendered as plain lists
+    - REFERENCES: fields holding ids of other objects (an id or an id
+      list) -> the model those ids belong to
+    - SCHEMA: the fields a client sends and their rules, in constructor
+      order (app/models/schema.py). It is compiled into check_new(),
+      which constructors call with their arguments, and check_changes(),
+      which update() calls on its dict (fields not in READ_ONLY only).
+    """
+
+    __slots__ = ("id", "created_at", "updated_at")
+
+    FIELDS = ("id", "created_at", "updated_at")
+    PRIVATE_FIELDS = ()
+    READ_ONLY = ("id", "created_at", "updated_at")
+    DEFAULTS = {}
+    SET_FIELDS = ()
+    REFERENCES = {}
+    SCHEMA = Schema()
+    EDITABLE = frozenset()  # FIELDS minus READ_ONLY, set for each subclass
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Fields update() may set, computed once per class
+        cls.EDITABLE = frozenset(cls.FIELDS) - frozenset(cls.READ_ONLY)
+        cls.check_new = staticmethod(cls.SCHEMA.new_checker())
+        cls.check_changes = staticmethod(cls.SCHEMA.change_checker(
+            [name for name in cls.SCHEMA if name not in cls.READ_ONLY]))
 
     def __init__(self):
-        # Generate a unique ID for each object
-        self.id = str(uuid.uuid4())
-        self.created_at = datetime.utcnow().isoformat()
-        self.updated_at = datetime.utcnow().isoformat()
+        # Generate a unique ID for each object (see app/models/ids.py)
+        self.id = ids.new_id()
+        self.created_at = self.updated_at = timestamps.now()
 
     def update(self, data):
-        """Update the object's fields with the given dictionary."""
-        for key, value in data.items():
-            # We never let anyone change the id or timestamps directly
-            if key in ("id", "created_at", "updated_at"):
+        """Update the object's fields with the given dictionary.
+
+        Raises ValueError (nothing changed) if a value breaks SCHEMA.
+        """
+        self.apply(self.check_changes(data))
+
+    def apply(self, values):
+        """Set values already checked by check_changes(), then touch()."""
+        for key, value in values.items():
+            # Unknown keys, the id and the timestamps are ignored
+            if key not in self.EDITABLE:
                 continue
+            if key in self.SET_FIELDS:
+                value = IdSet(value)
             setattr(self, key, value)
-        self.updated_at = datetime.utcnow().isoformat()
+        self.touch()
+
+    def touch(self):
+        """Record that the object just changed (ETags rely on this)."""
+        self.updated_at = timestamps.now()
 
     def to_dict(self):
         """Return a dictionary of the object (used to build JSON responses)."""
-        return dict(self.__dict__)
+        d = {name: getattr(self, name) for name in self.FIELDS}
+        d["created_at"] = created = timestamps.to_iso(self.created_at)
+        d["updated_at"] = (created if self.updated_at == self.created_at
+                           else timestamps.to_iso(self.updated_at))
+        for name in self.SET_FIELDS:
+            d[name] = list(d[name])
+        return d
+
+    # --- persistence ------------------------------------------------------
+
+    def to_record(self):
+        """Return the full state of the object, private fields included.
+
+        Used by storage backends; never send this to a client.
+        """
+        record = {name: getattr(self, name)
+                  for name in self.FIELDS + self.PRIVATE_FIELDS}
+        for name in self.SET_FIELDS:
+            record[name] = list(record[name])
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild an object from to_record() output without re-validating."""
+        obj = cls.__new__(cls)
+        for name in cls.FIELDS + cls.PRIVATE_FIELDS:
+            setattr(obj, name, record.get(name, cls.DEFAULTS.get(name)))
+        for name in cls.SET_FIELDS:
+            setattr(obj, name, IdSet(record.get(name) or ()))
+        # Records saved before timestamps were ints hold ISO strings
+        obj.created_at = timestamps.from_iso(obj.created_at)
+        obj.updated_at = timestamps.from_iso(obj.updated_at)
+        return obj
+
@@ -0,0 +1,50 @@
+"""Insertion-ordered set of ids, used for a model's relationship lists."""
+
+
+class IdSet:
+    """A set of ids that remembers insertion order.
+
+    Backed by a dict, so membership, add and remove are O(1) even for a
+    place with 100k reviews, while iteration (and the JSON list built
+    from it) keeps the order ids were added in.
+    """
+
+    __slots__ = ("_ids",)
+
+    def __init__(self, ids=()):
+        self._ids = dict.fromkeys(ids)
+
+    def add(self, obj_id):
+        """Add an id. Returns True if it was not already there."""
+        if obj_id in self._ids:
+            return False
+        self._ids[obj_id] = None
+        return True
+
+    def discard(self, obj_id):
+        """Remove an id if present. Returns True if it was there."""
+        if obj_id not in self._ids:
+            return False
+        del self._ids[obj_id]
+        return True
+
+    def __contains__(self, obj_id):
+        return obj_id in self._ids
+
+    def __iter__(self):
+        # Iterate over a copy (made in one step under the GIL), so another
+        # thread adding an id cannot break the loop
+        return iter(list(self._ids))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __eq__(self, other):
+        if isinstance(other, IdSet):
+            return list(self._ids) == list(other._ids)
+        if isinstance(other, (list, tuple)):
+            return list(self._ids) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"IdSet({list(self._ids)!r})"
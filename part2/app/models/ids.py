@@ -0,0 +1,74 @@
+"""Id strategies: how BaseModel picks the id of a new object.
+
+Ids are always UUID strings (8-4-4-4-12 lowercase hex), so clients and
+stored data see the same format whatever the strategy:
+
+- "uuid7" (default): time-ordered, as in RFC 9562. The first 48 bits
+  are the creation time in milliseconds and the next 12 a counter, so
+  ids made later sort after earlier ones (within one process). New rows
+  then land at the end of SQLite's primary key B-tree instead of at a
+  random page.
+- "uuid4": fully random, what older data was created with.
+
+The strategy comes from config.ID_STRATEGY (HBNB_ID_STRATEGY).
+"""
+import os
+import threading
+import time
+import uuid
+
+from config import get_config
+
+# Random bytes read from the OS at once, then used 8 at a time
+_POOL_SIZE = 4096
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+_pool = b""
+_pool_pos = 0
+
+
+def uuid4():
+    """A random UUID string (same as str(uuid.uuid4()))."""
+    return str(uuid.uuid4())
+
+
+def uuid7():
+    """A time-ordered UUID string, increasing within this process."""
+    global _last_ms, _counter, _pool, _pool_pos
+    with _lock:
+        ms = time.time_ns() // 1000000
+        if ms > _last_ms:
+            _last_ms, _counter = ms, 0
+        else:
+            # Same millisecond (or the clock went back): count up, and
+            # borrow the next millisecond when the 12 bits run out
+            _counter += 1
+            if _counter > 0xFFF:
+                _last_ms, _counter = _last_ms + 1, 0
+        ms, counter = _last_ms, _counter
+        if _pool_pos == len(_pool):
+            _pool, _pool_pos = os.urandom(_POOL_SIZE), 0
+        rand = int.from_bytes(_pool[_pool_pos:_pool_pos + 8], "big")
+        _pool_pos += 8
+    # unix_ts_ms (48 bits) | ver 7, counter (12) | var 0b10, random (62)
+    return "%08x-%04x-%04x-%04x-%012x" % (
+        ms >> 16, ms & 0xFFFF, 0x7000 | counter,
+        0x8000 | (rand >> 50) & 0x3FFF, rand & 0xFFFFFFFFFFFF)
+
+
+STRATEGIES = {"uuid7": uuid7, "uuid4": uuid4}
+
+new_id = uuid7
+
+
+def set_strategy(name):
+    """Use another strategy for the ids created from now on."""
+    global new_id
+    if name not in STRATEGIES:
+        raise ValueError(f"unknown id strategy {name!r}")
+    new_id = STRATEGIES[name]
+
+
+set_strategy(get_config().ID_STRATEGY)
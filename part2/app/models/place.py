@@ -1,51 +1,45 @@
 """Place model."""
 from app.models.base_model import BaseModel
+from app.models.id_set import IdSet
+from app.models.rating_stats import RatingStats
+from app.models.schema import Field, Schema
 
 
-class Place(BaseModel):
+class Place(RatingStats, BaseModel):
     """A place is a property listed for rent."""
 
+    __slots__ = ("title", "description", "price", "latitude", "longitude",
+                 "owner_id", "amenity_ids",
+                 "review_ids") + RatingStats.RATING_FIELDS
+
+    FIELDS = (BaseModel.FIELDS
+              + ("title", "description", "price", "latitude", "longitude",
+                 "owner_id", "amenity_ids", "review_ids")
+              + RatingStats.RATING_FIELDS)
+    # review_ids is only changed by the facade, through repo.modify()
+    READ_ONLY = (BaseModel.READ_ONLY + ("review_ids",)
+                 + RatingStats.RATING_FIELDS)
+    DEFAULTS = RatingStats.RATING_DEFAULTS
+    SET_FIELDS = ("amenity_ids", "review_ids")
+    REFERENCES = {"owner_id": "User", "amenity_ids": "Amenity",
+                  "review_ids": "Review"}
+    SCHEMA = Schema(
+        title=Field(str, required=True, blank=False),
+        description=Field(str, default=""),
+        price=Field(float, required=True, minimum=0),
+        latitude=Field(float, required=True, minimum=-90, maximum=90),
+        longitude=Field(float, required=True, minimum=-180, maximum=180),
+        owner_id=Field(str, required=True),
+        amenity_ids=Field(list),
+    )
+
     def __init__(self, title, description, price,
                  latitude, longitude, owner_id, amenity_ids=None):
         super().__init__()
-        self._validate(title, price, latitude, longitude)
-        self.title = title
-        self.description = description
-        self.price = float(price)
-        self.latitude = float(latitude)
-        self.longitude = float(longitude)
-        self.owner_id = owner_id
-        self.amenity_ids = amenity_ids if amenity_ids is not None else []
-        self.review_ids = []  # reviews left for this place
-
-    # --- validation -------------------------------------------------------
-
-    @staticmethod
-    def _validate(title, price, latitude, longitude):
-        """Make sure the data makes sense before saving."""
-        if not title or not str(title).strip():
-            raise ValueError("title is required")
-        if float(price) < 0:
-            raise ValueError("price must be >= 0")
-        if not (-90 <= float(latitude) <= 90):
-            raise ValueError("latitude must be between -90 and 90")
-        if not (-180 <= float(longitude) <= 180):
-            raise ValueError("longitude must be between -180 and 180")
-
-    def update(self, data: dict):
-        for key in ("price", "latitude", "longitude"):
-            if key in data:
-                data[key] = float(data[key])
-        if "title" in data and (
-                not data["title"] or not str(data["title"]).strip()):
-            raise ValueError("title is required")
-        if "price" in data and data["price"] < 0:
-            raise ValueError("price must be >= 0")
-        if "latitude" in data and not (-90 <= data["latitude"] <= 90):
-            raise ValueError("latitude must be between -90 and 90")
-        if "longitude" in data and not (-180 <= data["longitude"] <= 180):
-            raise ValueError("longitude must be between -180 and 180")
-        super().update(data)
-
-    def to_dict(self) -> dict:
-        return super().to_dict()
+        (self.title, self.description, self.price, self.latitude,
+         self.longitude, self.owner_id, amenity_ids) = self.check_new(
+            title, description, price, latitude, longitude, owner_id,
+            amenity_ids)
+        self.amenity_ids = IdSet(amenity_ids)
+        self.review_ids = IdSet()  # reviews left for this place
+        self.set_rating_totals(0, 0)
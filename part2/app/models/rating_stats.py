@@ -0,0 +1,44 @@
+"""Running rating totals shared by Place and User."""
+
+
+class RatingStats:
+    """Keeps review_count, rating_sum and average_rating up to date.
+
+    The facade calls add/remove/change_rating whenever a review is
+    created, deleted or re-rated, so reading the average is O(1) and
+    never needs the reviews themselves.
+    """
+
+    # The slots themselves are declared by Place and User
+    __slots__ = ()
+
+    RATING_FIELDS = ("review_count", "rating_sum", "average_rating")
+    # Also cover objects saved before these fields existed
+    RATING_DEFAULTS = {"review_count": 0, "rating_sum": 0,
+                       "average_rating": 0.0}
+
+    def _refresh_average(self):
+        self.average_rating = (self.rating_sum / self.review_count
+                               if self.review_count else 0.0)
+        # The totals are part of what clients see
+        self.touch()
+
+    def add_rating(self, rating):
+        self.review_count += 1
+        self.rating_sum += rating
+        self._refresh_average()
+
+    def remove_rating(self, rating):
+        self.review_count -= 1
+        self.rating_sum -= rating
+        self._refresh_average()
+
+    def change_rating(self, old, new):
+        self.rating_sum += new - old
+        self._refresh_average()
+
+    def set_rating_totals(self, count, total):
+        """Overwrite the totals (used when recomputing from scratch)."""
+        self.review_count = count
+        self.rating_sum = total
+        self._refresh_average()
@@ -1,39 +1,25 @@
 """Review model."""
 from app.models.base_model import BaseModel
+from app.models.schema import Field, Schema
 
 
 class Review(BaseModel):
     """A review is feedback a user leaves for a place they visited."""
 
-    def __init__(self, text, rating, user_id, place_id):
-        super().__init__()
-        self._validate(text, rating)
-        self.text = text
-        self.rating = int(rating)
-        self.user_id = user_id
-        self.place_id = place_id
+    __slots__ = ("text", "rating", "user_id", "place_id")
 
-    @staticmethod
-    def _validate(text, rating):
-        if not text or not str(text).strip():
-            raise ValueError("text is required")
-        try:
-            r = int(rating)
-        except (TypeError, ValueError):
-            raise ValueError("rating must be an integer between 1 and 5")
-        if not (1 <= r <= 5):
-            raise ValueError("rating must be between 1 and 5")
+    FIELDS = BaseModel.FIELDS + ("text", "rating", "user_id", "place_id")
+    # A review stays attached to the same user and place
+    READ_ONLY = BaseModel.READ_ONLY + ("user_id", "place_id")
+    REFERENCES = {"user_id": "User", "place_id": "Place"}
+    SCHEMA = Schema(
+        text=Field(str, required=True, blank=False),
+        rating=Field(int, required=True, minimum=1, maximum=5),
+        user_id=Field(str, required=True),
+        place_id=Field(str, required=True),
+    )
 
-    def update(self, data: dict):
-        if "text" in data and (
-                not data["text"] or not str(data["text"]).strip()):
-            raise ValueError("text is required")
-        if "rating" in data:
-            try:
-                r = int(data["rating"])
-            except (TypeError, ValueError):
-                raise ValueError("rating must be an integer between 1 and 5")
-            if not (1 <= r <= 5):
-                raise ValueError("rating must be between 1 and 5")
-            data["rating"] = r
-        super().update(data)
+    def __init__(self, text, rating, user_id, place_id):
+        super().__init__()
+        (self.text, self.rating, self.user_id,
+         self.place_id) = self.check_new(text, rating, user_id, place_id)
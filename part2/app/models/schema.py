@@ -0,0 +1,175 @@
+"""Declarative field schemas, compiled into validator functions.
+
+Each model lists the fields a client may send once, in its SCHEMA:
+
+    SCHEMA = Schema(
+        text=Field(str, required=True, blank=False),
+        rating=Field(int, required=True, minimum=1, maximum=5),
+    )
+
+Schema generates two plain functions from that (the same way
+app/api/v1/serializers.py compiles output models), so the rules are
+walked once per class instead of once per object:
+
+- new_checker(): check(text, rating) -> (text, rating), for constructors;
+- change_checker(names): check(data) -> {name: value} for the names
+  present in data, for update().
+
+Both raise ValueError with the message the API returns as a 400. Types
+follow JSON: str, int (not bool), float (an int is accepted and stored
+as float) and list (of strings). These checks are the only validation
+of request bodies; the API does not run flask-restx's jsonschema pass.
+"""
+import re
+
+_TYPE_NAMES = {str: "a string", int: "an integer", float: "a number",
+               list: "a list of strings"}
+
+
+class Field:
+    """One input field: its JSON type and the rules its value follows.
+
+    - required: None (or missing) is refused; otherwise it becomes
+      `default` (a new empty list for list fields)
+    - blank=False: a string of only whitespace counts as missing
+    - minimum / maximum: inclusive bounds of a number
+    - pattern: regular expression the string must match, compiled once;
+      `invalid` is the message when it does not
+    """
+
+    __slots__ = ("kind", "required", "blank", "minimum", "maximum",
+                 "pattern", "invalid", "default")
+
+    def __init__(self, kind, required=False, blank=True, minimum=None,
+                 maximum=None, pattern=None, invalid=None, default=None):
+        if kind not in _TYPE_NAMES:
+            raise ValueError(f"unsupported field type {kind!r}")
+        self.kind = kind
+        self.required = required
+        self.blank = blank
+        self.minimum = minimum
+        self.maximum = maximum
+        self.pattern = re.compile(pattern) if pattern else None
+        self.invalid = invalid
+        self.default = default
+
+    def type_error(self, name):
+        if (self.kind is int and self.minimum is not None
+                and self.maximum is not None):
+            return (f"{name} must be an integer between {self.minimum} "
+                    f"and {self.maximum}")
+        return f"{name} must be {_TYPE_NAMES[self.kind]}"
+
+    def range_error(self, name):
+        if self.maximum is None:
+            return f"{name} must be >= {self.minimum}"
+        if self.minimum is None:
+            return f"{name} must be <= {self.maximum}"
+        return f"{name} must be between {self.minimum} and {self.maximum}"
+
+    def source(self, var, name, partial, const):
+        """Lines checking and converting the local variable `var`.
+
+        name is the field's name, for the messages. const(value) returns
+        the name of a global of the generated code holding value.
+        partial: the value comes from an update, where None never means
+        "use the default".
+        """
+        def fail(message):
+            return f"raise ValueError({const(message)})"
+
+        required = f"{name} is required"
+        checks = self._checks(var, name, fail, const, required)
+        if partial or self.required:
+            missing = required if self.required else self.type_error(name)
+            return [f"if {var} is None: {fail(missing)}"] + checks
+        default = "[]" if self.kind is list else const(self.default)
+        return ([f"if {var} is None:", f"    {var} = {default}", "else:"]
+                + ["    " + line for line in checks])
+
+    def _checks(self, var, name, fail, const, required):
+        kind = self.kind
+        type_error = fail(self.type_error(name))
+        if kind is float:
+            lines = [f"if type({var}) is not float:",
+                     f"    if type({var}) is not int: {type_error}",
+                     f"    {var} = float({var})"]
+        elif kind is list:
+            lines = [f"if type({var}) is not list or not all("
+                     f"type(x) is str for x in {var}): {type_error}"]
+        else:
+            lines = [f"if type({var}) is not {kind.__name__}: {type_error}"]
+        if kind is str and not self.blank:
+            lines.append(f"if not {var}.strip(): {fail(required)}")
+        if self.pattern is not None:
+            invalid = self.invalid or f"{name} is not valid"
+            lines.append(f"if {const(self.pattern.match)}({var}) is None: "
+                         f"{fail(invalid)}")
+        low, high = self.minimum, self.maximum
+        if low is not None or high is not None:
+            if high is None:
+                test = f"{var} < {low!r}"
+            elif low is None:
+                test = f"{var} > {high!r}"
+            else:
+                test = f"not ({low!r} <= {var} <= {high!r})"
+            lines.append(f"if {test}: {fail(self.range_error(name))}")
+        return lines
+
+
+def _compile(lines):
+    """Exec generated lines (see Schema) and return their check()."""
+    env = {}
+
+    def const(value):
+        key = f"_c{len(env)}"
+        env[key] = value
+        return key
+
+    source = "\n".join(lines(const)) + "\n"
+    exec(source, env)
+    return env["check"]
+
+
+class Schema:
+    """The input fields of a model, in constructor order."""
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def new_checker(self):
+        """check(*values) for every field, in order: the checked tuple."""
+        names = list(self.fields)
+        args = [f"v{i}" for i in range(len(names))]
+
+        def lines(const):
+            yield f"def check({', '.join(args)}):"
+            for var, name in zip(args, names):
+                field = self.fields[name]
+                for line in field.source(var, name, False, const):
+                    yield "    " + line
+            yield f"    return ({''.join(a + ', ' for a in args)})"
+        return _compile(lines)
+
+    def change_checker(self, names=None):
+        """check(data) for the fields of an update dict.
+
+        Only `names` (default: every field) are checked and returned;
+        other keys of data are left out.
+        """
+        names = list(self.fields if names is None else names)
+
+        def lines(const):
+            yield "def check(data):"
+            yield "    values = {}"
+            for name in names:
+                yield f"    if {name!r} in data:"
+                yield f"        v = data[{name!r}]"
+                for line in self.fields[name].source("v", name, True, const):
+                    yield "        " + line
+                yield f"        values[{name!r}] = v"
+            yield "    return values"
+        return _compile(lines)
@@ -0,0 +1,67 @@
+"""Timestamps: integer microseconds since the Unix epoch (UTC).
+
+Models store created_at / updated_at as ints: cheaper to make than an
+ISO string, smaller in memory, and directly comparable, so they can be
+sorted and range-searched. They are turned into the ISO-8601 strings
+clients see (e.g. "2024-05-01T12:30:00.123456", UTC, no offset) only
+when an object is serialized, by to_iso().
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+_ONE_SECOND = timedelta(seconds=1)
+
+# "YYYY-MM-DDTHH:MM:SS" per epoch second already formatted; objects made
+# together share their seconds, so listings mostly hit this
+_seconds = {}
+_SECONDS_CACHED = 16384
+
+_lock = threading.Lock()
+_last = 0
+
+
+def now():
+    """The current time in epoch microseconds.
+
+    Never goes back and never repeats within this process, even if the
+    system clock is set back: ETags built from updated_at change on
+    every write.
+    """
+    global _last
+    us = time.time_ns() // 1000
+    with _lock:
+        _last = us if us > _last else _last + 1
+        return _last
+
+
+def to_iso(us):
+    """ISO-8601 string of epoch microseconds, as datetime.isoformat()."""
+    seconds, micro = divmod(us, 1000000)
+    prefix = _seconds.get(seconds)
+    if prefix is None:
+        if len(_seconds) >= _SECONDS_CACHED:
+            _seconds.clear()
+        prefix = _seconds[seconds] = (
+            _EPOCH + seconds * _ONE_SECOND).isoformat()
+    # isoformat() leaves the fraction out when it is zero
+    return "%s.%06d" % (prefix, micro) if micro else prefix
+
+
+def from_iso(value):
+    """Epoch microseconds of an ISO-8601 string (naive means UTC).
+
+    Ints are returned as they are, so records saved before timestamps
+    were ints load the same way as new ones. Raises ValueError.
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        dt = datetime.fromisoformat(value)
+    except TypeError:
+        raise ValueError(f"invalid timestamp {value!r}")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _ONE_US
@@ -1,64 +1,49 @@
 """User model."""
-import re
 from app.models.base_model import BaseModel
+from app.models.id_set import IdSet
+from app.models.rating_stats import RatingStats
+from app.models.schema import Field, Schema
 
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
 
-class User(BaseModel):
+
+class User(RatingStats, BaseModel):
     """Represents a person who signed up on HBnB."""
 
+    __slots__ = ("first_name", "last_name", "email", "_password",
+                 "place_ids", "review_ids") + RatingStats.RATING_FIELDS
+
+    FIELDS = (BaseModel.FIELDS
+              + ("first_name", "last_name", "email", "place_ids",
+                 "review_ids")
+              + RatingStats.RATING_FIELDS)
+    PRIVATE_FIELDS = ("_password",)  # never in to_dict()
+    # The id lists are only changed by the facade, through repo.modify()
+    READ_ONLY = (BaseModel.READ_ONLY + ("place_ids", "review_ids")
+                 + RatingStats.RATING_FIELDS)
+    DEFAULTS = RatingStats.RATING_DEFAULTS
+    SET_FIELDS = ("place_ids", "review_ids")
+    REFERENCES = {"place_ids": "Place", "review_ids": "Review"}
+    SCHEMA = Schema(
+        first_name=Field(str, required=True, blank=False),
+        last_name=Field(str, required=True, blank=False),
+        email=Field(str, required=True, blank=False, pattern=EMAIL_PATTERN,
+                    invalid="Invalid email format"),
+        password=Field(str, required=True, blank=False),
+    )
+
     def __init__(self, first_name, last_name, email, password):
         super().__init__()
-        self._validate(first_name, last_name, email, password)
-        self.first_name = first_name
-        self.last_name = last_name
-        self.email = email
-        self._password = password  # underscore = private, never sent to client
-        self.place_ids = []   # list of place ids owned by this user
-        self.review_ids = []  # list of review ids written by this user
-
-    # --- validation -------------------------------------------------------
-
-    @staticmethod
-    def _validate(first_name, last_name, email, password):
-        """Check that all required fields are present and valid."""
-        if not first_name or not first_name.strip():
-            raise ValueError("first_name is required")
-        if not last_name or not last_name.strip():
-            raise ValueError("last_name is required")
-        if not email or not email.strip():
-            raise ValueError("email is required")
-        if not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email):
-            raise ValueError("Invalid email format")
-        if not password or not password.strip():
-            raise ValueError("password is required")
-
-    # --- update -----------------------------------------------------------
+        (self.first_name, self.last_name, self.email,
+         self._password) = self.check_new(first_name, last_name, email,
+                                          password)
+        self.place_ids = IdSet()   # ids of places owned by this user
+        self.review_ids = IdSet()  # ids of reviews written by this user
+        self.set_rating_totals(0, 0)  # ratings this user has given
 
     def update(self, data):
-        protected = ("id", "created_at", "updated_at")
-        for key, value in data.items():
-            if key in protected:
-                continue
-            if key == "password":
-                if not value or not str(value).strip():
-                    raise ValueError("password is required")
-                self._password = value
-                continue
-            if key == "email":
-                if not value or not re.match(
-                        r"^[^@\s]+@[^@\s]+\.[^@\s]+$", value):
-                    raise ValueError("Invalid email format")
-            if key in ("first_name", "last_name") and (
-                    not value or not str(value).strip()):
-                raise ValueError(f"{key} is required")
-            setattr(self, key, value)
-        from datetime import datetime
-        self.updated_at = datetime.utcnow().isoformat()
-
-    # --- serialisation ----------------------------------------------------
-
-    def to_dict(self):
-        """Return user data as a dict. Password is NEVER included."""
-        d = super().to_dict()
-        d.pop("_password", None)  # remove the password before sending
-        return d
+        values = self.check_changes(data)
+        # Stored as _password, which to_dict() leaves out
+        if "password" in values:
+            self._password = values.pop("password")
+        self.apply(values)
@@ -0,0 +1,411 @@
+"""Durable repository – InMemoryRepository plus a write-ahead log on disk."""
+import glob
+import json
+import os
+import re
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+
+from app.persistence.repository import InMemoryRepository
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: the directory is not locked
+    fcntl = None
+
+# Every log/snapshot entry is a frame: payload length, CRC32 of the
+# payload, then the payload (compact JSON):
+#   ["p", "Model", record]  put: the object's full state (add or update)
+#   ["d", "Model", id]      delete
+# Puts carry the whole record, so replaying an entry twice is harmless.
+_FRAME_HEADER = struct.Struct("<II")
+
+_SEGMENT = "wal-{:08d}.log"
+_SNAPSHOT = "snapshot-{:08d}.snap"
+_NUMBER = re.compile(r"-(\d+)\.")
+
+
+def _frame(entry):
+    payload = json.dumps(entry, separators=(",", ":")).encode()
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _read_frames(path):
+    """Yield (entry, end_offset) for each intact frame of a file.
+
+    Stops at the first torn or corrupt frame (a crash mid-write).
+    """
+    with open(path, "rb") as f:
+        offset = 0
+        while True:
+            header = f.read(_FRAME_HEADER.size)
+            if len(header) < _FRAME_HEADER.size:
+                return
+            size, crc = _FRAME_HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size or zlib.crc32(payload) != crc:
+                return
+            offset += _FRAME_HEADER.size + size
+            yield json.loads(payload), offset
+
+
+def _number(path):
+    return int(_NUMBER.search(os.path.basename(path)).group(1))
+
+
+def _fsync_dir(path):
+    """Make a file creation/rename in `path` durable (POSIX only)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DurableRepository(InMemoryRepository):
+    """Serves everything from memory, but logs every write to disk.
+
+    Files in `directory`:
+    - wal-N.log: log segments, appended to by add/modify/delete
+    - snapshot-N.snap: every object, written in the background after
+      `snapshot_every` log entries; segments older than N are deleted
+
+    On startup the newest snapshot is loaded and the segments from N on
+    are replayed. `sync` chooses when a write reaches the disk:
+    - "group": a write returns once fsync'ed, but threads writing at the
+      same time share one fsync (group commit)
+    - "always": one fsync per write
+    - "none": left to the OS (a crash can lose the last writes)
+
+    Writes made inside transaction() wait for the disk once, when the
+    block ends and its locks are released, so readers never wait for an
+    fsync (except in "always" mode, which syncs while appending).
+
+    Only one repository may open a directory at a time: it holds an
+    exclusive lock on the LOCK file until close(), and opening a locked
+    directory raises RuntimeError.
+    """
+
+    def __init__(self, directory, models, sync="group",
+                 snapshot_every=100000, **kwargs):
+        if sync not in ("group", "always", "none"):
+            raise ValueError(f"unknown sync mode {sync!r}")
+        super().__init__(**kwargs)
+        self._dir = directory
+        self._models = {cls.__name__: cls for cls in models}
+        self._sync = sync
+        self._snapshot_every = snapshot_every
+        # Appending: _log_lock guards the file and the counters
+        self._log_lock = threading.Lock()
+        self._appended = 0  # frames written to the current process
+        self._since_snapshot = 0
+        # Group commit: one "leader" thread syncs for everybody
+        self._sync_cond = threading.Condition()
+        self._syncing = False
+        self._synced = 0
+        self._snapshot_thread = None
+        # Per thread: transaction() depth, and the newest frame written
+        # inside the outermost one, waited for when it ends
+        self._pending = threading.local()
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = self._lock_directory()
+        try:
+            self.loaded = self._recover()
+            self._segment = max(self._segment_numbers(), default=0) + 1
+            self._log = self._open_segment(self._segment)
+        except BaseException:
+            self._lock_file.close()
+            raise
+
+    # --- startup ----------------------------------------------------------
+
+    def _lock_directory(self):
+        """Open and lock <directory>/LOCK; the lock ends with the file."""
+        lock_file = open(os.path.join(self._dir, "LOCK"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise RuntimeError(
+                    f"{self._dir} is already open in another "
+                    "DurableRepository") from None
+        return lock_file
+
+    def _segment_numbers(self):
+        return [_number(p)
+                for p in glob.glob(os.path.join(self._dir, "wal-*.log"))]
+
+    def _recover(self):
+        """Load the newest snapshot, then replay the log after it.
+
+        Returns (objects in the snapshot, log entries replayed).
+        """
+        for tmp in glob.glob(os.path.join(self._dir, "*.tmp")):
+            os.remove(tmp)  # snapshot interrupted by a crash
+        snapshots = sorted(
+            glob.glob(os.path.join(self._dir, "snapshot-*.snap")), key=_number)
+        start, from_snapshot, from_log = 0, 0, 0
+        # Objects may refer to ones loaded later: share ids once at the end.
+        # A snapshot may also hold two objects caught in the middle of
+        # swapping a unique value, which the log after it sets right:
+        # unique indexes are rebuilt at the end too.
+        self._share = False
+        self._enforce_unique = False
+        if snapshots:
+            start = _number(snapshots[-1])
+            for entry, _ in _read_frames(snapshots[-1]):
+                self._apply(entry)
+                from_snapshot += 1
+        segments = sorted(n for n in self._segment_numbers() if n >= start)
+        for i, n in enumerate(segments):
+            path = os.path.join(self._dir, _SEGMENT.format(n))
+            end = 0
+            for entry, end in _read_frames(path):
+                self._apply(entry)
+                from_log += 1
+            if end < os.path.getsize(path):
+                if i < len(segments) - 1:
+                    raise ValueError(f"{path} is corrupt")
+                # Torn last write: drop it so the file ends on a frame
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+        self._remove_before(start, keep_snapshot=start)
+        self._rebuild_unique()
+        self._enforce_unique = True
+        self._share_all_ids()
+        self._share = True
+        return from_snapshot, from_log
+
+    def _apply(self, entry):
+        """Replay one log entry without logging it again."""
+        op, model_name, value = entry
+        if op == "p":
+            obj = self._models[model_name].from_record(value)
+            InMemoryRepository.add(self, obj)
+        else:
+            InMemoryRepository.delete(self, model_name, value)
+
+    def _remove_before(self, number, keep_snapshot):
+        """Delete segments older than `number` and other snapshots."""
+        for n in self._segment_numbers():
+            if n < number:
+                os.remove(os.path.join(self._dir, _SEGMENT.format(n)))
+        for path in glob.glob(os.path.join(self._dir, "snapshot-*.snap")):
+            if _number(path) != keep_snapshot:
+                os.remove(path)
+
+    # --- log writing ------------------------------------------------------
+
+    def _open_segment(self, number):
+        log = open(os.path.join(self._dir, _SEGMENT.format(number)), "ab")
+        _fsync_dir(self._dir)
+        return log
+
+    def _append(self, entry):
+        """Write one frame; returns its number, for _wait_durable()."""
+        frame = _frame(entry)
+        with self._log_lock:
+            self._log.write(frame)
+            self._appended += 1
+            self._since_snapshot += 1
+            if self._sync == "always":
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._synced = self._appended
+            seq = self._appended
+        if self._since_snapshot >= self._snapshot_every:
+            self._start_snapshot()
+        return seq
+
+    @property
+    def sync(self):
+        """When a write reaches the disk: "group", "always" or "none"."""
+        return self._sync
+
+    @contextmanager
+    def transaction(self, *model_names):
+        """InMemoryRepository.transaction(), waiting for the disk after.
+
+        Writes inside the block do not wait for their frames: the block
+        waits once, for the newest, after releasing its locks.
+        """
+        pending = self._pending
+        depth = getattr(pending, "depth", 0)
+        if depth == 0:
+            pending.seq = 0
+        pending.depth = depth + 1
+        try:
+            with super().transaction(*model_names):
+                yield self
+        finally:
+            pending.depth = depth
+            if depth == 0:
+                self._wait_durable(pending.seq)
+
+    def _wait_durable(self, seq):
+        """Return once frame `seq` is on disk (group commit).
+
+        Inside transaction(), only note seq for the block to wait for.
+        """
+        pending = self._pending
+        if getattr(pending, "depth", 0):
+            pending.seq = max(pending.seq, seq)
+            return
+        if self._sync != "group":
+            return
+        while True:
+            with self._sync_cond:
+                if self._synced >= seq:
+                    return
+                if self._syncing:
+                    # Another thread's fsync may cover our frame too
+                    self._sync_cond.wait()
+                    continue
+                self._syncing = True
+            # We lead: one fsync for every frame written so far
+            try:
+                with self._log_lock:
+                    self._log.flush()
+                    target = self._appended
+                    fd = self._log.fileno()
+                os.fsync(fd)
+                with self._sync_cond:
+                    self._synced = max(self._synced, target)
+            finally:
+                with self._sync_cond:
+                    self._syncing = False
+                    self._sync_cond.notify_all()
+
+    def _rotate(self):
+        """Close the current segment (synced) and start a new one."""
+        with self._sync_cond:
+            while self._syncing:  # no leader may hold the old file
+                self._sync_cond.wait()
+            self._syncing = True
+        try:
+            with self._log_lock:
+                self._log.flush()
+                os.fsync(self._log.fileno())
+                self._log.close()
+                self._synced = self._appended
+                self._segment += 1
+                self._log = self._open_segment(self._segment)
+                self._since_snapshot = 0
+                return self._segment
+        finally:
+            with self._sync_cond:
+                self._syncing = False
+                self._sync_cond.notify_all()
+
+    # --- writes -----------------------------------------------------------
+
+    def add(self, obj):
+        model_name = type(obj).__name__
+        with self._lock(model_name).write():
+            super().add(obj)
+            seq = self._append(["p", model_name, obj.to_record()])
+        self._wait_durable(seq)
+
+    def add_many(self, objs):
+        """Save several new objects; one wait for the disk at the end."""
+        objs = list(objs)
+        seq = 0
+        with self.transaction(*{type(obj).__name__ for obj in objs}):
+            for obj in objs:
+                model_name = type(obj).__name__
+                InMemoryRepository.add(self, obj)
+                seq = self._append(["p", model_name, obj.to_record()])
+        self._wait_durable(seq)
+
+    def _modify_logged(self, model_name, obj_id, change):
+        """modify() and log the result: (object, frame number)."""
+        with self._lock(model_name).write():
+            try:
+                obj = InMemoryRepository.modify(self, model_name, obj_id,
+                                                change)
+            finally:
+                # Log whatever is in memory now, even after a failed
+                # change, so a replay rebuilds exactly this state
+                current = self._bucket(model_name).get(obj_id)
+                seq = 0
+                if current is not None:
+                    seq = self._append(["p", model_name, current.to_record()])
+        return obj, seq
+
+    def modify(self, model_name, obj_id, change):
+        obj, seq = self._modify_logged(model_name, obj_id, change)
+        self._wait_durable(seq)
+        return obj
+
+    def modify_many(self, model_name, obj_ids, change):
+        found, seq = [], 0
+        with self._lock(model_name).write():
+            for obj_id in obj_ids:
+                obj, obj_seq = self._modify_logged(model_name, obj_id, change)
+                if obj is not None:
+                    found.append(obj)
+                seq = max(seq, obj_seq)
+        self._wait_durable(seq)
+        return found
+
+    def delete(self, model_name, obj_id):
+        with self._lock(model_name).write():
+            deleted = super().delete(model_name, obj_id)
+            seq = self._append(["d", model_name, obj_id]) if deleted else 0
+        self._wait_durable(seq)
+        return deleted
+
+    # --- snapshots --------------------------------------------------------
+
+    def _start_snapshot(self):
+        with self._log_lock:
+            if self._snapshot_thread is not None:
+                return
+            self._snapshot_thread = threading.Thread(
+                target=self.snapshot, name="hbnb-snapshot", daemon=True)
+        self._snapshot_thread.start()
+
+    def snapshot(self):
+        """Write every object to a new snapshot and drop the old log.
+
+        Writers are paused only while the log is switched to a new
+        segment N and the object lists are copied. Objects are written
+        afterwards, so one may be caught mid-change: that is fine, since
+        replaying segment N (which logged the change) fixes it. Two users
+        swapping emails may even be saved with the same one; _recover()
+        only checks unique values once the log is replayed.
+        """
+        try:
+            with self.transaction(*self._models):
+                number = self._rotate()
+                objects = [(name, list(self._bucket(name).values()))
+                           for name in self._models]
+            path = os.path.join(self._dir, _SNAPSHOT.format(number))
+            with open(path + ".tmp", "wb") as f:
+                for model_name, objs in objects:
+                    for obj in objs:
+                        f.write(_frame(["p", model_name, obj.to_record()]))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            _fsync_dir(self._dir)
+            self._remove_before(number, keep_snapshot=number)
+        finally:
+            with self._log_lock:
+                self._snapshot_thread = None
+
+    def close(self):
+        """Sync and close the log, unlock the directory (call on shutdown)."""
+        thread = self._snapshot_thread
+        if thread is not None:
+            thread.join()
+        with self._log_lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._log.close()
+        self._lock_file.close()
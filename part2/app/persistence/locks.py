@@ -0,0 +1,67 @@
+"""Reader/writer lock used by InMemoryRepository (one per model)."""
+import threading
+from contextlib import contextmanager
+
+
+class RWLock:
+    """Many readers or one writer at a time.
+
+    - A waiting writer blocks new readers, so writers are not starved.
+    - Both sides are re-entrant per thread, and the writing thread may
+      also read (a facade transaction calls exists()/get() on models it
+      holds for writing).
+    - Upgrading a read lock to a write lock is refused: two threads
+      doing it at once would wait for each other forever.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}  # thread id -> read depth
+        self._writer = None  # thread id holding the write lock
+        self._write_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                depth = self._readers.pop(me) - 1
+                if depth:
+                    self._readers[me] = depth
+                elif not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+            else:
+                if me in self._readers:
+                    raise RuntimeError("cannot upgrade a read lock to a "
+                                       "write lock")
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._cond.wait()
+                finally:
+                    self._waiting_writers -= 1
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._write_depth -= 1
+                if not self._write_depth:
+                    self._writer = None
+                    self._cond.notify_all()
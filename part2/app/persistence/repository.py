@@ -1,52 +1,781 @@
 """In-memory repository – our simple storage system."""
+import base64
+import functools
+import json
+import math
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack, contextmanager
+
+from app.persistence.locks import RWLock
+
+# Secondary indexes we keep for every model: { "Model": ("field", ...) }.
+# They let the facade find objects by a foreign key without scanning
+# the whole bucket (e.g. all reviews of one place).
+DEFAULT_INDEXES = {
+    "User":   ("email",),
+    "Place":  ("owner_id",),
+    "Review": ("place_id", "user_id"),
+}
+
+# Unique indexes: no two objects of a model may have the same value
+# (compared by unique_key(), so emails are case-insensitive). They map
+# each value to one id, so a lookup or a duplicate check is O(1).
+DEFAULT_UNIQUE_INDEXES = {
+    "User": ("email",),
+}
+
+# Inverted indexes on list fields: each element of the list is indexed, so
+# we can find every place offering a given amenity.
+DEFAULT_LIST_INDEXES = {
+    "Place": ("amenity_ids",),
+}
+
+# Sorted indexes: (value, id) pairs kept in order, for range queries
+# such as "price between 50 and 120".
+DEFAULT_SORTED_INDEXES = {
+    "Place": ("price", "average_rating"),
+}
+
+# Spatial indexes: { "Model": ("latitude field", "longitude field") }.
+# Objects are bucketed into a grid of GRID_CELL_DEG x GRID_CELL_DEG cells so
+# a bounding-box query only looks at the cells the box overlaps.
+DEFAULT_SPATIAL_INDEXES = {
+    "Place": ("latitude", "longitude"),
+}
+GRID_CELL_DEG = 0.5
+
+# scan() and scan_sorted() read this many keys per lock acquisition
+SCAN_BATCH = 100
+
+
+class DuplicateError(ValueError):
+    """Raised when a write would break a unique index."""
+
+
+def unique_key(value):
+    """What a unique index compares: lower-cased strings."""
+    return value.lower() if isinstance(value, str) else value
+
+
+# --- cursors -----------------------------------------------------------------
+# A cursor is the sort key of the last object of a page -- (created_at, id)
+# by default, created_at in epoch microseconds; (value, id) when walking a
+# sorted index -- wrapped in url-safe base64 so clients treat it as an
+# opaque string.
+
+def encode_cursor(key):
+    """Turn a sort key into an opaque cursor string."""
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, types=(int, str)):
+    """Turn a cursor string back into a sort key of the given types."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = tuple(json.loads(raw))
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor")
+    if len(key) != len(types) or not all(
+            isinstance(v, t) for v, t in zip(key, types)):
+        raise ValueError("invalid cursor")
+    return key
+
+
+def start_key(cursor, since=None):
+    """(created_at, id) key a page starts after, or None for the start.
+
+    since (epoch microseconds) skips the objects created before it: the
+    key (since, "") sorts before every object created at `since`.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    if since is not None and (after is None or after < (since, "")):
+        after = (since, "")
+    return after
+
+
+class _Max:
+    """Compares greater than any id, to find the end of a value's run."""
+
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+    def __eq__(self, other):
+        return isinstance(other, _Max)
+
+
+_MAX = _Max()
+
+
+def _remove_sorted(keys, key):
+    """Remove key from a sorted list, if present."""
+    pos = bisect_right(keys, key) - 1
+    if pos >= 0 and keys[pos] == key:
+        del keys[pos]
+
+
+def _shared_id(bucket, obj_id):
+    """The id string of the object stored under obj_id, else obj_id."""
+    obj = bucket.get(obj_id)
+    return obj_id if obj is None else obj.id
+
+
+_UNSET = object()  # a slot never assigned
+
+
+def _slot_values(obj):
+    """Every attribute of a slotted object: {slot: value}.
+
+    Only the attributes themselves are copied, not what they point to,
+    so it is cheap to take before each change.
+    """
+    values = {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            values[name] = getattr(obj, name, _UNSET)
+    return values
+
+
+def _restore_slots(obj, values):
+    """Put back the attributes saved by _slot_values()."""
+    for name, value in values.items():
+        if value is _UNSET:
+            if hasattr(obj, name):
+                delattr(obj, name)
+        else:
+            setattr(obj, name, value)
+
+
+def order_key(obj):
+    """Stable listing order: creation time, then id to break ties."""
+    return (obj.created_at, obj.id)
+
+
+# --- locking -----------------------------------------------------------------
+# Every public method takes its model's RWLock: reads share it, writes
+# are exclusive. Methods only ever lock one model at a time, except
+# transaction(), which takes its write locks in sorted order, so two
+# threads can never wait for each other.
+
+def _reads(method):
+    @functools.wraps(method)
+    def locked(self, model_name, *args, **kwargs):
+        with self._lock(model_name).read():
+            return method(self, model_name, *args, **kwargs)
+    return locked
+
+
+def _writes(method):
+    @functools.wraps(method)
+    def locked(self, model_name, *args, **kwargs):
+        with self._lock(model_name).write():
+            return method(self, model_name, *args, **kwargs)
+    return locked
 
 
 class InMemoryRepository:
-    """Keeps all objects in Python dictionaries (no database needed)."""
+    """Keeps all objects in Python dictionaries (no database needed).
 
-    def __init__(self):
+    Safe to share between threads: each model has its own reader/writer
+    lock. Objects are returned by reference and changed in place by
+    modify(), so a reader may see an update half-way through; use
+    transaction() when several objects must change together.
+    """
+
+    def __init__(self, indexes=None, list_indexes=None, sorted_indexes=None,
+                 spatial_indexes=None, cell_deg=GRID_CELL_DEG,
+                 unique_indexes=None):
         # Main storage: { "User": { "uuid1": <User obj>, ... }, ... }
         self._storage = {}
+        # Declared secondary indexes: { "Review": ("place_id", ...), ... }
+        # List fields share the same storage, one entry per element.
+        indexes = DEFAULT_INDEXES if indexes is None else indexes
+        list_indexes = (DEFAULT_LIST_INDEXES if list_indexes is None
+                        else list_indexes)
+        self._list_fields = {m: set(f) for m, f in list_indexes.items()}
+        self._index_fields = {
+            m: tuple(indexes.get(m, ())) + tuple(list_indexes.get(m, ()))
+            for m in set(indexes) | set(list_indexes)
+        }
+        # Index storage: { "Review": { "place_id": { value: {id: None} } } }
+        # The inner dict is used as an insertion-ordered set of ids.
+        self._indexes = {}
+        # The same ids as sorted (created_at, id) keys, so a page of one
+        # value is a bisect: { "Review": { "place_id": { value: [...] } } }
+        self._index_order = {}
+        # Unique indexes: { "User": { "email": { unique_key(value): id } } }
+        self._unique_fields = dict(
+            DEFAULT_UNIQUE_INDEXES if unique_indexes is None
+            else unique_indexes)
+        self._unique = {}
+        # Sorted indexes: { "Place": { "price": [(value, id), ...] } }
+        self._sorted_fields = dict(
+            DEFAULT_SORTED_INDEXES if sorted_indexes is None
+            else sorted_indexes)
+        self._sorted = {}
+        # Sorted (created_at, id) keys per model, used for pagination
+        self._order = {}
+        # Spatial grid: { "Place": { (row, col): {id: None} } }
+        self._spatial_fields = dict(
+            DEFAULT_SPATIAL_INDEXES if spatial_indexes is None
+            else spatial_indexes)
+        self._cell_deg = cell_deg
+        self._grids = {}
+        # Bucket versions, bumped on every write: { "Place": 42 }. The
+        # epoch makes versions from another process (or a restart) differ.
+        self._versions = {}
+        self.epoch = uuid.uuid4().hex[:8]
+        # Change log counter, see publish()
+        self._last_change = 0
+        self._change_lock = threading.Lock()
+        # One RWLock per model: { "Place": RWLock }
+        self._locks = {}
+        # Whether add() and modify() call _share_ids() (off while a
+        # subclass bulk-loads objects; it then calls _share_all_ids())
+        self._share = True
+        # Whether add() refuses taken unique values (off while a subclass
+        # replays a log; it then calls _rebuild_unique())
+        self._enforce_unique = True
 
-    # --- private helper ---------------------------------------------------
+    # --- private helpers --------------------------------------------------
 
     def _bucket(self, model_name):
         """Get (or create) the dict for a model type."""
-        if model_name not in self._storage:
-            self._storage[model_name] = {}
-        return self._storage[model_name]
+        return self._storage.setdefault(model_name, {})
+
+    def _lock(self, model_name):
+        """Get (or create) the RWLock of a model."""
+        lock = self._locks.get(model_name)
+        if lock is None:
+            lock = self._locks.setdefault(model_name, RWLock())
+        return lock
+
+    def _bump(self, model_name):
+        self._versions[model_name] = self._versions.get(model_name, 0) + 1
+
+    def _index(self, model_name, field):
+        """Get (or create) the index dict for one model field."""
+        model_indexes = self._indexes.setdefault(model_name, {})
+        return model_indexes.setdefault(field, {})
+
+    def _unique_index(self, model_name, field):
+        """Get (or create) the key -> id dict of a unique index."""
+        model_unique = self._unique.setdefault(model_name, {})
+        return model_unique.setdefault(field, {})
+
+    def _order_keys(self, model_name):
+        """Get (or create) the sorted list of order keys for a model."""
+        return self._order.setdefault(model_name, [])
+
+    def _value_order(self, model_name, field):
+        """Get (or create) the value -> sorted order keys dict of a field."""
+        model_order = self._index_order.setdefault(model_name, {})
+        return model_order.setdefault(field, {})
+
+    def _sorted_list(self, model_name, field):
+        """Get (or create) the sorted (value, id) list of a sorted index."""
+        model_sorted = self._sorted.setdefault(model_name, {})
+        return model_sorted.setdefault(field, [])
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self._cell_deg),
+                math.floor(lon / self._cell_deg))
+
+    def _snapshot(self, obj):
+        """Everything obj is indexed under, so changes can be diffed.
+
+        Returns { "fields": {field: value}, "sorted": {field: value},
+        "unique": {field: value}, "cell": (row, col) or None,
+        "order": (created_at, id) }. List
+        fields become tuples so a later in-place change of the list
+        cannot alter the snapshot.
+        """
+        model_name = type(obj).__name__
+        values = {}
+        for f in self._index_fields.get(model_name, ()):
+            v = getattr(obj, f, None)
+            values[f] = tuple(v) if f in self._list_fields.get(
+                model_name, ()) and v is not None else v
+        sorted_values = {f: getattr(obj, f, None)
+                         for f in self._sorted_fields.get(model_name, ())}
+        unique_values = {f: getattr(obj, f, None)
+                         for f in self._unique_fields.get(model_name, ())}
+        cell = None
+        spatial = self._spatial_fields.get(model_name)
+        if spatial is not None:
+            lat = getattr(obj, spatial[0], None)
+            lon = getattr(obj, spatial[1], None)
+            if lat is not None and lon is not None:
+                cell = self._cell(lat, lon)
+        return {"fields": values, "sorted": sorted_values,
+                "unique": unique_values, "cell": cell,
+                "order": order_key(obj)}
+
+    def _share_ids(self, obj, fields=None):
+        """Point obj's id references at the stored objects' own ids.
+
+        An id read from a request body or a saved record is a new string
+        every time. Swapping it for the equal id string of the object it
+        names leaves one copy of each id in memory, however many fields
+        and id lists refer to it. Ids of objects not stored are kept.
+        fields limits this to some of the model's REFERENCES.
+        """
+        for field, target in getattr(type(obj), "REFERENCES", {}).items():
+            if fields is not None and field not in fields:
+                continue
+            value = getattr(obj, field, None)
+            bucket = self._storage.get(target)
+            if value is None or not bucket:
+                continue
+            if isinstance(value, str):
+                setattr(obj, field, _shared_id(bucket, value))
+            else:  # an IdSet or a list
+                setattr(obj, field, type(value)(
+                    _shared_id(bucket, v) for v in value))
+
+    def _share_all_ids(self):
+        """_share_ids() every stored object, e.g. after a bulk load."""
+        for bucket in list(self._storage.values()):
+            for obj in bucket.values():
+                self._share_ids(obj)
+
+    def _rebuild_unique(self):
+        """Rebuild every unique index from the stored objects.
+
+        Raises DuplicateError if two objects hold the same value.
+        """
+        self._unique = {}
+        for model_name, fields in self._unique_fields.items():
+            for obj_id, obj in self._bucket(model_name).items():
+                snap = {"unique": {f: getattr(obj, f, None) for f in fields}}
+                self._check_unique(model_name, snap, obj_id)
+                for field, value in snap["unique"].items():
+                    if value is not None:
+                        self._unique_index(model_name, field)[
+                            unique_key(value)] = obj_id
+
+    def _check_unique(self, model_name, snap, obj_id):
+        """Raise DuplicateError if another object holds a unique value."""
+        for field, value in snap["unique"].items():
+            if value is None:
+                continue
+            owner = self._unique_index(model_name, field).get(
+                unique_key(value))
+            if owner is not None and owner != obj_id:
+                raise DuplicateError(f"{field} already in use")
+
+    def _index_add(self, model_name, snap, obj_id, only=None):
+        """Add obj_id to every index in snap (or only the changed ones)."""
+        list_fields = self._list_fields.get(model_name, ())
+        for field, value in snap["fields"].items():
+            if only is not None and ("fields", field) not in only:
+                continue
+            index = self._index(model_name, field)
+            order = self._value_order(model_name, field)
+            # A list field is indexed once per element (inverted index)
+            for v in (value or ()) if field in list_fields else (value,):
+                ids = index.setdefault(v, {})
+                if obj_id not in ids:
+                    ids[obj_id] = None
+                    insort(order.setdefault(v, []), snap["order"])
+        for field, value in snap["sorted"].items():
+            if only is not None and ("sorted", field) not in only:
+                continue
+            if value is not None:
+                insort(self._sorted_list(model_name, field), (value, obj_id))
+        for field, value in snap["unique"].items():
+            if only is not None and ("unique", field) not in only:
+                continue
+            if value is not None:
+                self._unique_index(model_name, field)[
+                    unique_key(value)] = obj_id
+        if snap["cell"] is not None and (only is None or "cell" in only):
+            grid = self._grids.setdefault(model_name, {})
+            grid.setdefault(snap["cell"], {})[obj_id] = None
+
+    def _index_remove(self, model_name, snap, obj_id, only=None):
+        """Remove obj_id from every index in snap (or only changed ones)."""
+        list_fields = self._list_fields.get(model_name, ())
+        for field, value in snap["fields"].items():
+            if only is not None and ("fields", field) not in only:
+                continue
+            index = self._index(model_name, field)
+            order = self._value_order(model_name, field)
+            for v in (value or ()) if field in list_fields else (value,):
+                ids = index.get(v)
+                if ids is None:
+                    continue
+                if ids.pop(obj_id, 0) is None:
+                    _remove_sorted(order[v], snap["order"])
+                if not ids:
+                    del index[v]
+                    del order[v]
+        for field, value in snap["sorted"].items():
+            if only is not None and ("sorted", field) not in only:
+                continue
+            if value is not None:
+                _remove_sorted(self._sorted_list(model_name, field),
+                               (value, obj_id))
+        for field, value in snap["unique"].items():
+            if only is not None and ("unique", field) not in only:
+                continue
+            index = self._unique_index(model_name, field)
+            if value is not None and index.get(unique_key(value)) == obj_id:
+                del index[unique_key(value)]
+        if snap["cell"] is not None and (only is None or "cell" in only):
+            grid = self._grids.get(model_name, {})
+            ids = grid.get(snap["cell"])
+            if ids is not None:
+                ids.pop(obj_id, None)
+                if not ids:
+                    del grid[snap["cell"]]
+
+    @staticmethod
+    def _diff(old, new):
+        """Which parts of two snapshots differ, as a set of keys."""
+        changed = set()
+        for kind in ("fields", "sorted", "unique"):
+            for field, value in new[kind].items():
+                if old[kind][field] != value:
+                    changed.add((kind, field))
+        if old["cell"] != new["cell"]:
+            changed.add("cell")
+        return changed
 
     # --- public methods ---------------------------------------------------
 
+    @contextmanager
+    def transaction(self, *model_names):
+        """Hold the write locks of several models for a block of calls.
+
+        Other threads can neither read nor write those models until the
+        block ends; calls made inside it (by this thread) lock as usual.
+        There is no rollback: validate before writing.
+        """
+        with ExitStack() as stack:
+            for model_name in sorted(set(model_names)):
+                stack.enter_context(self._lock(model_name).write())
+            yield self
+
     def add(self, obj):
-        """Save a new object."""
-        bucket = self._bucket(type(obj).__name__)
-        bucket[obj.id] = obj
+        """Save a new object.
+
+        Raises DuplicateError (saving nothing) if a unique value is
+        already taken by another object.
+        """
+        model_name = type(obj).__name__
+        with self._lock(model_name).write():
+            if self._share:
+                self._share_ids(obj)
+            snap = self._snapshot(obj)
+            if self._enforce_unique:
+                self._check_unique(model_name, snap, obj.id)
+            bucket = self._bucket(model_name)
+            old = bucket.get(obj.id)
+            if old is not None:
+                self._index_remove(model_name, self._snapshot(old), obj.id)
+                _remove_sorted(self._order_keys(model_name), order_key(old))
+            bucket[obj.id] = obj
+            self._index_add(model_name, snap, obj.id)
+            # New objects are the newest, so this is usually an append
+            insort(self._order_keys(model_name), snap["order"])
+            self._bump(model_name)
 
+    def add_many(self, objs):
+        """Save several new objects, taking each model's lock once.
+
+        There is no rollback: objects before a DuplicateError are saved.
+        """
+        objs = list(objs)
+        with self.transaction(*{type(obj).__name__ for obj in objs}):
+            for obj in objs:
+                self.add(obj)
+
+    @_reads
     def get(self, model_name, obj_id):
         """Return one object by id, or None if not found."""
         return self._bucket(model_name).get(obj_id)
 
+    @_reads
+    def get_many(self, model_name, obj_ids):
+        """Return { id: obj } for every existing id (missing ones skipped)."""
+        bucket = self._bucket(model_name)
+        found = {}
+        for obj_id in obj_ids:
+            obj = bucket.get(obj_id)
+            if obj is not None:
+                found[obj_id] = obj
+        return found
+
+    @_reads
     def get_all(self, model_name):
         """Return a list of all objects for a model."""
         return list(self._bucket(model_name).values())
 
+    @_reads
+    def find_unique(self, model_name, field, value):
+        """The object whose unique `field` matches `value`, or None (O(1))."""
+        obj_id = self._unique_index(model_name, field).get(unique_key(value))
+        return None if obj_id is None else self._bucket(model_name)[obj_id]
+
+    @_reads
+    def find_by(self, model_name, field, value):
+        """Return every object whose `field` equals `value`.
+
+        Uses the secondary index when the field is declared, so the cost
+        is proportional to the number of matches; otherwise scans.
+        """
+        if field not in self._index_fields.get(model_name, ()):
+            return [o for o in self._bucket(model_name).values()
+                    if getattr(o, field, None) == value]
+        bucket = self._bucket(model_name)
+        ids = self._index(model_name, field).get(value, {})
+        return [bucket[i] for i in ids]
+
+    @_reads
+    def count_by(self, model_name, field, value):
+        """How many objects have `field` equal to `value` (O(1) if indexed)."""
+        if field not in self._index_fields.get(model_name, ()):
+            return len(self.find_by(model_name, field, value))
+        return len(self._index(model_name, field).get(value, ()))
+
+    def _range_bounds(self, model_name, field, low, high):
+        if field not in self._sorted_fields.get(model_name, ()):
+            raise ValueError(f"{model_name}.{field} has no sorted index")
+        keys = self._sorted_list(model_name, field)
+        # (value,) sorts before every (value, id); (value, inf-ish) after
+        start = 0 if low is None else bisect_left(keys, (low,))
+        end = len(keys) if high is None else bisect_right(keys, (high, _MAX))
+        return keys, start, end
+
+    @_reads
+    def count_range(self, model_name, field, low=None, high=None):
+        """How many objects have low <= field <= high (O(log n))."""
+        _, start, end = self._range_bounds(model_name, field, low, high)
+        return max(0, end - start)
+
+    @_reads
+    def find_range(self, model_name, field, low=None, high=None):
+        """Return objects with low <= field <= high, in field order.
+
+        None means "no bound" on that side.
+        """
+        keys, start, end = self._range_bounds(model_name, field, low, high)
+        bucket = self._bucket(model_name)
+        return [bucket[obj_id] for _, obj_id in keys[start:end]]
+
+    def scan_sorted(self, model_name, field, cursor=None, descending=False):
+        """Yield objects in (field, id) order, starting after cursor.
+
+        The cursor is encode_cursor((value, id)) of the last object seen.
+        """
+        if field not in self._sorted_fields.get(model_name, ()):
+            raise ValueError(f"{model_name}.{field} has no sorted index")
+        after = decode_cursor(cursor, (float, str)) if cursor else None
+        while True:
+            # Find our place again after each batch: the list may have
+            # changed while the caller held the previous one
+            with self._lock(model_name).read():
+                keys = self._sorted_list(model_name, field)
+                if descending:
+                    end = len(keys) if after is None else bisect_left(
+                        keys, after)
+                    chunk = keys[max(0, end - SCAN_BATCH):end][::-1]
+                else:
+                    start = 0 if after is None else bisect_right(keys, after)
+                    chunk = keys[start:start + SCAN_BATCH]
+                bucket = self._bucket(model_name)
+                objs = [bucket[obj_id] for _, obj_id in chunk]
+            yield from objs
+            if len(chunk) < SCAN_BATCH:
+                return
+            after = chunk[-1]
+
+    @_reads
+    def count(self, model_name):
+        """Number of objects stored for a model."""
+        return len(self._bucket(model_name))
+
+    def scan(self, model_name, cursor=None):
+        """Yield objects in (created_at, id) order, starting after cursor.
+
+        Reads the order list one batch at a time, so callers can stop
+        early, and may write to the repository between two objects.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        while True:
+            with self._lock(model_name).read():
+                keys = self._order_keys(model_name)
+                start = 0 if after is None else bisect_right(keys, after)
+                chunk = keys[start:start + SCAN_BATCH]
+                bucket = self._bucket(model_name)
+                objs = [bucket[obj_id] for _, obj_id in chunk]
+            yield from objs
+            if len(chunk) < SCAN_BATCH:
+                return
+            after = chunk[-1]
+
+    @_reads
+    def page(self, model_name, limit, cursor=None, field=None, value=None,
+             since=None):
+        """Return (objects, next_cursor) for one page, oldest first.
+
+        Objects are ordered by (created_at, id). `cursor` is the
+        next_cursor of the previous page; next_cursor is None on the last
+        page. When `field`/`value` are given, only matching objects are
+        paged, using the secondary index when there is one. `since`
+        (epoch microseconds) leaves out objects created before it; the
+        order list is sorted by creation time, so that is one bisect.
+        """
+        after = start_key(cursor, since)
+        bucket = self._bucket(model_name)
+        if field is None:
+            keys = self._order_keys(model_name)
+        elif field in self._index_fields.get(model_name, ()):
+            keys = self._value_order(model_name, field).get(value, [])
+        else:
+            keys = sorted(order_key(o)
+                          for o in self.find_by(model_name, field, value))
+        start = 0 if after is None else bisect_right(keys, after)
+        chunk = keys[start:start + limit]
+        items = [bucket[obj_id] for _, obj_id in chunk]
+        has_more = start + limit < len(keys)
+        next_cursor = encode_cursor(chunk[-1]) if has_more and chunk else None
+        return items, next_cursor
+
+    @_reads
+    def within_bbox(self, model_name, min_lat, min_lon, max_lat, max_lon):
+        """Return objects whose position lies inside the bounding box.
+
+        Only grid cells overlapping the box are visited, so the cost
+        follows the number of objects near the box, not the bucket size.
+        The box must not cross the antimeridian (min_lon <= max_lon).
+        """
+        fields = self._spatial_fields.get(model_name)
+        if fields is None:
+            raise ValueError(f"{model_name} has no spatial index")
+        lat_f, lon_f = fields
+        grid = self._grids.get(model_name, {})
+        (row0, col0) = self._cell(min_lat, min_lon)
+        (row1, col1) = self._cell(max_lat, max_lon)
+        n_cells = (row1 - row0 + 1) * (col1 - col0 + 1)
+        if n_cells > len(grid):
+            # Huge box: cheaper to walk the occupied cells only
+            cells = [c for c in grid
+                     if row0 <= c[0] <= row1 and col0 <= c[1] <= col1]
+        else:
+            cells = [(r, c) for r in range(row0, row1 + 1)
+                     for c in range(col0, col1 + 1)]
+        bucket = self._bucket(model_name)
+        found = []
+        for cell in cells:
+            for obj_id in grid.get(cell, ()):
+                obj = bucket[obj_id]
+                lat, lon = getattr(obj, lat_f), getattr(obj, lon_f)
+                if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                    found.append(obj)
+        return found
+
     def update(self, model_name, obj_id, data):
         """Update an object's fields. Returns the object or None."""
+        return self.modify(model_name, obj_id, lambda obj: obj.update(data))
+
+    @_writes
+    def modify(self, model_name, obj_id, change):
+        """Apply change(obj) in place and keep every index in sync.
+
+        For changes the model's update() does not allow, such as linking
+        ids or rating totals. Returns the object, or None if not found.
+        A change that takes a unique value already in use is undone
+        (every attribute it assigned, not just the unique ones) and
+        raises DuplicateError.
+        """
         obj = self.get(model_name, obj_id)
         if obj is None:
             return None
-        obj.update(data)
+        old = self._snapshot(obj)
+        # Attributes are only worth saving where a change can be refused
+        saved = (_slot_values(obj) if self._unique_fields.get(model_name)
+                 else None)
+        references = {f: getattr(obj, f, None)
+                      for f in getattr(type(obj), "REFERENCES", ())}
+        duplicate = None
+        try:
+            change(obj)
+        finally:
+            if self._share:
+                # Only references the change replaced: ids added to an
+                # id list in place are already the stored ones
+                self._share_ids(obj, [f for f, v in references.items()
+                                      if getattr(obj, f, None) is not v])
+            # Re-index even if the change failed half-way through
+            new = self._snapshot(obj)
+            try:
+                self._check_unique(model_name, new, obj_id)
+            except DuplicateError as e:
+                duplicate = e
+                _restore_slots(obj, saved)
+                new = self._snapshot(obj)
+            changed = self._diff(old, new)
+            if changed:
+                self._index_remove(model_name, old, obj_id, only=changed)
+                self._index_add(model_name, new, obj_id, only=changed)
+            self._bump(model_name)
+        if duplicate is not None:
+            raise duplicate
         return obj
 
+    @_writes
+    def modify_many(self, model_name, obj_ids, change):
+        """modify() each of obj_ids with the same change(obj).
+
+        Returns the objects found (missing ids are skipped).
+        """
+        found = (self.modify(model_name, obj_id, change) for obj_id in obj_ids)
+        return [obj for obj in found if obj is not None]
+
+    @_writes
     def delete(self, model_name, obj_id):
         """Delete an object. Returns True if deleted, False if not found."""
         bucket = self._bucket(model_name)
         if obj_id not in bucket:
             return False
-        del bucket[obj_id]
+        obj = bucket.pop(obj_id)
+        self._index_remove(model_name, self._snapshot(obj), obj_id)
+        _remove_sorted(self._order_keys(model_name), order_key(obj))
+        self._bump(model_name)
         return True
 
+    # --- change log -------------------------------------------------------
+    # Only one process can use this repository, and it applies its own
+    # changes directly, so nothing is logged: publish() just hands out
+    # increasing numbers.
+
+    def publish(self, topic, key):
+        """Return a new change number (higher than every earlier one)."""
+        with self._change_lock:
+            self._last_change += 1
+            return self._last_change
+
+    def change_floor(self):
+        """Seq up to which the change log was pruned: nothing ever is."""
+        return 0
+
+    def changes_since(self, seq):
+        """Changes made by other processes: never any."""
+        return []
+
+    @_reads
+    def version(self, model_name):
+        """Opaque string that changes whenever the bucket is written to."""
+        return f"{self.epoch}.{self._versions.get(model_name, 0)}"
+
+    @_reads
     def exists(self, model_name, obj_id):
         """Check if an object exists (True/False)."""
         return obj_id in self._bucket(model_name)
@@ -0,0 +1,636 @@
+"""SQLite repository – same interface as InMemoryRepository, but on disk."""
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+from app.models.timestamps import from_iso, to_iso
+from app.persistence.repository import (
+    DEFAULT_INDEXES, DEFAULT_LIST_INDEXES, DEFAULT_SORTED_INDEXES,
+    DEFAULT_SPATIAL_INDEXES, DEFAULT_UNIQUE_INDEXES, DuplicateError,
+    decode_cursor, encode_cursor, start_key, unique_key)
+
+# Max number of "?" placeholders we put in one IN (...) query
+_BATCH_SIZE = 500
+
+# Seconds a writer waits for another connection's write to finish
+_BUSY_TIMEOUT = 30
+
+# The change log keeps about this many entries; a process that falls
+# further behind resets its caches instead of replaying them
+_CHANGE_LOG_SIZE = 10000
+
+# SQL type of indexed columns (anything not listed is TEXT)
+_COLUMN_TYPES = {
+    "latitude": "REAL",
+    "longitude": "REAL",
+    "price": "REAL",
+    "average_rating": "REAL",
+}
+
+
+class SQLiteRepository:
+    """Stores every model in its own SQLite table.
+
+    Each row keeps the indexed columns (id, timestamps, foreign keys,
+    email) next to a JSON copy of the whole object, so we can query by
+    index and still rebuild the object exactly as it was saved. List
+    fields (amenity_ids) get a side table "<Model>__<field>" with one
+    (id, value) row per element. A unique field (email) also gets a
+    "<field>_key" column holding unique_key(value), under a UNIQUE
+    index. The "_versions" table counts writes per model, for version().
+
+    Several processes (e.g. gunicorn workers) can share one database
+    file. publish() appends to the "_changes" log so the other processes
+    can drop what they cached, see changes_since().
+    """
+
+    def __init__(self, path, models, indexes=None, list_indexes=None,
+                 sorted_indexes=None, spatial_indexes=None,
+                 unique_indexes=None):
+        self._path = path
+        # { "User": User, ... } so rows can be turned back into objects
+        self._models = {cls.__name__: cls for cls in models}
+        self._index_fields = dict(DEFAULT_INDEXES if indexes is None
+                                  else indexes)
+        self._list_fields = dict(DEFAULT_LIST_INDEXES if list_indexes is None
+                                 else list_indexes)
+        self._sorted_fields = dict(
+            DEFAULT_SORTED_INDEXES if sorted_indexes is None
+            else sorted_indexes)
+        self._spatial_fields = dict(
+            DEFAULT_SPATIAL_INDEXES if spatial_indexes is None
+            else spatial_indexes)
+        self._unique_fields = dict(
+            DEFAULT_UNIQUE_INDEXES if unique_indexes is None
+            else unique_indexes)
+        # One connection per thread: sqlite3 connections must not be
+        # shared between threads.
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sql = {name: self._build_sql(name) for name in self._models}
+        self._create_schema()
+        self.epoch = self._load_epoch()
+
+    # --- connections ------------------------------------------------------
+
+    def _conn(self):
+        """Return this thread's connection (opened on first use)."""
+        if os.getpid() != self._pid:
+            # Forked (gunicorn --preload): the parent's connections must
+            # not be used here; open new ones
+            self._pid = os.getpid()
+            self._local = threading.local()
+            self._connections = []
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None -> autocommit, one statement = one commit
+            conn = sqlite3.connect(self._path, isolation_level=None,
+                                   check_same_thread=False,
+                                   timeout=_BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Close every connection opened by this repository."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # --- schema -----------------------------------------------------------
+
+    def _columns(self, model_name):
+        """Indexed columns stored next to the JSON data."""
+        return (tuple(self._index_fields.get(model_name, ()))
+                + tuple(self._sorted_fields.get(model_name, ()))
+                + tuple(self._spatial_fields.get(model_name, ())))
+
+    def _key_columns(self, model_name):
+        """Columns holding unique_key() of each unique field."""
+        return tuple(f"{f}_key"
+                     for f in self._unique_fields.get(model_name, ()))
+
+    def _build_sql(self, model_name):
+        """Build every statement for a model once.
+
+        sqlite3 keeps a per-connection cache of compiled statements keyed
+        by the SQL text, so reusing the exact same strings means each one
+        is only prepared once per connection.
+        """
+        table = f'"{model_name}"'
+        cols = (("id", "created_at", "updated_at") + self._columns(model_name)
+                + self._key_columns(model_name) + ("data",))
+        col_list = ", ".join(cols)
+        marks = ", ".join("?" for _ in cols)
+        # Not INSERT OR REPLACE: that would delete the row holding a
+        # unique value instead of failing
+        updates = ", ".join(f"{c} = excluded.{c}" for c in cols[1:])
+        return {
+            "insert": f"INSERT INTO {table} ({col_list}) VALUES ({marks}) "
+                      f"ON CONFLICT (id) DO UPDATE SET {updates}",
+            "find_unique": {
+                f: f"SELECT data FROM {table} WHERE {f}_key = ?"
+                for f in self._unique_fields.get(model_name, ())},
+            "get": f"SELECT data FROM {table} WHERE id = ?",
+            "get_all": f"SELECT data FROM {table}",
+            "page": f"SELECT created_at, id, data FROM {table} "
+                    f"WHERE (created_at, id) > (?, ?) "
+                    f"ORDER BY created_at, id LIMIT ?",
+            "delete": f"DELETE FROM {table} WHERE id = ?",
+            "exists": f"SELECT 1 FROM {table} WHERE id = ?",
+        }
+
+    def _create_schema(self):
+        conn = self._conn()
+        # The random epoch is set once per model, so versions of a
+        # re-created database never match the old ones
+        conn.execute("CREATE TABLE IF NOT EXISTS _versions ("
+                     "model TEXT PRIMARY KEY, version INTEGER NOT NULL, "
+                     "epoch TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS _changes ("
+                     "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                     "topic TEXT NOT NULL, key TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS _meta ("
+                     "key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        for model_name in self._models:
+            columns = self._columns(model_name)
+            extra = "".join(f", {c} {_COLUMN_TYPES.get(c, 'TEXT')}"
+                            for c in columns)
+            conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{model_name}" ('
+                f"id TEXT PRIMARY KEY, created_at TEXT NOT NULL, "
+                f"updated_at TEXT NOT NULL{extra}, data TEXT NOT NULL)")
+            self._add_missing_columns(conn, model_name, columns)
+            conn.execute(
+                f'CREATE INDEX IF NOT EXISTS "ix_{model_name}_order" '
+                f'ON "{model_name}" (created_at, id)')
+            for col in (self._index_fields.get(model_name, ())
+                        + self._sorted_fields.get(model_name, ())):
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{model_name}_{col}" '
+                    f'ON "{model_name}" ({col})')
+            self._add_unique_columns(conn, model_name)
+            spatial = self._spatial_fields.get(model_name)
+            if spatial:
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{model_name}_spatial" '
+                    f'ON "{model_name}" ({spatial[0]}, {spatial[1]})')
+            for field in self._list_fields.get(model_name, ()):
+                link = f'"{model_name}__{field}"'
+                is_new = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                    "AND name = ?", (f"{model_name}__{field}",)
+                ).fetchone() is None
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {link} "
+                             f"(id TEXT NOT NULL, value TEXT NOT NULL)")
+                if is_new:  # fill it from rows saved before it existed
+                    conn.execute(
+                        f"INSERT INTO {link} (id, value) "
+                        f'SELECT t.id, j.value FROM "{model_name}" t, '
+                        f"json_each(t.data, '$.{field}') j")
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{model_name}__{field}" '
+                    f"ON {link} (value, id)")
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "ix_{model_name}__{field}_id"'
+                    f" ON {link} (id)")
+
+    def _add_missing_columns(self, conn, model_name, columns):
+        """Add index columns declared after the table was created.
+
+        New columns are filled from the JSON copy of each row.
+        """
+        existing = {row[1] for row in
+                    conn.execute(f'PRAGMA table_info("{model_name}")')}
+        for col in columns:
+            if col in existing:
+                continue
+            conn.execute(f'ALTER TABLE "{model_name}" ADD COLUMN '
+                         f"{col} {_COLUMN_TYPES.get(col, 'TEXT')}")
+            conn.execute(f'UPDATE "{model_name}" '
+                         f"SET {col} = json_extract(data, '$.{col}')")
+
+    def _add_unique_columns(self, conn, model_name):
+        """Add (and fill) the key column and UNIQUE index of unique fields.
+
+        Fails with ValueError if rows saved before the index existed
+        already share a value.
+        """
+        existing = {row[1] for row in
+                    conn.execute(f'PRAGMA table_info("{model_name}")')}
+        for field in self._unique_fields.get(model_name, ()):
+            col = f"{field}_key"
+            if col not in existing:
+                conn.execute(f'ALTER TABLE "{model_name}" ADD COLUMN '
+                             f"{col} TEXT")
+                rows = conn.execute(
+                    f"SELECT id, json_extract(data, '$.{field}') "
+                    f'FROM "{model_name}"').fetchall()
+                conn.executemany(
+                    f'UPDATE "{model_name}" SET {col} = ? WHERE id = ?',
+                    [(unique_key(value), obj_id) for obj_id, value in rows])
+            try:
+                conn.execute(
+                    f'CREATE UNIQUE INDEX IF NOT EXISTS '
+                    f'"ux_{model_name}_{field}" ON "{model_name}" ({col})')
+            except sqlite3.IntegrityError:
+                raise ValueError(f"{model_name}.{field} has duplicate "
+                                 "values; fix them before starting")
+
+    # --- private helpers --------------------------------------------------
+
+    @contextmanager
+    def _atomic(self):
+        """Run several statements as one unit (nests inside transactions)."""
+        conn = self._conn()
+        conn.execute("SAVEPOINT atomic")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO atomic")
+            conn.execute("RELEASE atomic")
+            raise
+        conn.execute("RELEASE atomic")
+
+    @staticmethod
+    def _bump(conn, model_name):
+        conn.execute(
+            "INSERT INTO _versions (model, version, epoch) "
+            "VALUES (?, 1, lower(hex(randomblob(4)))) "
+            "ON CONFLICT (model) DO UPDATE SET version = version + 1",
+            (model_name,))
+
+    @contextmanager
+    def transaction(self, *model_names):
+        """Run a block of calls as one transaction.
+
+        BEGIN IMMEDIATE takes SQLite's write lock up front, so other
+        writers wait (and readers keep reading the last commit) until
+        the block ends; an exception rolls everything back. model_names
+        are accepted for interface parity with InMemoryRepository.
+        """
+        conn = self._conn()
+        if conn.in_transaction:  # nested: a savepoint is enough
+            with self._atomic():
+                yield self
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _row(self, obj):
+        """Turn an object into the parameter tuple for an INSERT.
+
+        The timestamp columns hold ISO strings, as in databases created
+        before timestamps were ints, so the (created_at, id) order index
+        stays valid; the JSON copy keeps the ints.
+        """
+        record = obj.to_record()
+        cols = self._columns(type(obj).__name__)
+        return ((obj.id, to_iso(obj.created_at), to_iso(obj.updated_at))
+                + tuple(record.get(c) for c in cols)
+                + tuple(unique_key(record.get(f)) for f in
+                        self._unique_fields.get(type(obj).__name__, ()))
+                + (json.dumps(record),))
+
+    def _duplicate(self, model_name, error):
+        """DuplicateError for a UNIQUE failure on a key column, or None."""
+        for field in self._unique_fields.get(model_name, ()):
+            if f"{model_name}.{field}_key" in str(error):
+                return DuplicateError(f"{field} already in use")
+        return None
+
+    def _load(self, model_name, data):
+        return self._models[model_name].from_record(json.loads(data))
+
+    # --- public methods ---------------------------------------------------
+
+    def add(self, obj):
+        """Save a new object."""
+        model_name = type(obj).__name__
+        # Row, link rows and version must change together
+        with self._atomic() as conn:
+            try:
+                conn.execute(self._sql[model_name]["insert"], self._row(obj))
+            except sqlite3.IntegrityError as e:
+                raise self._duplicate(model_name, e) or e
+            for field in self._list_fields.get(model_name, ()):
+                link = f'"{model_name}__{field}"'
+                conn.execute(f"DELETE FROM {link} WHERE id = ?", (obj.id,))
+                conn.executemany(
+                    f"INSERT INTO {link} (id, value) VALUES (?, ?)",
+                    [(obj.id, v) for v in getattr(obj, field, None) or ()])
+            self._bump(conn, model_name)
+
+    def add_many(self, objs):
+        """Save several new objects in one transaction (all or none)."""
+        by_model = {}
+        for obj in objs:
+            by_model.setdefault(type(obj).__name__, []).append(obj)
+        with self._atomic() as conn:
+            for model_name, group in by_model.items():
+                try:
+                    conn.executemany(self._sql[model_name]["insert"],
+                                     [self._row(obj) for obj in group])
+                except sqlite3.IntegrityError as e:
+                    raise self._duplicate(model_name, e) or e
+                for field in self._list_fields.get(model_name, ()):
+                    link = f'"{model_name}__{field}"'
+                    conn.executemany(f"DELETE FROM {link} WHERE id = ?",
+                                     [(obj.id,) for obj in group])
+                    conn.executemany(
+                        f"INSERT INTO {link} (id, value) VALUES (?, ?)",
+                        [(obj.id, v) for obj in group
+                         for v in getattr(obj, field, None) or ()])
+                self._bump(conn, model_name)
+
+    def get(self, model_name, obj_id):
+        """Return one object by id, or None if not found."""
+        row = self._conn().execute(
+            self._sql[model_name]["get"], (obj_id,)).fetchone()
+        return None if row is None else self._load(model_name, row[0])
+
+    def get_many(self, model_name, obj_ids):
+        """Return { id: obj } for every existing id (missing ones skipped)."""
+        ids = list(dict.fromkeys(obj_ids))
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(ids), _BATCH_SIZE):
+            chunk = ids[start:start + _BATCH_SIZE]
+            marks = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f'SELECT id, data FROM "{model_name}" WHERE id IN ({marks})',
+                chunk)
+            for obj_id, data in rows:
+                found[obj_id] = self._load(model_name, data)
+        return found
+
+    def get_all(self, model_name):
+        """Return a list of all objects for a model."""
+        rows = self._conn().execute(self._sql[model_name]["get_all"])
+        return [self._load(model_name, data) for (data,) in rows]
+
+    def find_unique(self, model_name, field, value):
+        """The object whose unique `field` matches `value`, or None."""
+        row = self._conn().execute(
+            self._sql[model_name]["find_unique"][field],
+            (unique_key(value),)).fetchone()
+        return None if row is None else self._load(model_name, row[0])
+
+    def _where(self, model_name, field):
+        """SQL condition matching `field = ?` using the best index."""
+        if field in self._list_fields.get(model_name, ()):
+            return (f'id IN (SELECT id FROM "{model_name}__{field}" '
+                    f"WHERE value = ?)")
+        return f"{field} = ?"
+
+    def find_by(self, model_name, field, value):
+        """Return every object whose `field` equals `value`."""
+        if field in self._list_fields.get(model_name, ()):
+            rows = self._conn().execute(
+                f'SELECT data FROM "{model_name}" '
+                f"WHERE {self._where(model_name, field)}", (value,))
+            return [self._load(model_name, data) for (data,) in rows]
+        if field not in self._columns(model_name):
+            return [o for o in self.get_all(model_name)
+                    if getattr(o, field, None) == value]
+        rows = self._conn().execute(
+            f'SELECT data FROM "{model_name}" WHERE {field} = ?', (value,))
+        return [self._load(model_name, data) for (data,) in rows]
+
+    def count_by(self, model_name, field, value):
+        """How many objects have `field` equal to `value`."""
+        if field in self._list_fields.get(model_name, ()):
+            sql = (f'SELECT COUNT(*) FROM "{model_name}__{field}" '
+                   f"WHERE value = ?")
+        elif field in self._columns(model_name):
+            sql = f'SELECT COUNT(*) FROM "{model_name}" WHERE {field} = ?'
+        else:
+            return len(self.find_by(model_name, field, value))
+        return self._conn().execute(sql, (value,)).fetchone()[0]
+
+    def _range_where(self, model_name, field, low, high):
+        if field not in self._sorted_fields.get(model_name, ()):
+            raise ValueError(f"{model_name}.{field} has no sorted index")
+        conds, params = [], []
+        if low is not None:
+            conds.append(f"{field} >= ?")
+            params.append(low)
+        if high is not None:
+            conds.append(f"{field} <= ?")
+            params.append(high)
+        return " AND ".join(conds) or f"{field} IS NOT NULL", params
+
+    def count_range(self, model_name, field, low=None, high=None):
+        """How many objects have low <= field <= high."""
+        where, params = self._range_where(model_name, field, low, high)
+        return self._conn().execute(
+            f'SELECT COUNT(*) FROM "{model_name}" WHERE {where}',
+            params).fetchone()[0]
+
+    def find_range(self, model_name, field, low=None, high=None):
+        """Return objects with low <= field <= high, in field order."""
+        where, params = self._range_where(model_name, field, low, high)
+        rows = self._conn().execute(
+            f'SELECT data FROM "{model_name}" WHERE {where} '
+            f"ORDER BY {field}, id", params)
+        return [self._load(model_name, data) for (data,) in rows]
+
+    def scan_sorted(self, model_name, field, cursor=None, descending=False,
+                    batch_size=_BATCH_SIZE):
+        """Yield objects in (field, id) order, starting after cursor."""
+        if field not in self._sorted_fields.get(model_name, ()):
+            raise ValueError(f"{model_name}.{field} has no sorted index")
+        after = decode_cursor(cursor, (float, str)) if cursor else None
+        op, direction = ("<", "DESC") if descending else (">", "ASC")
+        while True:
+            where = f"WHERE ({field}, id) {op} (?, ?)" if after else ""
+            rows = self._conn().execute(
+                f'SELECT {field}, id, data FROM "{model_name}" {where} '
+                f"ORDER BY {field} {direction}, id {direction} LIMIT ?",
+                (after or ()) + (batch_size,)).fetchall()
+            for _, _, data in rows:
+                yield self._load(model_name, data)
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][:2]
+
+    def count(self, model_name):
+        """Number of objects stored for a model."""
+        return self._conn().execute(
+            f'SELECT COUNT(*) FROM "{model_name}"').fetchone()[0]
+
+    def scan(self, model_name, cursor=None, batch_size=_BATCH_SIZE):
+        """Yield objects in (created_at, id) order, starting after cursor.
+
+        Rows are fetched one batch at a time with a keyset query, so
+        memory stays flat however big the table is.
+        """
+        while True:
+            items, cursor = self.page(model_name, batch_size, cursor)
+            yield from items
+            if cursor is None:
+                return
+
+    def page(self, model_name, limit, cursor=None, field=None, value=None,
+             since=None):
+        """Return (objects, next_cursor) for one page, oldest first."""
+        after = start_key(cursor, since)
+        after = ("", "") if after is None else (to_iso(after[0]), after[1])
+        if field is None:
+            rows = self._conn().execute(
+                self._sql[model_name]["page"], after + (limit + 1,))
+        else:
+            if (field not in self._columns(model_name)
+                    and field not in self._list_fields.get(model_name, ())):
+                raise ValueError(f"{field} is not indexed")
+            rows = self._conn().execute(
+                f'SELECT created_at, id, data FROM "{model_name}" '
+                f"WHERE {self._where(model_name, field)} "
+                f"AND (created_at, id) > (?, ?) "
+                f"ORDER BY created_at, id LIMIT ?",
+                (value,) + after + (limit + 1,))
+        rows = rows.fetchall()
+        # We asked for one extra row just to know if there is a next page
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            created_at, obj_id = rows[-1][:2]
+            next_cursor = encode_cursor((from_iso(created_at), obj_id))
+        items = [self._load(model_name, data) for _, _, data in rows]
+        return items, next_cursor
+
+    def within_bbox(self, model_name, min_lat, min_lon, max_lat, max_lon):
+        """Return objects whose position lies inside the bounding box."""
+        fields = self._spatial_fields.get(model_name)
+        if fields is None:
+            raise ValueError(f"{model_name} has no spatial index")
+        lat_f, lon_f = fields
+        rows = self._conn().execute(
+            f'SELECT data FROM "{model_name}" '
+            f"WHERE {lat_f} BETWEEN ? AND ? AND {lon_f} BETWEEN ? AND ?",
+            (min_lat, max_lat, min_lon, max_lon))
+        return [self._load(model_name, data) for (data,) in rows]
+
+    def update(self, model_name, obj_id, data):
+        """Update an object's fields. Returns the object or None."""
+        return self.modify(model_name, obj_id, lambda obj: obj.update(data))
+
+    def modify(self, model_name, obj_id, change):
+        """Apply change(obj) and write the object back.
+
+        For changes the model's update() does not allow, such as linking
+        ids or rating totals. Returns the object, or None if not found.
+        """
+        # Read and write in one transaction, or two threads changing the
+        # same row would each overwrite the other's change
+        with self.transaction(model_name):
+            obj = self.get(model_name, obj_id)
+            if obj is None:
+                return None
+            change(obj)  # raises before anything is written if invalid
+            self.add(obj)
+        return obj
+
+    def modify_many(self, model_name, obj_ids, change):
+        """modify() each of obj_ids with the same change(obj).
+
+        One read and one write for all of them. Returns the objects
+        found (missing ids are skipped).
+        """
+        with self.transaction(model_name):
+            objs = list(self.get_many(model_name, obj_ids).values())
+            for obj in objs:
+                change(obj)
+            self.add_many(objs)
+        return objs
+
+    def delete(self, model_name, obj_id):
+        """Delete an object. Returns True if deleted, False if not found."""
+        with self._atomic() as conn:
+            cur = conn.execute(self._sql[model_name]["delete"], (obj_id,))
+            for field in self._list_fields.get(model_name, ()):
+                conn.execute(
+                    f'DELETE FROM "{model_name}__{field}" WHERE id = ?',
+                    (obj_id,))
+            if cur.rowcount > 0:
+                self._bump(conn, model_name)
+        return cur.rowcount > 0
+
+    # --- cross-process change log ------------------------------------------
+
+    def _load_epoch(self):
+        """Random id of this database, created with it."""
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO _meta (key, value) "
+                     "VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],))
+        return conn.execute(
+            "SELECT value FROM _meta WHERE key = 'epoch'").fetchone()[0]
+
+    def publish(self, topic, key):
+        """Log that `key` changed, for other processes. Returns its seq."""
+        conn = self._conn()
+        seq = conn.execute("INSERT INTO _changes (topic, key) VALUES (?, ?)",
+                           (topic, key)).lastrowid
+        if seq % 1000 == 0:
+            conn.execute("DELETE FROM _changes WHERE seq <= ?",
+                         (seq - _CHANGE_LOG_SIZE,))
+        return seq
+
+    def change_floor(self):
+        """Seq up to which the change log was pruned (0 if it never was).
+
+        Every change after it is still in the log, so processes reading
+        the log at the same time agree on it.
+        """
+        row = self._conn().execute("SELECT MIN(seq) FROM _changes").fetchone()
+        return row[0] - 1 if row[0] else 0
+
+    def changes_since(self, seq):
+        """Return [(seq, topic, key)] logged after `seq`, oldest first.
+
+        Returns None if entries after `seq` were already pruned: the
+        caller missed changes and must drop everything it cached.
+        """
+        conn = self._conn()
+        # data_version only moves when another connection commits, so the
+        # common "nothing new" case costs no table access
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == getattr(self._local, "data_version", None):
+            return []
+        rows = conn.execute(
+            "SELECT seq, topic, key FROM _changes WHERE seq > ? "
+            "ORDER BY seq", (seq,)).fetchall()
+        if seq and rows and rows[0][0] > seq + 1:
+            # seq + 1 was pruned; the caller's next read must not be
+            # skipped as "nothing new"
+            return None
+        self._local.data_version = data_version
+        return rows
+
+    def version(self, model_name):
+        """Opaque string that changes whenever the table is written to."""
+        row = self._conn().execute(
+            "SELECT epoch, version FROM _versions WHERE model = ?",
+            (model_name,)).fetchone()
+        return "0" if row is None else f"{row[0]}.{row[1]}"
+
+    def exists(self, model_name, obj_id):
+        """Check if an object exists (True/False)."""
+        row = self._conn().execute(
+            self._sql[model_name]["exists"], (obj_id,)).fetchone()
+        return row is not None
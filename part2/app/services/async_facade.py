@@ -0,0 +1,69 @@
+"""Async variant of the facade, used by the ASGI front end (asgi.py).
+
+AsyncFacade exposes every public HBnBFacade method as a coroutine
+function. Calls that only touch memory run right away on the event
+loop: they never wait for I/O, so handing them to a thread would only
+add a context switch. Calls that do wait for I/O (every SQLite query,
+the durable backend's log writes) run in a thread pool, so the event
+loop keeps serving other connections meanwhile. SQLite gives each
+thread its own connection, so the pool threads never share one.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from app.persistence.durable_repository import DurableRepository
+from app.persistence.repository import InMemoryRepository
+
+# Facade methods that only read; everything else may write
+READS = frozenset({
+    "get_user", "get_user_by_email", "list_users",
+    "get_amenity", "list_amenities",
+    "get_place", "list_places", "search_places", "extend_places",
+    "get_review", "list_reviews_for_place",
+    "place_version", "collection_version",
+})
+
+
+def blocking_calls(repo):
+    """(reads block, writes block) for a repository backend."""
+    repo = getattr(repo, "wrapped", repo)  # metrics' CountingRepository
+    if isinstance(repo, DurableRepository):
+        # Data in memory, writes appended to the log. Writers wait for
+        # the disk after releasing their locks, except in "always" mode,
+        # where a read may wait behind a writer's fsync.
+        return repo.sync == "always", True
+    if isinstance(repo, InMemoryRepository):
+        return False, False
+    return True, True
+
+
+class AsyncFacade:
+    """Coroutine versions of an HBnBFacade's methods."""
+
+    def __init__(self, facade, threads=16):
+        self.facade = facade
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix="hbnb-async")
+
+    def __getattr__(self, name):
+        method = getattr(self.facade, name)
+        if name.startswith("_") or not callable(method):
+            return method
+        reads_block, writes_block = blocking_calls(self.facade.repo)
+        if reads_block if name in READS else writes_block:
+            executor = self.executor
+
+            async def call(*args, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    executor, functools.partial(method, *args, **kwargs))
+        else:
+            async def call(*args, **kwargs):
+                return method(*args, **kwargs)
+        # Cached on the instance, so __getattr__ runs once per method
+        self.__dict__[name] = call
+        return call
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -1,9 +1,115 @@
 """Facade – the only way the API talks to the data layer."""
-from app.persistence.repository import InMemoryRepository
+from itertools import islice
+
+from config import get_config
+from app.persistence.repository import (
+    DuplicateError, InMemoryRepository, decode_cursor, encode_cursor,
+    order_key, unique_key)
+from app.persistence.durable_repository import DurableRepository
+from app.persistence.sqlite_repository import SQLiteRepository
 from app.models.user import User
 from app.models.amenity import Amenity
 from app.models.place import Place
 from app.models.review import Review
+from app.services.cache import LRUCache
+from app.services.geo import bboxes_around, haversine_km, split_bbox
+
+MODELS = (User, Amenity, Place, Review)
+
+# When the most selective place filter still matches more than 1/SCAN_RATIO
+# of all places, walking places in listing order finds a page faster than
+# loading and sorting every candidate.
+SCAN_RATIO = 4
+
+# export_*() extend and yield this many objects at a time
+EXPORT_BATCH = 100
+
+# Related data an extended place can embed (all of it by default)
+PLACE_EMBEDS = ("owner", "amenities", "reviews")
+
+
+def create_repository(config):
+    """Build the storage backend selected by config.REPOSITORY."""
+    if config.REPOSITORY == "memory":
+        return InMemoryRepository()
+    if config.REPOSITORY == "sqlite":
+        return SQLiteRepository(config.SQLITE_PATH, MODELS)
+    if config.REPOSITORY == "durable":
+        return DurableRepository(config.DURABLE_DIR, MODELS,
+                                 sync=config.DURABLE_SYNC,
+                                 snapshot_every=config.DURABLE_SNAPSHOT_EVERY)
+    raise ValueError(f"unknown repository backend {config.REPOSITORY!r}")
+
+
+def _build_batch(items, build):
+    """Call build(data) for each item: (objects, [(index, message)]).
+
+    objects has None where build raised.
+    """
+    objs, errors = [], []
+    for i, data in enumerate(items):
+        try:
+            objs.append(build(data))
+        except ValueError as e:
+            objs.append(None)
+            errors.append((i, str(e)))
+    return objs, errors
+
+
+def _check_batch(objs, errors, check):
+    """Call check(obj) on each object _build_batch built.
+
+    An object whose check raises ValueError is replaced by None and its
+    error added, as if its build had failed; errors stay in item order.
+    """
+    for i, obj in enumerate(objs):
+        if obj is None:
+            continue
+        try:
+            check(obj)
+        except ValueError as e:
+            objs[i] = None
+            errors.append((i, str(e)))
+    errors.sort(key=lambda error: error[0])
+
+
+def _batches(iterable, size):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _group_ids(objs, field):
+    """{ value of field: [ids of objs with it] } (None objs skipped)."""
+    groups = {}
+    for obj in objs:
+        if obj is not None:
+            groups.setdefault(getattr(obj, field), []).append(obj.id)
+    return groups
+
+
+def _rating_key(place):
+    """Sort key of the sort=rating listing (walked in descending order)."""
+    return (place.average_rating, place.id)
+
+
+def _trim_place(extended, embed, reviews_limit):
+    """Copy of a full extended place with only `embed` and capped reviews."""
+    d = {k: v for k, v in extended.items()
+         if k not in PLACE_EMBEDS or k in embed}
+    if "reviews" in d and reviews_limit is not None:
+        d["reviews"] = d["reviews"][:reviews_limit]
+    return d
+
+
+def _take_page(ordered, limit, key):
+    """Take one page from an ordered iterable: (items, next_cursor)."""
+    page = list(islice(ordered, limit + 1))
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(key(page[-1]))
 
 
 class HBnBFacade:
@@ -12,192 +118,676 @@ class HBnBFacade:
     The API never touches the repository directly.
     """
 
-    def __init__(self):
-        self.repo = InMemoryRepository()
+    def __init__(self, config=None):
+        config = config or get_config()
+        self.repo = create_repository(config)
+        # Extended place documents served by get_place(), keyed by place
+        # id. Every method that changes what such a document shows calls
+        # one of the _*_changed() hooks below.
+        self.place_cache = LRUCache(config.PLACE_CACHE_SIZE,
+                                    config.PLACE_CACHE_TTL)
+        # Set by the same hooks, since a place's ETag must change when
+        # its owner, amenities or reviews do: { place_id: change seq }.
+        # Seqs come from the repository's change log, read in full at
+        # startup, so every process sharing a database agrees on them;
+        # places with no change left in the log get the log's floor
+        # (see place_version()).
+        self._place_revisions = {}
+        self._load_revisions()
 
     # ------------------------------------------------------------------
     # Users
     # ------------------------------------------------------------------
 
-    def create_user(self, data):
-        user = User(
-            first_name=data["first_name"],
-            last_name=data["last_name"],
-            email=data["email"],
-            password=data["password"],
+    @staticmethod
+    def _new_user(data):
+        # Missing fields are None, which the model refuses
+        return User(
+            first_name=data.get("first_name"),
+            last_name=data.get("last_name"),
+            email=data.get("email"),
+            password=data.get("password"),
         )
+
+    def create_user(self, data):
+        """Create a user; DuplicateError if the email is already taken."""
+        user = self._new_user(data)
         self.repo.add(user)
         return user
 
+    def create_users(self, items, atomic=True):
+        """Create many users at once (see _insert_batch).
+
+        An email already registered, or used twice in the batch, makes
+        its item fail like any invalid one; each check is one lookup in
+        the repository's unique email index.
+        """
+        with self.repo.transaction("User"):
+            emails = set()
+
+            def build(data):
+                user = self._new_user(data)
+                key = unique_key(user.email)
+                if (key in emails or self.repo.find_unique(
+                        "User", "email", user.email) is not None):
+                    raise DuplicateError("email already in use")
+                emails.add(key)
+                return user
+
+            users, errors = _build_batch(items, build)
+            return self._insert_batch(users, errors, atomic)
+
     def get_user(self, user_id):
         return self.repo.get("User", user_id)
 
-    def list_users(self):
-        return self.repo.get_all("User")
+    def get_user_by_email(self, email):
+        """The user registered with this email (any case), or None."""
+        return self.repo.find_unique("User", "email", email)
+
+    def list_users(self, limit, cursor=None):
+        """Return (users, next_cursor) for one page of users."""
+        return self.repo.page("User", limit, cursor)
+
+    def export_users(self):
+        """Yield every user, oldest first, without building a list."""
+        return self.repo.scan("User")
 
     def update_user(self, user_id, data):
-        return self.repo.update("User", user_id, data)
+        user = self.repo.get("User", user_id)
+        if user is None:
+            return None
+        old_name = (user.first_name, user.last_name)
+        try:
+            user = self.repo.update("User", user_id, data)
+        finally:
+            # Places embed their owner's name
+            if (user.first_name, user.last_name) != old_name:
+                self._owner_changed(user_id)
+        return user
 
     # ------------------------------------------------------------------
     # Amenities
     # ------------------------------------------------------------------
 
     def create_amenity(self, data):
-        amenity = Amenity(name=data["name"])
+        amenity = Amenity(name=data.get("name"))
         self.repo.add(amenity)
         return amenity
 
+    def create_amenities(self, items, atomic=True):
+        """Create many amenities at once (see _insert_batch)."""
+        amenities, errors = _build_batch(
+            items, lambda data: Amenity(name=data.get("name")))
+        return self._insert_batch(amenities, errors, atomic)
+
     def get_amenity(self, amenity_id):
         return self.repo.get("Amenity", amenity_id)
 
-    def list_amenities(self):
-        return self.repo.get_all("Amenity")
+    def list_amenities(self, limit, cursor=None):
+        """Return (amenities, next_cursor) for one page of amenities."""
+        return self.repo.page("Amenity", limit, cursor)
 
     def update_amenity(self, amenity_id, data):
-        return self.repo.update("Amenity", amenity_id, data)
+        amenity = self.repo.update("Amenity", amenity_id, data)
+        if amenity is not None:
+            self._amenity_changed(amenity_id)
+        return amenity
 
     # ------------------------------------------------------------------
     # Places
     # ------------------------------------------------------------------
 
     def create_place(self, data):
-        # Make sure the owner exists before creating the place
-        if not self.repo.exists("User", data.get("owner_id", "")):
-            raise ValueError("owner not found")
+        # Checks, the new place and the owner's link happen as one step
+        with self.repo.transaction("Amenity", "Place", "User"):
+            place = self._new_place(data)  # checks the fields' values
 
-        # Make sure every amenity id exists
-        for aid in data.get("amenity_ids", []):
-            if not self.repo.exists("Amenity", aid):
-                raise ValueError(f"amenity {aid} not found")
+            # Make sure the owner exists before saving the place
+            if not self.repo.exists("User", place.owner_id):
+                raise ValueError("owner not found")
 
-        place = Place(
-            title=data["title"],
-            description=data.get("description", ""),
-            price=data["price"],
-            latitude=data["latitude"],
-            longitude=data["longitude"],
-            owner_id=data["owner_id"],
-            amenity_ids=data.get("amenity_ids", []),
-        )
-        self.repo.add(place)
+            # Make sure every amenity id exists
+            for aid in place.amenity_ids:
+                if not self.repo.exists("Amenity", aid):
+                    raise ValueError(f"amenity {aid} not found")
 
-        # Add this place to the owner's list
-        owner = self.repo.get("User", data["owner_id"])
-        if owner and place.id not in owner.place_ids:
-            owner.place_ids.append(place.id)
+            self.repo.add(place)
+
+            # Add this place to the owner's list
+            self.repo.modify("User", place.owner_id,
+                             lambda owner: owner.place_ids.add(place.id))
 
         return place
 
-    def get_place(self, place_id):
-        """Return place with owner info and amenities list included."""
+    @staticmethod
+    def _new_place(data):
+        return Place(
+            title=data.get("title"),
+            description=data.get("description"),
+            price=data.get("price"),
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude"),
+            owner_id=data.get("owner_id"),
+            amenity_ids=data.get("amenity_ids"),
+        )
+
+    def create_places(self, items, atomic=True):
+        """Create many places at once (see _insert_batch).
+
+        Owners and amenities of the whole batch are looked up with one
+        get_many() per model, and each owner is updated once.
+        """
+        with self.repo.transaction("Amenity", "Place", "User"):
+            places, errors = _build_batch(items, self._new_place)
+            built = [p for p in places if p is not None]
+            owners = self.repo.get_many(
+                "User", {p.owner_id for p in built})
+            amenities = self.repo.get_many(
+                "Amenity", {aid for p in built for aid in p.amenity_ids})
+
+            def check(place):
+                if place.owner_id not in owners:
+                    raise ValueError("owner not found")
+                for aid in place.amenity_ids:
+                    if aid not in amenities:
+                        raise ValueError(f"amenity {aid} not found")
+
+            _check_batch(places, errors, check)
+            places, errors = self._insert_batch(places, errors, atomic)
+            by_owner = _group_ids(places, "owner_id")
+
+            def link(owner):
+                for place_id in by_owner[owner.id]:
+                    owner.place_ids.add(place_id)
+
+            self.repo.modify_many("User", by_owner, link)
+        return places, errors
+
+    def get_place(self, place_id, embed=PLACE_EMBEDS, reviews_limit=None):
+        """Return place with owner info and amenities list included.
+
+        embed and reviews_limit are as for extend_places(). The full
+        document comes from place_cache when possible; treat it as
+        read-only since it is shared between requests. A partial one is
+        cut from the cached document if there is one, else built without
+        the lookups it does not need (and not cached).
+        """
+        self._sync()
+        full = set(embed) >= set(PLACE_EMBEDS) and reviews_limit is None
+        cached = self.place_cache.get(place_id)
+        if cached is not None:
+            return cached if full else _trim_place(cached, embed,
+                                                   reviews_limit)
+        revision = self._place_revisions.get(place_id)
         place = self.repo.get("Place", place_id)
         if place is None:
             return None
-        return self._extend_place(place)
-
-    def list_places(self):
-        return [self._extend_place(p) for p in self.repo.get_all("Place")]
+        if not full:
+            return self.extend_places([place], embed, reviews_limit)[0]
+        extended = self._extend_place(place)
+        self.place_cache.set(place_id, extended)
+        if self._place_revisions.get(place_id) != revision:
+            # Changed by another thread while we built it: may be stale
+            self.place_cache.invalidate(place_id)
+        return extended
+
+    def list_places(self, limit, cursor=None, min_price=None,
+                    max_price=None, amenity_ids=None, sort=None,
+                    embed=PLACE_EMBEDS, reviews_limit=None):
+        """Return (extended places, next_cursor) for one page of places.
+
+        Optional filters: price between min_price and max_price
+        (inclusive) and every id in amenity_ids offered. sort="rating"
+        lists the best rated places first instead of the oldest.
+        embed and reviews_limit are as for extend_places().
+        """
+        if sort not in (None, "rating"):
+            raise ValueError("sort must be 'rating'")
+        if min_price is None and max_price is None and not amenity_ids:
+            if sort == "rating":
+                places, next_cursor = _take_page(
+                    self.repo.scan_sorted("Place", "average_rating", cursor,
+                                          descending=True),
+                    limit, _rating_key)
+            else:
+                places, next_cursor = self.repo.page("Place", limit, cursor)
+        else:
+            places, next_cursor = self._filter_places(
+                limit, cursor, min_price, max_price, amenity_ids or [], sort)
+        return self.extend_places(places, embed, reviews_limit), next_cursor
+
+    def _filter_places(self, limit, cursor, min_price, max_price,
+                       amenity_ids, sort=None):
+        """One page of places matching every filter, in listing order.
+
+        Each filter is a candidate set whose size the repository knows
+        cheaply (a bisect on the price index, the length of an amenity's
+        inverted index). Only the smallest set is loaded; the other
+        filters are checked on each of its places.
+        """
+        has_price = min_price is not None or max_price is not None
+        candidates = []  # (size, loader)
+        if has_price:
+            candidates.append((
+                self.repo.count_range("Place", "price", min_price, max_price),
+                lambda: self.repo.find_range(
+                    "Place", "price", min_price, max_price)))
+        for aid in amenity_ids:
+            candidates.append((
+                self.repo.count_by("Place", "amenity_ids", aid),
+                lambda aid=aid: self.repo.find_by(
+                    "Place", "amenity_ids", aid)))
+        size, load = min(candidates, key=lambda c: c[0])
+
+        def matches(place):
+            if min_price is not None and place.price < min_price:
+                return False
+            if max_price is not None and place.price > max_price:
+                return False
+            return all(aid in place.amenity_ids for aid in amenity_ids)
+
+        if size == 0:
+            return [], None
+        by_rating = sort == "rating"
+        key = _rating_key if by_rating else order_key
+        if size * SCAN_RATIO >= self.repo.count("Place"):
+            # Filters match most places: walk them in listing order
+            if by_rating:
+                ordered = self.repo.scan_sorted(
+                    "Place", "average_rating", cursor, descending=True)
+            else:
+                ordered = self.repo.scan("Place", cursor)
+            return _take_page((p for p in ordered if matches(p)), limit, key)
+
+        if cursor:
+            after = decode_cursor(cursor, (float, str) if by_rating
+                                  else (int, str))
+        else:
+            after = None
+
+        def after_cursor(place):
+            if after is None:
+                return True
+            return key(place) < after if by_rating else key(place) > after
+
+        found = sorted((p for p in load() if matches(p) and after_cursor(p)),
+                       key=key, reverse=by_rating)
+        return _take_page(found, limit, key)
+
+    def export_places(self):
+        """Yield every extended place, oldest first.
+
+        Places are extended EXPORT_BATCH at a time, so memory use does not
+        grow with the number of places.
+        """
+        for batch in _batches(self.repo.scan("Place"), EXPORT_BATCH):
+            yield from self.extend_places(batch)
+
+    def search_places(self, limit, lat=None, lon=None, radius_km=None,
+                      bbox=None):
+        """Find places near a point or inside a box, nearest first.
+
+        Either give lat/lon/radius_km (distance from that point) or
+        bbox=(min_lon, min_lat, max_lon, max_lat) (distance from the box
+        centre). Returns at most `limit` extended places, each with a
+        "distance_km" key.
+        """
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            if not (-90 <= min_lat <= max_lat <= 90):
+                raise ValueError("bbox latitudes must be ordered, -90 to 90")
+            if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+                raise ValueError("bbox longitudes must be -180 to 180")
+            boxes = split_bbox(min_lat, min_lon, max_lat, max_lon)
+            lat = (min_lat + max_lat) / 2
+            lon = (min_lon + max_lon) / 2
+            if min_lon > max_lon:  # centre of a box crossing the antimeridian
+                lon = lon + 180 if lon <= 0 else lon - 180
+            radius_km = None
+        else:
+            if lat is None or lon is None or radius_km is None:
+                raise ValueError("lat, lon and radius_km are required")
+            if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+                raise ValueError("lat/lon out of range")
+            if radius_km <= 0:
+                raise ValueError("radius_km must be > 0")
+            boxes = bboxes_around(lat, lon, radius_km)
+
+        hits = []
+        for box in boxes:
+            for place in self.repo.within_bbox("Place", *box):
+                dist = haversine_km(lat, lon, place.latitude, place.longitude)
+                if radius_km is None or dist <= radius_km:
+                    hits.append((dist, place))
+        hits.sort(key=lambda hit: (hit[0], hit[1].id))
+        hits = hits[:limit]
+
+        extended = self.extend_places([place for _, place in hits])
+        for d, (dist, _) in zip(extended, hits):
+            d["distance_km"] = round(dist, 3)
+        return extended
 
     def update_place(self, place_id, data):
-        if "owner_id" in data and not self.repo.exists("User", data["owner_id"]):
+        # Checked once here, so the ids below are known to be strings
+        values = Place.check_changes(data)
+        if "owner_id" in values and not self.repo.exists(
+                "User", values["owner_id"]):
             raise ValueError("owner not found")
 
-        for aid in data.get("amenity_ids", []):
+        for aid in values.get("amenity_ids", []):
             if not self.repo.exists("Amenity", aid):
                 raise ValueError(f"amenity {aid} not found")
 
-        place = self.repo.update("Place", place_id, data)
+        try:
+            place = self.repo.modify("Place", place_id,
+                                     lambda place: place.apply(values))
+        finally:
+            self._place_changed(place_id)
         if place is None:
             return None
         return self._extend_place(place)
 
     def _extend_place(self, place):
         """Add owner details, amenity details and reviews to a place dict."""
-        d = place.to_dict()
-
-        # Embed owner first/last name
-        owner = self.repo.get("User", place.owner_id)
-        if owner:
-            d["owner"] = {
-                "id": owner.id,
-                "first_name": owner.first_name,
-                "last_name": owner.last_name,
-            }
-        else:
-            d["owner"] = None
-
-        # Embed amenity names
-        amenities = []
-        for aid in place.amenity_ids:
-            a = self.repo.get("Amenity", aid)
-            if a:
-                amenities.append({"id": a.id, "name": a.name})
-        d["amenities"] = amenities
-
-        # Embed reviews
-        reviews = []
-        for rid in place.review_ids:
-            r = self.repo.get("Review", rid)
-            if r:
-                reviews.append(r.to_dict())
-        d["reviews"] = reviews
-
-        return d
+        return self.extend_places([place])[0]
+
+    def extend_places(self, places, embed=PLACE_EMBEDS, reviews_limit=None):
+        """Extend many places at once, without one lookup per relation.
+
+        All owner, amenity and review ids are collected first and resolved
+        with one get_many() call per model. Owner and amenity dicts are
+        built once and shared by every place that references them, so
+        treat the returned dicts as read-only.
+
+        Only the relations named in embed ("owner", "amenities",
+        "reviews") are looked up and added. reviews_limit keeps the first
+        reviews of each place only (review_count still counts them all).
+        """
+        with_owner = "owner" in embed
+        with_amenities = "amenities" in embed
+        with_reviews = "reviews" in embed
+        place_reviews = {}  # place id -> ids of the reviews to embed
+        owner_ids = set()
+        amenity_ids = set()
+        review_ids = set()
+        for place in places:
+            if with_owner:
+                owner_ids.add(place.owner_id)
+            if with_amenities:
+                amenity_ids.update(place.amenity_ids)
+            if with_reviews:
+                rids = place.review_ids
+                if reviews_limit is not None:
+                    rids = list(islice(rids, reviews_limit))
+                place_reviews[place.id] = rids
+                review_ids.update(rids)
+
+        owners = {
+            o.id: {"id": o.id, "first_name": o.first_name,
+                   "last_name": o.last_name}
+            for o in self.repo.get_many("User", owner_ids).values()
+        } if owner_ids else {}
+        amenities = {
+            a.id: {"id": a.id, "name": a.name}
+            for a in self.repo.get_many("Amenity", amenity_ids).values()
+        } if amenity_ids else {}
+        reviews = (self.repo.get_many("Review", review_ids)
+                   if review_ids else {})
+
+        extended = []
+        for place in places:
+            d = place.to_dict()
+            if with_owner:
+                d["owner"] = owners.get(place.owner_id)
+            if with_amenities:
+                d["amenities"] = [amenities[aid] for aid in place.amenity_ids
+                                  if aid in amenities]
+            if with_reviews:
+                d["reviews"] = [
+                    {"id": r.id, "text": r.text, "rating": r.rating}
+                    for r in (reviews.get(rid)
+                              for rid in place_reviews[place.id])
+                    if r is not None
+                ]
+            extended.append(d)
+        return extended
 
     # ------------------------------------------------------------------
     # Reviews
     # ------------------------------------------------------------------
 
     def create_review(self, data):
-        if not self.repo.exists("User", data.get("user_id", "")):
-            raise ValueError("user not found")
-        if not self.repo.exists("Place", data.get("place_id", "")):
-            raise ValueError("place not found")
-
-        review = Review(
-            text=data["text"],
-            rating=data["rating"],
-            user_id=data["user_id"],
-            place_id=data["place_id"],
-        )
-        self.repo.add(review)
+        with self.repo.transaction("Place", "Review", "User"):
+            review = self._new_review(data)  # checks the fields' values
+            if not self.repo.exists("User", review.user_id):
+                raise ValueError("user not found")
+            if not self.repo.exists("Place", review.place_id):
+                raise ValueError("place not found")
+
+            self.repo.add(review)
 
-        # Link review to its place and user
-        place = self.repo.get("Place", data["place_id"])
-        if place and review.id not in place.review_ids:
-            place.review_ids.append(review.id)
+            # Link review to its place and user, and count its rating
+            def link(obj):
+                if obj.review_ids.add(review.id):
+                    obj.add_rating(review.rating)
 
-        user = self.repo.get("User", data["user_id"])
-        if user and review.id not in user.review_ids:
-            user.review_ids.append(review.id)
+            self.repo.modify("Place", review.place_id, link)
+            self.repo.modify("User", review.user_id, link)
+            self._place_changed(review.place_id)
 
         return review
 
+    @staticmethod
+    def _new_review(data):
+        return Review(
+            text=data.get("text"),
+            rating=data.get("rating"),
+            user_id=data.get("user_id"),
+            place_id=data.get("place_id"),
+        )
+
+    def create_reviews(self, items, atomic=True):
+        """Create many reviews at once (see _insert_batch).
+
+        Users and places of the whole batch are looked up with one
+        get_many() per model, and each place and user is updated once.
+        """
+        with self.repo.transaction("Place", "Review", "User"):
+            reviews, errors = _build_batch(items, self._new_review)
+            built = [r for r in reviews if r is not None]
+            users = self.repo.get_many("User", {r.user_id for r in built})
+            places = self.repo.get_many("Place", {r.place_id for r in built})
+
+            def check(review):
+                if review.user_id not in users:
+                    raise ValueError("user not found")
+                if review.place_id not in places:
+                    raise ValueError("place not found")
+
+            _check_batch(reviews, errors, check)
+            reviews, errors = self._insert_batch(reviews, errors, atomic)
+            by_id = {r.id: r for r in reviews if r is not None}
+            for field, model_name in (("place_id", "Place"),
+                                      ("user_id", "User")):
+                groups = _group_ids(reviews, field)
+
+                def link(obj, groups=groups):
+                    for review_id in groups[obj.id]:
+                        if obj.review_ids.add(review_id):
+                            obj.add_rating(by_id[review_id].rating)
+
+                self.repo.modify_many(model_name, groups, link)
+            for place_id in _group_ids(reviews, "place_id"):
+                self._place_changed(place_id)
+        return reviews, errors
+
+    def _insert_batch(self, objs, errors, atomic):
+        """Save the objects built by _build_batch: (objects, errors).
+
+        objects lines up with the batch (None for a failed item) and
+        errors is a list of (index, message). With atomic=True a single
+        error means nothing is saved.
+        """
+        if errors and atomic:
+            return [None] * len(objs), errors
+        self.repo.add_many(obj for obj in objs if obj is not None)
+        return objs, errors
+
+    def check_rating_totals(self, fix=False):
+        """Recompute every place's and user's rating totals from reviews.
+
+        Returns a list of (model_name, id, stored, actual) for each object
+        whose (review_count, rating_sum) was wrong; with fix=True the
+        stored totals are overwritten with the recomputed ones.
+        """
+        problems = []
+        for model_name, field in (("Place", "place_id"), ("User", "user_id")):
+            for obj in self.repo.scan(model_name):
+                reviews = self.repo.find_by("Review", field, obj.id)
+                actual = (len(reviews), sum(r.rating for r in reviews))
+                stored = (obj.review_count, obj.rating_sum)
+                if stored == actual:
+                    continue
+                problems.append((model_name, obj.id, stored, actual))
+                if fix:
+                    self.repo.modify(
+                        model_name, obj.id,
+                        lambda o, a=actual: o.set_rating_totals(*a))
+        return problems
+
     def get_review(self, review_id):
         return self.repo.get("Review", review_id)
 
-    def list_reviews_for_place(self, place_id):
-        return [r for r in self.repo.get_all("Review") if r.place_id == place_id]
+    def export_reviews(self):
+        """Yield every review, oldest first, without building a list."""
+        return self.repo.scan("Review")
+
+    def list_reviews_for_place(self, place_id, limit, cursor=None,
+                               since=None):
+        """Return (reviews, next_cursor) for one page of a place's reviews.
+
+        since (epoch microseconds) keeps only the reviews created then
+        or later.
+        """
+        return self.repo.page("Review", limit, cursor,
+                              field="place_id", value=place_id, since=since)
 
     def update_review(self, review_id, data):
-        return self.repo.update("Review", review_id, data)
+        # The old rating must not change under us until the delta is applied
+        with self.repo.transaction("Place", "Review", "User"):
+            review = self.repo.get("Review", review_id)
+            if review is None:
+                return None
+            old_rating = review.rating
+            try:
+                review = self.repo.update("Review", review_id, data)
+            finally:
+                self._place_changed(review.place_id)
+
+            # Apply the rating delta to the place and user totals
+            if review.rating != old_rating:
+                def rerate(obj):
+                    if review_id in obj.review_ids:
+                        obj.change_rating(old_rating, review.rating)
+
+                self.repo.modify("Place", review.place_id, rerate)
+                self.repo.modify("User", review.user_id, rerate)
+        return review
 
     def delete_review(self, review_id):
-        review = self.repo.get("Review", review_id)
-        if review is None:
-            return False
+        with self.repo.transaction("Place", "Review", "User"):
+            review = self.repo.get("Review", review_id)
+            if review is None:
+                return False
+
+            # Remove from the place's and user's review lists and totals
+            def unlink(obj):
+                if obj.review_ids.discard(review_id):
+                    obj.remove_rating(review.rating)
 
-        # Remove from place's review list
-        place = self.repo.get("Place", review.place_id)
-        if place and review_id in place.review_ids:
-            place.review_ids.remove(review_id)
+            self.repo.modify("Place", review.place_id, unlink)
+            self.repo.modify("User", review.user_id, unlink)
+            self._place_changed(review.place_id)
+
+            return self.repo.delete("Review", review_id)
+
+    # ------------------------------------------------------------------
+    # Versions (used for ETags)
+    # ------------------------------------------------------------------
 
-        # Remove from user's review list
-        user = self.repo.get("User", review.user_id)
-        if user and review_id in user.review_ids:
-            user.review_ids.remove(review_id)
+    def place_version(self, place_id):
+        """Version of get_place(place_id), or None if there is no such place.
+
+        Only reads the stored place, so the API can answer a conditional
+        GET without building the extended document.
+        """
+        self._sync()
+        place = self.repo.get("Place", place_id)
+        if place is None:
+            return None
+        # A seq the log has pruned is at most its floor: every process
+        # reads the same floor, whether it saw that change or not
+        revision = max(self._place_revisions.get(place_id, 0),
+                       self.repo.change_floor())
+        return f"{place.updated_at}.{self.repo.epoch}.{revision}"
+
+    def collection_version(self, *model_names):
+        """Version of any listing built from these models' buckets."""
+        return "/".join(self.repo.version(m) for m in model_names)
+
+    # ------------------------------------------------------------------
+    # Place cache invalidation
+    # ------------------------------------------------------------------
 
-        return self.repo.delete("Review", review_id)
+    def _place_changed(self, place_id):
+        """The place itself, or one of its reviews, changed."""
+        # Bump first: get_place() re-checks the revision after caching
+        self._place_revisions[place_id] = self.repo.publish("place", place_id)
+        self.place_cache.invalidate(place_id)
+
+    def _sync(self):
+        """Apply place changes published by other processes.
+
+        Cheap when nothing changed; with the in-memory backend there is
+        never anything to apply.
+        """
+        changes = self.repo.changes_since(self._seen_change)
+        if changes is None:
+            # Missed some changes: forget every cached place
+            self.place_cache.clear()
+            self._load_revisions()
+            return
+        self._apply_changes(changes)
+
+    def _load_revisions(self):
+        """Read the revisions of every place still in the change log."""
+        while True:
+            floor = self.repo.change_floor()
+            changes = self.repo.changes_since(floor)
+            if changes is not None:
+                break  # else pruned in the meantime: read the new floor
+        self._seen_change = floor
+        self._place_revisions.clear()
+        self._apply_changes(changes)
+
+    def _apply_changes(self, changes):
+        """Record [(seq, topic, key)] from the change log."""
+        for seq, topic, key in changes:
+            if topic == "place":
+                self._place_revisions[key] = max(
+                    seq, self._place_revisions.get(key, 0))
+                self.place_cache.invalidate(key)
+            self._seen_change = max(self._seen_change, seq)
+
+    def _owner_changed(self, user_id):
+        """A user's name changed: every place they own shows it."""
+        for place in self.repo.find_by("Place", "owner_id", user_id):
+            self._place_changed(place.id)
+
+    def _amenity_changed(self, amenity_id):
+        """An amenity changed: every place offering it shows its name."""
+        for place in self.repo.find_by("Place", "amenity_ids", amenity_id):
+            self._place_changed(place.id)
 
 
 # One shared instance used everywhere in the app
@@ -0,0 +1,46 @@
+"""Small geography helpers used by place search."""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points, in kilometres."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = (math.sin(dp / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def split_bbox(min_lat, min_lon, max_lat, max_lon):
+    """Split a box crossing the antimeridian (min_lon > max_lon) in two."""
+    if min_lon <= max_lon:
+        return [(min_lat, min_lon, max_lat, max_lon)]
+    return [(min_lat, min_lon, max_lat, 180.0),
+            (min_lat, -180.0, max_lat, max_lon)]
+
+
+def bboxes_around(lat, lon, radius_km):
+    """Boxes (min_lat, min_lon, max_lat, max_lon) covering a circle.
+
+    The circle's box is split when it crosses the antimeridian, and
+    widened to every longitude when it reaches a pole.
+    """
+    dlat = radius_km / KM_PER_DEG_LAT
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return [(max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0)]
+    # Longitude degrees shrink with latitude; use the widest edge
+    widest = max(abs(min_lat), abs(max_lat))
+    dlon = dlat / math.cos(math.radians(widest))
+    if dlon >= 180:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return split_bbox(min_lat, min_lon, max_lat, max_lon)
@@ -0,0 +1,25 @@
+"""ASGI entry point – serve the API with an ASGI server, e.g.:
+
+    pip install uvicorn
+    uvicorn asgi:app --port 5000
+
+See app/api/asgi.py: the hot GET routes run as coroutines, everything
+else goes through the same Flask app as run.py.
+"""
+from config import get_config
+from app.api.asgi import ASGIApp
+from app.services.async_facade import AsyncFacade
+from app.services.facade import facade
+from run import create_app
+
+
+def create_asgi_app(config=None):
+    """Create the Flask app and wrap it for ASGI."""
+    config = config or get_config()
+    # With metrics on, every request goes through the Flask app's hooks
+    return ASGIApp(create_app(config),
+                   AsyncFacade(facade, threads=config.ASGI_THREADS),
+                   native=not config.METRICS_ENABLED)
+
+
+app = create_asgi_app()
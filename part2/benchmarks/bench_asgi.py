@@ -0,0 +1,206 @@
+"""
+Many keep-alive connections: threaded WSGI server vs ASGI (asgi.py).
+Run:  python benchmarks/bench_asgi.py [--connections 10000] [--requests 5]
+
+Each server runs in its own process with --places places (5 reviews
+each), seeded through the facade. The client opens --connections HTTP/1.1
+connections and keeps all of them open, then sends --requests
+GET /api/v1/places/<id> on each one, every connection at once. Prints
+how many connections were served, requests/s, latency percentiles, and
+the server's thread count and peak RSS. The WSGI server is one gunicorn
+gthread worker with 16 threads (werkzeug's development server closes
+every connection), the ASGI server uvicorn running asgi.py
+(pip install gunicorn uvicorn).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import time
+
+from bench_load import peak_rss_mib, percentile, seed
+from helpers import print_table
+
+BASE_PORT = 5800
+CONNECT_AT_ONCE = 200  # connections being opened at the same time
+THREADS = 16  # gunicorn's threads, like asgi.py's default ASGI_THREADS
+
+
+def _serve_wsgi(port, places, ready):
+    from gunicorn.app.base import BaseApplication
+    from app.services.facade import facade
+    from run import create_app
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                    "bind": f"127.0.0.1:{port}", "workers": 1,
+                    "worker_class": "gthread", "threads": THREADS,
+                    "worker_connections": 20000, "keepalive": 600,
+                    "backlog": 4096, "timeout": 600,
+                    "loglevel": "warning"}.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    ids = seed(facade, 100, places, 5)[1]
+    app = create_app()
+    ready.put(ids)
+    Server().run()  # the worker is forked with the seeded facade
+
+
+def _serve_asgi(port, places, ready):
+    import uvicorn
+    from app.services.facade import facade
+    from asgi import create_asgi_app
+    ids = seed(facade, 100, places, 5)[1]
+    config = uvicorn.Config(create_asgi_app(), host="127.0.0.1", port=port,
+                            log_level="warning", backlog=4096,
+                            timeout_keep_alive=600)
+    ready.put(ids)
+    uvicorn.Server(config).run()
+
+
+SERVERS = [("WSGI (gunicorn gthread)", _serve_wsgi),
+           ("ASGI (uvicorn)", _serve_asgi)]
+
+
+def serving_pid(pid):
+    """The process handling requests: gunicorn's worker, else pid."""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = f.read().split()
+    except OSError:
+        children = []
+    return int(children[0]) if children else pid
+
+
+def server_threads(pid):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                return int(line.split()[1])
+    return None
+
+
+async def _open(port, gate):
+    async with gate:
+        try:
+            return await asyncio.wait_for(
+                asyncio.open_connection("127.0.0.1", port), 30)
+        except (OSError, asyncio.TimeoutError):
+            return None
+
+
+async def _requests(conn, paths, timeout):
+    """Send the GETs one after the other: latencies, or None on failure."""
+    reader, writer = conn
+    latencies = []
+    try:
+        for path in paths:
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n"
+                         .encode())
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"),
+                                          timeout)
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await asyncio.wait_for(reader.readexactly(length), timeout)
+            if not head.startswith(b"HTTP/1.1 200"):
+                return None
+            latencies.append(time.perf_counter() - start)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError,
+            asyncio.LimitOverrunError):
+        return None
+    return latencies
+
+
+async def _client(port, ids, args, pid):
+    gate = asyncio.Semaphore(CONNECT_AT_ONCE)
+    start = time.perf_counter()
+    conns = await asyncio.gather(*(_open(port, gate)
+                                   for _ in range(args.connections)))
+    connect_s = time.perf_counter() - start
+    opened = [c for c in conns if c is not None]
+    await asyncio.sleep(1)  # let the server settle with all of them open
+    pid = serving_pid(pid)
+    threads = server_threads(pid)
+
+    rnd = random.Random(1)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        _requests(c, [f"/api/v1/places/{rnd.choice(ids)}"
+                      for _ in range(args.requests)], args.timeout)
+        for c in opened))
+    elapsed = time.perf_counter() - start
+    for _, writer in opened:
+        writer.close()
+    latencies = sorted(t for r in results if r for t in r)
+    return {
+        "opened": len(opened),
+        "served": sum(1 for r in results if r),
+        "connect_s": connect_s,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "threads": threads,
+        "rss": peak_rss_mib(pid),
+    }
+
+
+def wait_for_port(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def ms(seconds):
+    return f"{seconds * 1000:,.1f}" if seconds is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=5,
+                        help="GETs sent on each connection")
+    parser.add_argument("--places", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120.0,
+                        help="seconds to wait for one response")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    for n, (label, target) in enumerate(SERVERS):
+        port = BASE_PORT + n
+        ready = ctx.Queue()
+        process = ctx.Process(target=target, args=(port, args.places, ready),
+                              daemon=True)
+        process.start()
+        try:
+            ids = ready.get(timeout=600)
+            wait_for_port(port)
+            r = asyncio.run(_client(port, ids, args, process.pid))
+        finally:
+            process.terminate()
+            process.join()
+        rows.append([label, f"{r['opened']:,}", f"{r['served']:,}",
+                     f"{r['connect_s']:.1f}", f"{r['rps']:,.0f}",
+                     ms(r["p50"]), ms(r["p99"]), r["threads"], r["rss"]])
+
+    print(f"\n{args.connections:,} keep-alive connections, "
+          f"{args.requests} GET /places/<id> each\n")
+    print_table(["server", "connected", "served", "connect s", "req/s",
+                 "p50 ms", "p99 ms", "threads", "peak RSS MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Review creation: one POST per review vs POST /reviews/batch.
+Run:  python benchmarks/bench_batch.py [--reviews 100000] [--single 2000]
+
+Uses the Flask test client (no network) and the backend selected by
+HBNB_REPOSITORY. Single POSTs are timed on --single reviews only and
+reported as a rate, since 100k of them take a while.
+"""
+import argparse
+import json
+import time
+
+from helpers import print_table
+from run import create_app
+from app.services.facade import facade
+
+
+def review(i, users, places):
+    return {"text": "Lovely stay", "rating": 1 + i % 5,
+            "user_id": users[i % len(users)],
+            "place_id": places[i % len(places)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--single", type=int, default=2000)
+    parser.add_argument("--places", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    users = [facade.create_user({"first_name": "Bench", "last_name": str(i),
+                                 "email": f"bench{i}@example.com",
+                                 "password": "x"}).id
+             for i in range(100)]
+    places = [facade.create_place({"title": f"Place {i}", "price": 50,
+                                   "latitude": 0, "longitude": 0,
+                                   "owner_id": users[i % len(users)]}).id
+              for i in range(args.places)]
+
+    start = time.perf_counter()
+    for i in range(args.single):
+        r = client.post("/api/v1/reviews/", json=review(i, users, places))
+        assert r.status_code == 201, r.data
+    single = args.single / (time.perf_counter() - start)
+
+    items = [review(i, users, places) for i in range(args.reviews)]
+    start = time.perf_counter()
+    r = client.post("/api/v1/reviews/batch", json=items)
+    assert r.status_code == 201, r.data[:200]
+    array = args.reviews / (time.perf_counter() - start)
+
+    body = "\n".join(json.dumps(item) for item in items)
+    start = time.perf_counter()
+    r = client.post("/api/v1/reviews/batch", data=body,
+                    content_type="application/x-ndjson")
+    assert r.status_code == 201, r.data[:200]
+    ndjson = args.reviews / (time.perf_counter() - start)
+
+    print(f"\n{args.reviews:,} reviews over {args.places:,} places\n")
+    print_table(["method", "reviews/s", "speedup"], [
+        ["POST /reviews/ (one each)", f"{single:,.0f}", "1.0x"],
+        ["POST /reviews/batch (JSON)", f"{array:,.0f}",
+         f"{array / single:.1f}x"],
+        ["POST /reviews/batch (NDJSON)", f"{ndjson:,.0f}",
+         f"{ndjson / single:.1f}x"],
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Durable in-memory store: startup time and write throughput.
+Run:  python benchmarks/bench_durable.py [--objects 5000000]
+                                         [--writes 2000] [--threads 1,16]
+
+Startup: N reviews are written to the log, then the store is reopened
+twice: once replaying the whole log, once from a snapshot.
+Writes: reviews are added by 1..T threads with each sync mode. With
+"group", threads writing at the same time share one fsync.
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from helpers import print_table
+from app.persistence.durable_repository import DurableRepository
+from app.services.facade import MODELS
+from app.models.review import Review
+
+
+def open_repo(directory, sync="none"):
+    start = time.perf_counter()
+    repo = DurableRepository(directory, MODELS, sync=sync,
+                             snapshot_every=float("inf"))
+    return repo, time.perf_counter() - start
+
+
+def startup(count):
+    directory = tempfile.mkdtemp()
+    repo, _ = open_repo(directory)
+    start = time.perf_counter()
+    for _ in range(count):
+        repo.add(Review("Lovely stay", 4, "user-1", "place-1"))
+    write_time = time.perf_counter() - start
+    repo.close()
+    del repo
+    gc.collect()
+
+    repo, log_time = open_repo(directory)
+    repo.snapshot()
+    repo.close()
+    del repo
+    gc.collect()
+    repo, snap_time = open_repo(directory)
+    size = sum(os.path.getsize(os.path.join(directory, name))
+               for name in os.listdir(directory))
+    repo.close()
+    shutil.rmtree(directory)
+    return [
+        ["write log (sync=none)", f"{write_time:.1f}",
+         f"{count / write_time:,.0f}"],
+        ["startup: replay log", f"{log_time:.1f}", f"{count / log_time:,.0f}"],
+        ["startup: snapshot", f"{snap_time:.1f}",
+         f"{count / snap_time:,.0f}"],
+    ], size
+
+
+def throughput(sync, threads, writes):
+    """Writes per second with `threads` threads sharing `writes` adds."""
+    directory = tempfile.mkdtemp()
+    repo, _ = open_repo(directory, sync)
+    per_thread = writes // threads
+
+    def work():
+        for _ in range(per_thread):
+            repo.add(Review("Lovely stay", 4, "user-1", "place-1"))
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    repo.close()
+    shutil.rmtree(directory)
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--objects", type=int, default=5000000)
+    parser.add_argument("--writes", type=int, default=2000,
+                        help="adds per throughput run")
+    parser.add_argument("--threads", default="1,16")
+    args = parser.parse_args()
+
+    rows = []
+    for n in (int(t) for t in args.threads.split(",")):
+        rates = [throughput(sync, n, args.writes)
+                 for sync in ("always", "group", "none")]
+        rows.append([n] + [f"{r:,.0f}" for r in rates])
+    print("\nWrites per second\n")
+    print_table(["threads", "always", "group", "none"], rows)
+
+    rows, size = startup(args.objects)
+    print(f"\n{args.objects:,} reviews, {size / 2**20:,.0f} MiB on disk\n")
+    print_table(["phase", "seconds", "objects/s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Peak memory exporting every place: NDJSON stream vs one JSON list.
+Run:  python benchmarks/bench_export.py [--places 1000000]
+
+The stream is GET /places/export, read chunk by chunk. The list is what
+a single "give me everything" GET would do: extend every place, marshal
+the whole list, then encode it. RSS is sampled every few milliseconds
+while each one runs; the stream goes first, since memory freed by
+Python is not always given back to the OS.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from flask_restx import marshal
+
+from helpers import print_table
+from run import create_app
+from app.api.v1.places import place_output_model
+from app.models.place import Place
+from app.services.facade import facade
+
+_PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss():
+    """Resident set size of this process, in bytes (Linux)."""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * _PAGE
+
+
+class PeakRSS:
+    """Samples RSS in a thread while the block runs; .peak in bytes."""
+
+    def __enter__(self):
+        self.peak = rss()
+        self._running = True
+        self._thread = threading.Thread(target=self._sample)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while self._running:
+            self.peak = max(self.peak, rss())
+            time.sleep(0.005)
+
+    def __exit__(self, *exc):
+        self._running = False
+        self._thread.join()
+        self.peak = max(self.peak, rss())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--places", type=int, default=1000000)
+    args = parser.parse_args()
+
+    owner = facade.create_user({"first_name": "Bench", "last_name": "Owner",
+                                "email": "owner@example.com",
+                                "password": "x"})
+    facade.repo.add_many(
+        Place(f"Place {i}", "", 50 + i % 100, (i % 180) - 90.0,
+              (i % 360) - 180.0, owner.id)
+        for i in range(args.places))
+    client = create_app().test_client()
+    base = rss()
+
+    with PeakRSS() as stream_mem:
+        start = time.perf_counter()
+        response = client.get("/api/v1/places/export", buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+        stream_time = time.perf_counter() - start
+
+    with PeakRSS() as list_mem:
+        start = time.perf_counter()
+        places = facade.extend_places(list(facade.repo.scan("Place")))
+        body = json.dumps(marshal(places, place_output_model))
+        list_time = time.perf_counter() - start
+        del places, body
+
+    mib = 2 ** 20
+    print(f"\n{args.places:,} places, {size / mib:,.0f} MiB of NDJSON, "
+          f"{base / mib:,.0f} MiB RSS before exporting\n")
+    print_table(["export", "seconds", "peak RSS growth (MiB)"], [
+        ["GET /places/export (stream)", f"{stream_time:.1f}",
+         f"{(stream_mem.peak - base) / mib:,.0f}"],
+        ["one JSON list", f"{list_time:.1f}",
+         f"{(list_mem.peak - base) / mib:,.0f}"],
+    ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Create/delete review latency on one "hot" place as its review count grows.
+Run:  python benchmarks/bench_hot_place.py [--sizes 1000,10000,100000]
+
+Linking and unlinking a review touches the place's and the user's
+review_ids; with IdSet both are O(1), so latency should stay flat.
+"""
+import argparse
+import time
+
+from helpers import print_table
+from app.services.facade import HBnBFacade
+from config import Config
+
+
+class MemoryConfig(Config):
+    REPOSITORY = "memory"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--ops", type=int, default=1000,
+                        help="create+delete pairs timed at each size")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    f = HBnBFacade(MemoryConfig)
+    user = f.create_user({"first_name": "Hot", "last_name": "Guest",
+                          "email": "hot@example.com", "password": "x"})
+    place = f.create_place({"title": "Hot place", "price": 100,
+                            "latitude": 0, "longitude": 0,
+                            "owner_id": user.id})
+    review = {"text": "ok", "rating": 4, "user_id": user.id,
+              "place_id": place.id}
+
+    rows = []
+    for size in sizes:
+        # Grow the place to `size` reviews
+        while len(f.repo.get("Place", place.id).review_ids) < size:
+            f.create_review(review)
+
+        # Time create + delete of one review, oldest reviews first deleted
+        # last, so the place stays at `size` reviews
+        create_s = delete_s = 0.0
+        for _ in range(args.ops):
+            t0 = time.perf_counter()
+            new = f.create_review(review)
+            t1 = time.perf_counter()
+            f.delete_review(new.id)
+            t2 = time.perf_counter()
+            create_s += t1 - t0
+            delete_s += t2 - t1
+        rows.append([f"{size:,}", f"{create_s / args.ops * 1e6:.1f}",
+                     f"{delete_s / args.ops * 1e6:.1f}"])
+
+    print()
+    print_table(["reviews on place", "create µs", "delete µs"], rows)
+
+
+if __name__ == "__main__":
+    main()
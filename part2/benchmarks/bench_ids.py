@@ -0,0 +1,154 @@
+"""
+Id strategies: generation speed, memory and insert throughput.
+Run:  python benchmarks/bench_ids.py [--objects 10000000]
+                                    [--sqlite-objects 1000000]
+
+1. ns per id: str(uuid.uuid4()) vs app.models.ids.uuid7().
+2. Memory backend: --objects reviews added like the facade does (repo
+   add, then linked to their place and user), with user/place ids parsed
+   from JSON as in an API request. "before" is uuid4 ids with every
+   review keeping its own copies of those strings; "after" is uuid7 ids
+   with the repository sharing one string per id. Each run is a fresh
+   process; RSS is measured after the inserts.
+3. SQLite backend: --sqlite-objects reviews inserted with add_many() in
+   batches, uuid4 vs uuid7 primary keys.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import timeit
+import uuid
+
+from helpers import print_table
+
+USERS = 1000
+PLACES = 10000
+BATCH = 10000
+
+
+def rss_mib():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _seed(repo):
+    from app.models.place import Place
+    from app.models.user import User
+    users = [User("Bench", "User", f"bench{i}@example.com", "pw")
+             for i in range(USERS)]
+    for user in users:
+        repo.add(user)
+    places = [Place(f"Place {i}", "", 100, 45.0, 5.0, users[i % USERS].id)
+              for i in range(PLACES)]
+    for place in places:
+        repo.add(place)
+    # Ids as a client sends them back: equal strings, new objects
+    return ([json.loads(json.dumps(u.id)) for u in users],
+            [json.loads(json.dumps(p.id)) for p in places])
+
+
+def _memory_run(strategy, share, count, result):
+    from app.models import ids
+    from app.models.review import Review
+    from app.persistence.repository import InMemoryRepository
+    ids.set_strategy(strategy)
+    repo = InMemoryRepository()
+    repo._share = share
+    user_ids, place_ids = _seed(repo)
+    start_rss = rss_mib()
+
+    def link(obj):
+        obj.review_ids.add(review.id)
+
+    start = time.perf_counter()
+    for i in range(count):
+        review = Review("Lovely stay", 4,
+                        json.loads(f'"{user_ids[i % USERS]}"'),
+                        json.loads(f'"{place_ids[i % PLACES]}"'))
+        repo.add(review)
+        repo.modify("Place", review.place_id, link)
+        repo.modify("User", review.user_id, link)
+    elapsed = time.perf_counter() - start
+    result.put((count / elapsed, (rss_mib() - start_rss) * 2 ** 20 / count,
+                rss_mib()))
+
+
+def _sqlite_run(strategy, count, result):
+    from app.models import ids
+    from app.models.review import Review
+    from app.persistence.sqlite_repository import SQLiteRepository
+    from app.services.facade import MODELS
+    ids.set_strategy(strategy)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        repo = SQLiteRepository(path, MODELS)
+        start = time.perf_counter()
+        done = 0
+        while done < count:
+            n = min(BATCH, count - done)
+            repo.add_many([Review("Lovely stay", 4, f"user-{i % USERS}",
+                                  f"place-{i % PLACES}") for i in range(n)])
+            done += n
+        elapsed = time.perf_counter() - start
+        repo.close()
+        size = os.path.getsize(path) / 2 ** 20
+    result.put((count / elapsed, size))
+
+
+def in_process(target, *args):
+    ctx = multiprocessing.get_context("spawn")
+    result = ctx.Queue()
+    process = ctx.Process(target=target, args=(*args, result))
+    process.start()
+    value = result.get()
+    process.join()
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--objects", type=int, default=10_000_000,
+                        help="reviews for the memory backend")
+    parser.add_argument("--sqlite-objects", type=int, default=1_000_000,
+                        help="reviews for the SQLite backend")
+    args = parser.parse_args()
+
+    from app.models import ids
+    number = 200000
+    rows = []
+    for name, make in (("str(uuid.uuid4())", lambda: str(uuid.uuid4())),
+                       ("ids.uuid7()", ids.uuid7)):
+        seconds = min(timeit.repeat(make, number=number, repeat=3))
+        rows.append([name, f"{seconds / number * 1e9:,.0f}"])
+    print("\nId generation\n")
+    print_table(["id", "ns/id"], rows)
+
+    rows = []
+    for label, strategy, share in (("uuid4, copied ids (before)", "uuid4",
+                                    False),
+                                   ("uuid7, shared ids (after)", "uuid7",
+                                    True)):
+        rate, per_obj, total = in_process(_memory_run, strategy, share,
+                                          args.objects)
+        rows.append([label, f"{rate:,.0f}", f"{per_obj:.0f}",
+                     f"{total:,.0f}"])
+    print(f"\nMemory backend, {args.objects:,} reviews\n")
+    print_table(["ids", "inserts/s", "bytes/review", "RSS MiB"], rows)
+
+    rows = []
+    for strategy in ("uuid4", "uuid7"):
+        rate, size = in_process(_sqlite_run, strategy, args.sqlite_objects)
+        rows.append([strategy, f"{rate:,.0f}", f"{size:,.0f}"])
+    print(f"\nSQLite backend, {args.sqlite_objects:,} reviews "
+          f"(add_many, {BATCH:,} per batch)\n")
+    print_table(["ids", "inserts/s", "file MiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Load test: replay a request mix against the app, report JSON.
+Run:  python benchmarks/bench_load.py [--driver client|server|both]
+          [--mix default] [--places 1000] [--duration 10] [--threads 4]
+          [--output run.json] [--baseline old.json]
+
+The dataset (--users, --places, --reviews per place) is seeded through
+HBnBFacade. The mix is then replayed for --duration seconds by --threads
+threads, either through the Flask test client (driver "client", no
+network) or over HTTP against create_app() served by a threaded WSGI
+server in its own process (driver "server"). Each run reports requests/s,
+p50/p95/p99 latency overall and per operation and the peak RSS of the
+process serving the app. Any answer >= 400, during the warmup or the run,
+aborts the benchmark instead: timing failed requests would not measure
+the app. The JSON written to --output carries the commit and settings,
+so two runs can be compared with --baseline.
+Uses the backend selected by HBNB_REPOSITORY.
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from collections import Counter
+
+from helpers import print_table
+
+BASE_PORT = 5700
+
+# Operation -> weight. Deletes only remove reviews the same thread
+# created; with none left, a delete is replaced by a get_place.
+MIXES = {
+    "default": {"list_places": 20, "get_place": 65,
+                "create_review": 10, "delete_review": 5},
+    "read": {"list_places": 30, "get_place": 70},
+    "write": {"list_places": 10, "get_place": 30,
+              "create_review": 40, "delete_review": 20},
+}
+
+# Ids handed to the load threads are sampled down to this many
+MAX_IDS = 10000
+
+
+# --- dataset -----------------------------------------------------------------
+
+def seed(facade, n_users, n_places, reviews_per_place, batch=10000):
+    """Create the dataset with the facade's bulk methods: (users, places)."""
+    tag = uuid.uuid4().hex[:8]  # emails stay unique on a reused database
+    user_ids, place_ids = [], []
+    for start in range(0, n_users, batch):
+        users, _ = facade.create_users(
+            [{"first_name": "Load", "last_name": str(i),
+              "email": f"load-{tag}-{i}@example.com", "password": "x"}
+             for i in range(start, min(start + batch, n_users))])
+        user_ids += [u.id for u in users]
+    for start in range(0, n_places, batch):
+        places, _ = facade.create_places(
+            [{"title": f"Place {i}", "price": 20 + i % 300,
+              "latitude": (i % 170) - 85.0, "longitude": (i % 360) - 180.0,
+              "owner_id": user_ids[i % n_users]}
+             for i in range(start, min(start + batch, n_places))])
+        place_ids += [p.id for p in places]
+        reviews = [{"text": "Seeded review", "rating": 1 + j % 5,
+                    "user_id": user_ids[(i + j) % n_users], "place_id": pid}
+                   for i, pid in enumerate(place_ids[start:])
+                   for j in range(reviews_per_place)]
+        for first in range(0, len(reviews), batch):
+            facade.create_reviews(reviews[first:first + batch])
+    rnd = random.Random(0)
+    return (rnd.sample(user_ids, min(len(user_ids), MAX_IDS)),
+            rnd.sample(place_ids, min(len(place_ids), MAX_IDS)))
+
+
+# --- drivers -----------------------------------------------------------------
+# A driver's connect() returns one send(method, url, body) -> (status,
+# bytes) callable per load thread.
+
+class ClientDriver:
+    """create_app() in this process, called through the test client."""
+
+    name = "client"
+
+    def __init__(self, args):
+        from app.services.facade import facade
+        from run import create_app
+        self.ids = seed(facade, args.users, args.places, args.reviews)
+        self.app = create_app()
+        self.pid = os.getpid()
+
+    def connect(self):
+        client = self.app.test_client()
+
+        def send(method, url, body=None):
+            r = client.open(url, method=method, json=body)
+            return r.status_code, r.data
+        return send
+
+    def close(self):
+        pass
+
+
+def _serve(port, args, ready):
+    """Server process: seed its own facade, then serve create_app()."""
+    from werkzeug.serving import make_server
+    from app.services.facade import facade
+    from run import create_app
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    ids = seed(facade, args.users, args.places, args.reviews)
+    server = make_server("127.0.0.1", port, create_app(), threaded=True)
+    ready.put(ids)
+    server.serve_forever()
+
+
+class ServerDriver:
+    """create_app() in a threaded WSGI server process, called over HTTP."""
+
+    name = "server"
+
+    def __init__(self, args):
+        self.port = BASE_PORT
+        ctx = multiprocessing.get_context("spawn")
+        ready = ctx.Queue()
+        self.process = ctx.Process(target=_serve,
+                                   args=(self.port, args, ready), daemon=True)
+        self.process.start()
+        self.ids = ready.get(timeout=3600)
+        self.pid = self.process.pid
+        socket.create_connection(("127.0.0.1", self.port), 5).close()
+
+    def connect(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port)
+
+        def send(method, url, body=None):
+            headers = {}
+            if body is not None:
+                body = json.dumps(body)
+                headers["Content-Type"] = "application/json"
+            conn.request(method, url, body, headers)
+            r = conn.getresponse()
+            return r.status, r.read()
+        return send
+
+    def close(self):
+        self.process.terminate()
+        self.process.join()
+
+
+DRIVERS = {"client": ClientDriver, "server": ServerDriver}
+
+
+# --- load --------------------------------------------------------------------
+
+def run_thread(send, mix, ids, deadline, record, seed_value):
+    """Send requests from the mix until the deadline.
+
+    record(op, seconds, status) is called for every request.
+    """
+    rnd = random.Random(seed_value)
+    user_ids, place_ids = ids
+    ops, weights = zip(*mix.items())
+    created = []  # ids of reviews this thread may delete
+    while time.perf_counter() < deadline:
+        op = rnd.choices(ops, weights)[0]
+        if op == "delete_review" and not created:
+            op = "get_place"
+        body = None
+        if op == "list_places":
+            method, url = "GET", "/api/v1/places/?limit=20"
+        elif op == "get_place":
+            method, url = "GET", f"/api/v1/places/{rnd.choice(place_ids)}"
+        elif op == "create_review":
+            method, url = "POST", "/api/v1/reviews/"
+            body = {"text": "Load test", "rating": rnd.randint(1, 5),
+                    "user_id": rnd.choice(user_ids),
+                    "place_id": rnd.choice(place_ids)}
+        else:
+            method, url = "DELETE", f"/api/v1/reviews/{created.pop()}"
+        start = time.perf_counter()
+        status, data = send(method, url, body)
+        elapsed = time.perf_counter() - start
+        if op == "create_review" and status == 201:
+            created.append(json.loads(data)["id"])
+        record(op, elapsed, status)
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def latency_summary(seconds):
+    values = sorted(seconds)
+    return {f"p{p}": round(percentile(values, p) * 1000, 3)
+            if values else None for p in (50, 95, 99)} | {
+        "max": round(values[-1] * 1000, 3) if values else None}
+
+
+def peak_rss_mib(pid):
+    """Peak resident set size of a process (Linux /proc), in MiB."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def check_statuses(samples, what):
+    """Raise SystemExit if any request of `samples` failed (status >= 400)."""
+    failed = Counter((op, status) for op, _, status in samples
+                     if status >= 400)
+    if failed:
+        detail = ", ".join(f"{op}: {n} x {status}"
+                           for (op, status), n in sorted(failed.items()))
+        raise SystemExit(f"{what}: {sum(failed.values())} of {len(samples)} "
+                         f"requests failed ({detail}); no numbers reported")
+
+
+def load(driver, mix_name, args):
+    """Warm up, then run the mix: the result dict of one run.
+
+    Exits (SystemExit) as soon as the warmup or the run had a failed
+    request, see check_statuses().
+    """
+    mix = MIXES[mix_name]
+    lock = threading.Lock()
+
+    def recorder(samples):
+        def record(op, seconds, status):
+            with lock:
+                samples.append((op, seconds, status))
+        return record
+
+    def run(duration, recorder):
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(
+            target=run_thread,
+            args=(driver.connect(), mix, driver.ids, deadline, recorder,
+                  args.seed + i))
+            for i in range(args.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    what = f"{driver.name} / {mix_name}"
+    warmup = []  # (op, seconds, status), appended from every thread
+    run(args.warmup, recorder(warmup))
+    check_statuses(warmup, f"{what} warmup")
+    samples = []
+    start = time.perf_counter()
+    run(args.duration, recorder(samples))
+    elapsed = time.perf_counter() - start
+    check_statuses(samples, what)
+
+    by_op = {}
+    for op in mix:
+        times = [s for o, s, _ in samples if o == op]
+        if times:
+            by_op[op] = {"requests": len(times), **latency_summary(times)}
+    return {
+        "driver": driver.name,
+        "mix": mix_name,
+        "threads": args.threads,
+        "duration_s": round(elapsed, 3),
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1),
+        "latency_ms": latency_summary([s for _, s, _ in samples]),
+        "by_op": by_op,
+        "peak_rss_mib": peak_rss_mib(driver.pid),
+    }
+
+
+# --- reporting ---------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, cwd=os.path.dirname(__file__)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def change(new, old):
+    if not old or new is None:
+        return ""
+    return f" ({(new / old - 1) * 100:+.0f}%)"
+
+
+def print_results(results, baseline=None):
+    """Table of the runs, with the % change against a baseline report."""
+    before = {(r["driver"], r["mix"]): r
+              for r in (baseline or {}).get("results", [])}
+    rows = []
+    for r in results:
+        old = before.get((r["driver"], r["mix"]), {})
+        lat, old_lat = r["latency_ms"], old.get("latency_ms", {})
+        rows.append([
+            r["driver"], r["mix"],
+            f"{r['rps']:,.0f}{change(r['rps'], old.get('rps'))}",
+            *(f"{lat[p]}{change(lat[p], old_lat.get(p))}"
+              for p in ("p50", "p95", "p99")),
+            r["peak_rss_mib"]])
+    print_table(["driver", "mix", "req/s", "p50 ms", "p95 ms", "p99 ms",
+                 "peak RSS MiB"], rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--driver", choices=("client", "server", "both"),
+                        default="both")
+    parser.add_argument("--mix", default="default",
+                        help=f"comma-separated, among {', '.join(MIXES)}")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--places", type=int, default=1000)
+    parser.add_argument("--reviews", type=int, default=5,
+                        help="seeded reviews per place")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare with")
+    args = parser.parse_args()
+    mixes = args.mix.split(",")
+    for name in mixes:
+        if name not in MIXES:
+            parser.error(f"unknown mix {name!r}")
+
+    drivers = ["client", "server"] if args.driver == "both" else [args.driver]
+    results = []
+    for name in drivers:
+        driver = DRIVERS[name](args)
+        try:
+            for mix in mixes:
+                results.append(load(driver, mix, args))
+        finally:
+            driver.close()
+
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "repository": os.environ.get("HBNB_REPOSITORY", "memory"),
+        "settings": {k: getattr(args, k) for k in (
+            "users", "places", "reviews", "duration", "warmup", "threads",
+            "seed")},
+        "results": results,
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"\n{args.places:,} places, {args.reviews} reviews each, "
+          f"{args.threads} threads, {args.duration:g} s per run\n")
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    else:
+        print("\n" + json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cost of the instrumentation: requests/s with metrics off, on, and on
+with cProfile sampling.
+Run:  python benchmarks/bench_metrics.py [--requests 5000]
+
+Uses the Flask test client on GET /places/<id> (served from the place
+cache, so the fixed per-request cost dominates) and GET /places/?limit=20.
+"""
+import argparse
+import tempfile
+import time
+
+from helpers import print_table
+from run import create_app
+from app.services.facade import facade
+from config import Config
+
+
+class MetricsOn(Config):
+    METRICS_ENABLED = True
+
+
+class Profiling(MetricsOn):
+    PROFILE_SAMPLE_RATE = 0.01
+    PROFILE_DIR = tempfile.mkdtemp()
+
+
+def rate(client, url, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        assert client.get(url).status_code == 200
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    owner = facade.create_user({"first_name": "Bench", "last_name": "Owner",
+                                "email": "owner@example.com",
+                                "password": "x"})
+    places = facade.create_places(
+        [{"title": f"Place {i}", "price": 50, "latitude": 0, "longitude": 0,
+          "owner_id": owner.id} for i in range(100)])[0]
+    urls = [f"/api/v1/places/{places[0].id}", "/api/v1/places/?limit=20"]
+
+    # Metrics off first: enabling them wraps facade.repo for good
+    setups = [("metrics off", Config), ("metrics on", MetricsOn),
+              ("metrics on + 1% profiled", Profiling)]
+    results = []
+    for label, config in setups:
+        client = create_app(config).test_client()
+        for url in urls:  # warm up
+            rate(client, url, 100)
+        # Best of 3: a single run on a busy machine is noisy
+        results.append([max(rate(client, url, args.requests)
+                            for _ in range(3)) for url in urls])
+
+    rows = []
+    for (label, _), rates in zip(setups, results):
+        rows.append([label] + [
+            f"{r:,.0f} ({(results[0][i] / r - 1) * 100:+.1f}%)"
+            for i, r in enumerate(rates)])
+    print(f"\nBest of 3 x {args.requests:,} requests, requests/s "
+          "(time per request vs off)\n")
+    print_table(["", "GET /places/<id>", "GET /places/?limit=20"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Memory used per Review: slotted model vs the old __dict__-based one.
+Run:  python benchmarks/bench_model_memory.py [--count 1000000]
+
+Both versions build the same field values (uuid id, two ISO timestamps,
+shared text/user/place strings), so the difference is the object layout.
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from helpers import print_table
+from app.models.review import Review
+
+
+class DictReview:
+    """The Review layout before __slots__: every field in a __dict__."""
+
+    def __init__(self, text, rating, user_id, place_id):
+        self.id = str(uuid.uuid4())
+        self.created_at = datetime.utcnow().isoformat()
+        self.updated_at = datetime.utcnow().isoformat()
+        self.text = text
+        self.rating = int(rating)
+        self.user_id = user_id
+        self.place_id = place_id
+
+
+def measure(cls, count):
+    """Return (traced bytes per object, object + __dict__ size)."""
+    gc.collect()
+    tracemalloc.start()
+    objs = [cls("Lovely stay", 4, "user-1", "place-1") for _ in range(count)]
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    one = objs[0]
+    shallow = sys.getsizeof(one)
+    if hasattr(one, "__dict__"):
+        shallow += sys.getsizeof(one.__dict__)
+    del objs
+    return total / count, shallow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = []
+    for name, cls in (("__dict__ (before)", DictReview),
+                      ("__slots__ (after)", Review)):
+        per_obj, shallow = measure(cls, args.count)
+        rows.append([name, f"{per_obj:.0f}", shallow,
+                     f"{per_obj * args.count / 2 ** 20:.0f}"])
+    print(f"\n{args.count:,} reviews\n")
+    print_table(["layout", "bytes/object", "object+dict bytes", "total MiB"],
+                rows)
+
+
+if __name__ == "__main__":
+    main()
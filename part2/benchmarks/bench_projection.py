@@ -0,0 +1,72 @@
+"""
+Map-view projection: full extended places vs ?fields= on GET /places/.
+Run:  python benchmarks/bench_projection.py [--places 1000] [--reviews 20]
+
+Each place has an owner, 3 amenities and --reviews reviews. Pages of
+100 places are fetched with the Flask test client, with and without
+?fields=id,title,latitude,longitude,price; the place cache does not
+serve listings, so every request builds its page.
+"""
+import argparse
+import time
+
+from helpers import print_table
+from run import create_app
+from app.services.facade import facade
+
+VIEWS = [
+    ("full (default)", ""),
+    ("embed=owner", "&embed=owner"),
+    ("reviews_limit=3", "&reviews_limit=3"),
+    ("map view (fields=)", "&fields=id,title,latitude,longitude,price"),
+]
+
+
+def seed(n_places, n_reviews):
+    owner = facade.create_user({"first_name": "Bench", "last_name": "Owner",
+                                "email": "owner@example.com",
+                                "password": "x"})
+    amenities = [facade.create_amenity({"name": f"Amenity {i}"}).id
+                 for i in range(3)]
+    places = facade.create_places(
+        [{"title": f"Place {i}", "price": 50, "latitude": i % 90,
+          "longitude": i % 180, "owner_id": owner.id,
+          "amenity_ids": amenities}
+         for i in range(n_places)])[0]
+    facade.create_reviews(
+        [{"text": "Lovely stay, would come again", "rating": 1 + j % 5,
+          "user_id": owner.id, "place_id": p.id}
+         for p in places for j in range(n_reviews)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--places", type=int, default=1000)
+    parser.add_argument("--reviews", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    seed(args.places, args.reviews)
+    client = create_app().test_client()
+    rows = []
+    baseline = None
+    for label, query in VIEWS:
+        url = "/api/v1/places/?limit=100" + query
+        size = len(client.get(url).data)
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            r = client.get(url)
+            assert r.status_code == 200, r.data[:200]
+        ms = (time.perf_counter() - start) * 1000 / args.requests
+        baseline = baseline or ms
+        rows.append([label, f"{size / 1024:,.1f}", f"{ms:.2f}",
+                     f"{baseline / ms:.1f}x"])
+
+    print(f"\n{args.places:,} places, {args.reviews} reviews each, "
+          "pages of 100\n")
+    print_table(["GET /places/", "KiB per page", "ms per page", "speedup"],
+                rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Cost of turning 10k extended places into a JSON body.
+Run:  python benchmarks/bench_serialize.py [--places 10000] [--repeat 5]
+
+Compares flask-restx marshal() + json.dumps (what marshal_list_with
+did) with the precompiled serializer, encoded by the json module and by
+orjson (if installed). Places get an owner, 3 amenities and 5 reviews.
+"""
+import argparse
+import json
+import time
+
+from flask_restx import marshal
+
+from helpers import print_table
+from app.api.v1 import serializers
+from app.api.v1.places import place_output_model
+from app.services.facade import facade
+
+
+def seed(n_places):
+    owner = facade.create_user({"first_name": "Bench", "last_name": "Owner",
+                                "email": "owner@example.com",
+                                "password": "x"})
+    amenities = [facade.create_amenity({"name": f"Amenity {i}"}).id
+                 for i in range(3)]
+    places = facade.create_places(
+        [{"title": f"Place {i}", "price": 50, "latitude": 0, "longitude": 0,
+          "owner_id": owner.id, "amenity_ids": amenities}
+         for i in range(n_places)])[0]
+    facade.create_reviews(
+        [{"text": "Lovely stay", "rating": 1 + j, "user_id": owner.id,
+          "place_id": p.id} for p in places for j in range(5)])
+    return facade.extend_places(facade.repo.get_all("Place"))
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--places", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    places = seed(args.places)
+    serialize = serializers.serializer(place_output_model)
+    orjson = serializers.orjson
+
+    def compiled_stdlib():
+        serializers.orjson = None
+        serializers.dumps([serialize(p) for p in places])
+        serializers.orjson = orjson
+
+    runs = [
+        ("marshal() + json.dumps", lambda: json.dumps(
+            marshal(places, place_output_model))),
+        ("compiled + json.dumps", compiled_stdlib),
+    ]
+    if orjson is not None:
+        runs.append(("compiled + orjson", lambda: serializers.dumps(
+            [serialize(p) for p in places])))
+
+    rows = []
+    baseline = None
+    for label, func in runs:
+        seconds = best_of(args.repeat, func)
+        baseline = baseline or seconds
+        rows.append([label, f"{seconds * 1000:.0f}",
+                     f"{baseline / seconds:.1f}x"])
+    print(f"\n{args.places:,} extended places\n")
+    print_table(["serializer", "ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
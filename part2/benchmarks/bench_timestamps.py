@@ -0,0 +1,131 @@
+"""
+Timestamps: ISO strings (before) vs epoch-microsecond ints (after).
+Run:  python benchmarks/bench_timestamps.py [--count 200000]
+                                           [--reviews 1000000]
+
+"before" puts back the old BaseModel methods, which stored
+datetime.utcnow().isoformat() strings, for the length of the run.
+Measures, per Review: creating it, update() (which touches updated_at),
+to_dict() (where ints are now formatted) and the memory held by the two
+timestamps. Then lists the reviews "since T" out of --reviews: a page()
+starting at T (one bisect in the order list) vs filtering every review.
+"""
+import argparse
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from helpers import print_table
+from app.models import ids
+from app.models.base_model import BaseModel
+from app.models.review import Review
+from app.persistence.repository import InMemoryRepository
+
+
+def _iso_init(self):
+    self.id = ids.new_id()
+    self.created_at = datetime.utcnow().isoformat()
+    self.updated_at = datetime.utcnow().isoformat()
+
+
+def _iso_touch(self):
+    self.updated_at = datetime.utcnow().isoformat()
+
+
+def _iso_to_dict(self):
+    d = {name: getattr(self, name) for name in self.FIELDS}
+    for name in self.SET_FIELDS:
+        d[name] = list(d[name])
+    return d
+
+
+@contextmanager
+def iso_timestamps():
+    """Run with the BaseModel methods from before this change."""
+    saved = (BaseModel.__init__, BaseModel.touch, BaseModel.to_dict)
+    BaseModel.__init__ = _iso_init
+    BaseModel.touch = _iso_touch
+    BaseModel.to_dict = _iso_to_dict
+    try:
+        yield
+    finally:
+        BaseModel.__init__, BaseModel.touch, BaseModel.to_dict = saved
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def per_object(count, repeat):
+    """(create µs, update µs, to_dict µs, timestamp bytes) per review.
+
+    Each time is the best of `repeat` runs.
+    """
+    best = [float("inf")] * 3
+    for _ in range(repeat):
+        create, reviews = timed(lambda: [
+            Review("Lovely stay", 4, "user-1", "place-1")
+            for _ in range(count)])
+        fresh = reviews[0]
+        # created_at and updated_at are one int object until a change
+        size = sys.getsizeof(fresh.created_at)
+        if fresh.updated_at is not fresh.created_at:
+            size += sys.getsizeof(fresh.updated_at)
+        update, _ = timed(lambda: [r.update({"text": "Still lovely"})
+                                   for r in reviews])
+        to_dict, _ = timed(lambda: [r.to_dict() for r in reviews])
+        best = [min(b, t) for b, t in zip(best, (create, update, to_dict))]
+    return [f"{t / count * 1e6:.2f}" for t in best] + [size]
+
+
+def since_query(count, limit=100):
+    """ms to list the `limit` reviews created after the middle one."""
+    repo = InMemoryRepository()
+    reviews = [Review("Lovely stay", 4, "user-1", "place-1")
+               for _ in range(count)]
+    repo.add_many(reviews)
+    since = reviews[count // 2].created_at
+
+    start = time.perf_counter()
+    paged, _ = repo.page("Review", limit, since=since)
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scanned = sorted((r for r in repo.get_all("Review")
+                      if r.created_at >= since),
+                     key=lambda r: (r.created_at, r.id))[:limit]
+    full_scan = time.perf_counter() - start
+    assert paged == scanned
+    return indexed * 1000, full_scan * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=200_000,
+                        help="reviews for the per-object timings")
+    parser.add_argument("--reviews", type=int, default=1_000_000,
+                        help="reviews stored for the since query")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with iso_timestamps():
+        before = per_object(args.count, args.repeat)
+    after = per_object(args.count, args.repeat)
+    print(f"\n{args.count:,} reviews, per review\n")
+    print_table(["timestamps", "create µs", "update µs", "to_dict µs",
+                 "timestamp bytes"],
+                [["ISO strings (before)"] + before,
+                 ["epoch µs ints (after)"] + after])
+
+    indexed, full_scan = since_query(args.reviews)
+    print(f"\n100 reviews since T, out of {args.reviews:,}\n")
+    print_table(["query", "ms"],
+                [["page(since=T)", f"{indexed:.3f}"],
+                 ["filter every review", f"{full_scan:,.1f}"]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Bulk user import: does it slow down as the users table grows?
+Run:  python benchmarks/bench_user_import.py [--users 1000000]
+
+Imports users through facade.create_users() in batches of --batch
+and prints the rate of every tenth of the import. Each email is checked
+against the unique email index, so the rate should stay flat; a check
+that scanned the users would make it fall as the table grows. Uses the
+backend selected by HBNB_REPOSITORY.
+"""
+import argparse
+import time
+
+from helpers import print_table
+from app.services.facade import facade
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--batch", type=int, default=10000)
+    args = parser.parse_args()
+
+    step = max(args.users // 10, args.batch)
+    rows = []
+    done = 0
+    while done < args.users:
+        start = time.perf_counter()
+        end = min(done + step, args.users)
+        for first in range(done, end, args.batch):
+            batch = [{"first_name": "Bench", "last_name": str(i),
+                      "email": f"user{i}@example.com", "password": "x"}
+                     for i in range(first, min(first + args.batch, end))]
+            _, errors = facade.create_users(batch)
+            assert not errors, errors[:3]
+        seconds = time.perf_counter() - start
+        rows.append([f"{done:,} - {end:,}", f"{(end - done) / seconds:,.0f}"])
+        done = end
+
+    duplicate = [{"first_name": "Bench", "last_name": "Dup",
+                  "email": "USER0@example.com", "password": "x"}]
+    assert facade.create_users(duplicate)[1], "duplicate email accepted"
+    start = time.perf_counter()
+    for i in range(0, args.users, max(args.users // 1000, 1)):
+        facade.get_user_by_email(f"USER{i}@example.com")
+    lookups = len(range(0, args.users, max(args.users // 1000, 1)))
+    lookup_us = (time.perf_counter() - start) * 1e6 / lookups
+
+    print(f"\n{args.users:,} users in batches of {args.batch:,}\n")
+    print_table(["users already stored", "users/s"], rows)
+    print(f"\nget_user_by_email() with {args.users:,} users stored: "
+          f"{lookup_us:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Input validation: jsonschema + model checks (before) vs compiled schemas.
+Run:  python benchmarks/bench_validation.py [--reviews 100000]
+
+"before" is how a review was checked until now: flask-restx's Draft4
+jsonschema pass over the request body, then the hand-written checks of
+Review.__init__ (put back for the run). "after" is the one pass of the
+code Review.SCHEMA compiles.
+
+1. Validation only, µs per review, best of --repeat runs.
+2. POST /reviews/batch with --reviews reviews (Flask test client,
+   backend from HBNB_REPOSITORY), with each way of validating.
+"""
+import argparse
+import time
+from contextlib import contextmanager
+
+from jsonschema import Draft4Validator
+
+from helpers import print_table
+from run import create_app
+from app.api.v1.reviews import review_input_model
+from app.models.base_model import BaseModel
+from app.models.review import Review
+from app.services.facade import facade
+
+draft4 = Draft4Validator(review_input_model.__schema__)
+
+
+def _old_validate(text, rating):
+    if not text or not str(text).strip():
+        raise ValueError("text is required")
+    try:
+        r = int(rating)
+    except (TypeError, ValueError):
+        raise ValueError("rating must be an integer between 1 and 5")
+    if not (1 <= r <= 5):
+        raise ValueError("rating must be between 1 and 5")
+
+
+def _old_init(self, text, rating, user_id, place_id):
+    BaseModel.__init__(self)
+    _old_validate(text, rating)
+    self.text = text
+    self.rating = int(rating)
+    self.user_id = user_id
+    self.place_id = place_id
+
+
+@contextmanager
+def old_validation():
+    """Run with the jsonschema pass and Review checks from before."""
+    saved_init = Review.__init__
+    create_reviews = facade.create_reviews
+
+    def validated(items, atomic=True):
+        for item in items:
+            for error in draft4.iter_errors(item):
+                raise ValueError(error.message)
+        return create_reviews(items, atomic)
+
+    Review.__init__ = _old_init
+    facade.create_reviews = validated
+    try:
+        yield
+    finally:
+        Review.__init__ = saved_init
+        del facade.create_reviews
+
+
+def best(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def review(i, users, places):
+    return {"text": "Lovely stay", "rating": 1 + i % 5,
+            "user_id": users[i % len(users)],
+            "place_id": places[i % len(places)]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--places", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    client = create_app().test_client()
+    users = [facade.create_user({"first_name": "Bench", "last_name": str(i),
+                                 "email": f"bench{i}@example.com",
+                                 "password": "x"}).id
+             for i in range(100)]
+    places = [facade.create_place({"title": f"Place {i}", "price": 50,
+                                   "latitude": 0, "longitude": 0,
+                                   "owner_id": users[i % len(users)]}).id
+              for i in range(args.places)]
+    items = [review(i, users, places) for i in range(args.reviews)]
+    fields = [(d["text"], d["rating"], d["user_id"], d["place_id"])
+              for d in items]
+
+    def jsonschema_pass():
+        for item in items:
+            for error in draft4.iter_errors(item):
+                raise ValueError(error.message)
+
+    def model_checks():
+        for text, rating, _, _ in fields:
+            _old_validate(text, rating)
+
+    def compiled():
+        check = Review.check_new
+        for values in fields:
+            check(*values)
+
+    per = {name: best(func, args.repeat) / args.reviews * 1e6
+           for name, func in (("jsonschema", jsonschema_pass),
+                              ("model", model_checks),
+                              ("compiled", compiled))}
+    before = per["jsonschema"] + per["model"]
+    print(f"\nValidation only, {args.reviews:,} reviews, µs per review\n")
+    print_table(["validation", "µs/review"],
+                [["Draft4 jsonschema", f"{per['jsonschema']:.2f}"],
+                 ["hand-written model checks", f"{per['model']:.2f}"],
+                 ["total (before)", f"{before:.2f}"],
+                 ["compiled schema (after)", f"{per['compiled']:.2f}"]])
+
+    def post_batch():
+        start = time.perf_counter()
+        r = client.post("/api/v1/reviews/batch", json=items)
+        assert r.status_code == 201, r.data[:200]
+        return time.perf_counter() - start
+
+    with old_validation():
+        old = post_batch()
+    new = post_batch()
+    print(f"\nPOST /reviews/batch, {args.reviews:,} reviews over "
+          f"{args.places:,} places\n")
+    print_table(["validation", "seconds", "reviews/s"],
+                [["jsonschema + model (before)", f"{old:.2f}",
+                  f"{args.reviews / old:,.0f}"],
+                 ["compiled schema (after)", f"{new:.2f}",
+                  f"{args.reviews / new:,.0f}"]])
+
+
+if __name__ == "__main__":
+    main()
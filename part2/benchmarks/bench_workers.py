@@ -0,0 +1,139 @@
+"""
+Throughput with 1 to N worker processes sharing one SQLite database.
+Run:  python benchmarks/bench_workers.py [--workers 1,2,4] [--duration 5]
+
+Each worker is a separate process serving the app (like a gunicorn
+worker) on its own port; client processes spread their requests over
+all workers, as a load balancer would. The mix is 90% GET /places/<id>
+and 10% POST /reviews/, so caches must be invalidated across workers.
+Scaling is bounded by the number of CPU cores of the machine.
+"""
+import argparse
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+
+from helpers import print_table
+
+BASE_PORT = 5600
+
+
+def serve(port, db_path):
+    """Worker process: one app instance on one port."""
+    os.environ["HBNB_REPOSITORY"] = "sqlite"
+    os.environ["HBNB_SQLITE_PATH"] = db_path
+    from werkzeug.serving import make_server
+    from run import create_app
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, create_app(), threaded=True).serve_forever()
+
+
+def client(ports, place_ids, user_ids, duration, results):
+    """Client process: send requests round-robin until time runs out."""
+    rnd = random.Random(os.getpid())
+    conns = [http.client.HTTPConnection("127.0.0.1", p) for p in ports]
+    done = 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        conn = conns[done % len(conns)]
+        place_id = rnd.choice(place_ids)
+        if rnd.random() < 0.1:
+            body = json.dumps({"text": "bench", "rating": rnd.randint(1, 5),
+                               "user_id": rnd.choice(user_ids),
+                               "place_id": place_id})
+            conn.request("POST", "/api/v1/reviews/", body,
+                         {"Content-Type": "application/json"})
+        else:
+            conn.request("GET", f"/api/v1/places/{place_id}")
+        response = conn.getresponse()
+        response.read()
+        if response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        done += 1
+    results.put(done)
+
+
+def wait_for_port(port, timeout=30):
+    end = time.time() + timeout
+    while time.time() < end:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"worker on port {port} did not start")
+
+
+def seed(db_path, n_users, n_places):
+    """Create users and places; return their ids."""
+    os.environ["HBNB_REPOSITORY"] = "sqlite"
+    os.environ["HBNB_SQLITE_PATH"] = db_path
+    from app.services.facade import HBnBFacade
+    f = HBnBFacade()
+    users = [f.create_user({"first_name": "Bench", "last_name": str(i),
+                            "email": f"bench{i}@example.com",
+                            "password": "x"}).id
+             for i in range(n_users)]
+    places = [f.create_place({"title": f"Place {i}", "price": 50,
+                              "latitude": 0, "longitude": 0,
+                              "owner_id": users[i % n_users]}).id
+              for i in range(n_places)]
+    f.repo.close()
+    return users, places
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--duration", type=float, default=5.0,
+                        help="seconds of load per worker count")
+    parser.add_argument("--clients-per-worker", type=int, default=2)
+    parser.add_argument("--places", type=int, default=200)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    users, places = seed(db_path, 20, args.places)
+    ctx = multiprocessing.get_context("spawn")
+
+    rows = []
+    baseline = None
+    for n in (int(w) for w in args.workers.split(",")):
+        ports = [BASE_PORT + i for i in range(n)]
+        servers = [ctx.Process(target=serve, args=(p, db_path), daemon=True)
+                   for p in ports]
+        for s in servers:
+            s.start()
+        try:
+            for p in ports:
+                wait_for_port(p)
+            results = ctx.Queue()
+            clients = [ctx.Process(target=client,
+                                   args=(ports, places, users,
+                                         args.duration, results))
+                       for _ in range(n * args.clients_per_worker)]
+            for c in clients:
+                c.start()
+            total = sum(results.get(timeout=args.duration + 60)
+                        for _ in clients)
+            for c in clients:
+                c.join()
+        finally:
+            for s in servers:
+                s.terminate()
+                s.join()
+        rate = total / args.duration
+        baseline = baseline or rate
+        rows.append([n, f"{rate:.0f}", f"{rate / baseline:.2f}x"])
+
+    print(f"\n{os.cpu_count()} CPU core(s)\n")
+    print_table(["workers", "requests/s", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
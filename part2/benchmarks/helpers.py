@@ -0,0 +1,23 @@
+"""
+Shared helpers for the benchmark scripts.
+Benchmarks are not tests: they print numbers, they do not pass or fail.
+"""
+import os
+import sys
+
+# Make 'part2/' importable no matter which directory the script runs from
+_PART2 = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if _PART2 not in sys.path:
+    sys.path.insert(0, _PART2)
+
+
+def print_table(headers, rows):
+    """Print rows as a plain text table with aligned columns."""
+    rows = [[str(c) for c in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows))
+              for i, h in enumerate(headers)]
+    line = "  ".join(f"{{:>{w}}}" for w in widths)
+    print(line.format(*headers))
+    print(line.format(*("-" * w for w in widths)))
+    for row in rows:
+        print(line.format(*row))
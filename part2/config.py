@@ -1,10 +1,42 @@
 """App configuration settings."""
+import os
 
 
 class Config:
     """Default configuration."""
     DEBUG = False
     TESTING = False
+    # Storage backend used by the facade: "memory", "sqlite" or "durable"
+    REPOSITORY = os.environ.get("HBNB_REPOSITORY", "memory")
+    # Database file used when REPOSITORY is "sqlite"
+    SQLITE_PATH = os.environ.get("HBNB_SQLITE_PATH", "hbnb.db")
+    # REPOSITORY "durable": in-memory data, logged to files in this folder.
+    # Sync mode: "group" (shared fsyncs), "always" (one fsync per write)
+    # or "none" (no fsync, the OS decides)
+    DURABLE_DIR = os.environ.get("HBNB_DURABLE_DIR", "hbnb-data")
+    DURABLE_SYNC = os.environ.get("HBNB_DURABLE_SYNC", "group")
+    DURABLE_SNAPSHOT_EVERY = 100000  # log entries between snapshots
+    # Ids of new objects: "uuid7" (time-ordered) or "uuid4" (random),
+    # see app/models/ids.py
+    ID_STRATEGY = os.environ.get("HBNB_ID_STRATEGY", "uuid7")
+    # Page size of list endpoints when no ?limit= is given, and its cap
+    PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
+    # Most items accepted by one POST /<resource>/batch
+    MAX_BATCH_SIZE = 100000
+    # Cache of extended place documents (GET /places/<id>)
+    PLACE_CACHE_SIZE = 10000   # entries
+    PLACE_CACHE_TTL = 300      # seconds
+    # Opt-in instrumentation (app/api/metrics.py): latency and repository
+    # call histograms on GET /metrics, in the Prometheus text format
+    METRICS_ENABLED = os.environ.get("HBNB_METRICS", "0") == "1"
+    # With metrics on: share of requests saved as cProfile dumps (0 = none)
+    PROFILE_SAMPLE_RATE = float(os.environ.get("HBNB_PROFILE_RATE", "0"))
+    PROFILE_DIR = os.environ.get("HBNB_PROFILE_DIR", "profiles")
+    # With metrics on: log requests making more repository calls (N+1)
+    REPOSITORY_CALLS_WARN = 100
+    # asgi.py: threads running the Flask app and blocking storage calls
+    ASGI_THREADS = int(os.environ.get("HBNB_ASGI_THREADS", "16"))
 
 
 class DevelopmentConfig(Config):
@@ -16,3 +48,15 @@ class TestingConfig(Config):
     """Configuration used for tests."""
     TESTING = True
     DEBUG = True
+
+
+config_by_name = {
+    "default":     Config,
+    "development": DevelopmentConfig,
+    "testing":     TestingConfig,
+}
+
+
+def get_config():
+    """Return the config class selected by the HBNB_ENV variable."""
+    return config_by_name[os.environ.get("HBNB_ENV", "default")]
@@ -1,15 +1,20 @@
 """Entry point – run this file to start the server."""
+import click
 from flask import Flask
 from flask_restx import Api
 
+from config import get_config
+from app.api.metrics import init_metrics
 from app.api.v1.users import ns as users_ns
 from app.api.v1.amenities import ns as amenities_ns
 from app.api.v1.places import ns as places_ns
 from app.api.v1.reviews import ns as reviews_ns
+from app.services.facade import facade
 
 
-def create_app():
+def create_app(config=None):
     """Create and configure the Flask app."""
+    config = config or get_config()
     app = Flask(__name__)
 
     # Set up the API with Swagger documentation
@@ -18,7 +23,8 @@ def create_app():
         version="1.0",
         title="HBnB API",
         description="HBnB Application API",
-        doc="/",
+        prefix="/api/v1",
+        doc="/api/v1/doc",
     )
 
     # Register each namespace (group of related endpoints)
@@ -27,6 +33,22 @@ def create_app():
     api.add_namespace(places_ns,    path="/places")
     api.add_namespace(reviews_ns,   path="/reviews")
 
+    # Opt-in: HBNB_METRICS=1 adds GET /metrics (see app/api/metrics.py)
+    if config.METRICS_ENABLED:
+        init_metrics(app, facade, config)
+
+    # Maintenance command:  flask --app run check-ratings [--fix]
+    @app.cli.command("check-ratings")
+    @click.option("--fix", is_flag=True, help="Overwrite wrong totals.")
+    def check_ratings(fix):
+        """Recompute rating totals from reviews and report mismatches."""
+        problems = facade.check_rating_totals(fix=fix)
+        for model_name, obj_id, stored, actual in problems:
+            click.echo(f"{model_name} {obj_id}: stored (count, sum) "
+                       f"{stored}, actual {actual}")
+        status = "fixed" if fix else "found"
+        click.echo(f"{len(problems)} inconsistent object(s) {status}")
+
     return app
 
 
@@ -48,6 +48,32 @@ def get(url):
     return r.status_code, json.loads(r.data)
 
 
+def get_with_headers(url):
+    """Like get(), but also return the response headers."""
+    r = client.get(url)
+    return r.status_code, json.loads(r.data), r.headers
+
+
+def get_if_none_match(url, etag):
+    """Conditional GET: return (status, headers) -- a 304 has no body."""
+    r = client.get(url, headers={"If-None-Match": etag})
+    return r.status_code, r.headers
+
+
+def post_ndjson(url, items):
+    """POST items as NDJSON (one JSON object per line)."""
+    body = "\n".join(json.dumps(item) for item in items)
+    r = client.post(url, data=body, content_type="application/x-ndjson")
+    return r.status_code, json.loads(r.data)
+
+
+def get_ndjson(url):
+    """GET an NDJSON stream: (status, content type, list of objects)."""
+    r = client.get(url)
+    items = [json.loads(line) for line in r.data.splitlines()]
+    return r.status_code, r.mimetype, items
+
+
 def put(url, body):
     r = client.put(url, json=body)
     return r.status_code, json.loads(r.data)
@@ -11,6 +11,13 @@ TEST_FILES = [
     "tests/test_amenities.py",
     "tests/test_places.py",
     "tests/test_reviews.py",
+    "tests/test_repository.py",
+    "tests/test_cache.py",
+    "tests/test_models.py",
+    "tests/test_concurrency.py",
+    "tests/test_serializers.py",
+    "tests/test_metrics.py",
+    "tests/test_asgi.py",
 ]
 
 # Run each file as its own process so storage is always fresh
@@ -2,7 +2,7 @@
 Tests for Amenity endpoints.
 Run:  python tests/test_amenities.py
 """
-from helpers import check, post, get, put, summary
+from helpers import check, post, get, get_with_headers, put, summary
 
 print("\n--- Amenity Tests ---")
 
@@ -34,6 +34,25 @@ post("/api/v1/amenities/", {"name": "Pool"})
 status, data = get("/api/v1/amenities/")
 check("List grows after second amenity", len(data) >= 2)
 
+# --- pagination --------------------------------------------------------------
+post("/api/v1/amenities/", {"name": "Sauna"})
+status, page1, headers = get_with_headers("/api/v1/amenities/?limit=2")
+check("GET /amenities/?limit=2 returns 2 items", len(page1) == 2)
+cursor = headers.get("X-Next-Cursor")
+check("First page has a next cursor", bool(cursor))
+status, page2, headers = get_with_headers(
+    f"/api/v1/amenities/?limit=2&cursor={cursor}")
+check("Second page returns the rest", [a["name"] for a in page2] == ["Sauna"])
+check("Last page has no next cursor", "X-Next-Cursor" not in headers)
+check("Pages do not overlap",
+      not {a["id"] for a in page1} & {a["id"] for a in page2})
+
+status, _ = get("/api/v1/amenities/?cursor=not-a-cursor")
+check("GET with a bad cursor returns 400", status == 400)
+
+status, _ = get("/api/v1/amenities/?limit=0")
+check("GET with limit=0 returns 400", status == 400)
+
 # --- validation errors -------------------------------------------------------
 status, _ = post("/api/v1/amenities/", {"name": ""})
 check("POST with empty name returns 400", status == 400)
@@ -0,0 +1,140 @@
+"""
+Tests for the ASGI front end (asgi.py), called in-process.
+Run:  python tests/test_asgi.py
+"""
+import asyncio
+import json
+import tempfile
+
+from helpers import check, client, post, summary
+from asgi import create_asgi_app
+from app.persistence.durable_repository import DurableRepository
+from app.services.async_facade import AsyncFacade, blocking_calls
+from app.services.facade import MODELS, facade
+from config import Config
+
+asgi_app = create_asgi_app()
+
+
+def make_scope(method, url, headers=None):
+    path, _, query = url.partition("?")
+    return {"type": "http", "method": method, "path": path,
+            "query_string": query.encode(),
+            "headers": [(k.lower().encode(), v.encode())
+                        for k, v in (headers or {}).items()],
+            "http_version": "1.1", "scheme": "http",
+            "server": ("testserver", 80), "root_path": ""}
+
+
+def call(app, method, url, body=None, headers=None):
+    """One request through the ASGI app: (status, headers, body bytes)."""
+    raw = json.dumps(body).encode() if body is not None else b""
+    if body is not None:
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+    scope = make_scope(method, url, headers)
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = messages[0]
+    response_headers = {k.decode().lower(): v.decode()
+                        for k, v in start["headers"]}
+    data = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], response_headers, data
+
+
+def same_as_wsgi(url):
+    """The ASGI and WSGI responses to GET url have equal status/ETag/JSON."""
+    status, headers, data = call(asgi_app, "GET", url)
+    r = client.get(url)
+    return (status == r.status_code
+            and headers.get("etag") == r.headers.get("ETag")
+            and headers.get("x-next-cursor") == r.headers.get("X-Next-Cursor")
+            and json.loads(data) == r.get_json())
+
+
+print("\n--- ASGI Tests ---")
+
+_, owner = post("/api/v1/users/", {"first_name": "Asa", "last_name": "Sync",
+                                   "email": "asa@example.com",
+                                   "password": "pw"})
+_, wifi = post("/api/v1/amenities/", {"name": "Wifi"})
+_, place = post("/api/v1/places/", {"title": "Loop Loft", "price": 80,
+                                    "latitude": 48.8, "longitude": 2.3,
+                                    "owner_id": owner["id"],
+                                    "amenity_ids": [wifi["id"]]})
+
+# --- native GET routes -------------------------------------------------------
+native = [asyncio.run(asgi_app._native(make_scope("GET", url))) for url in (
+    "/api/v1/places/", f"/api/v1/places/{place['id']}", "/api/v1/users/")]
+check("Hot GET routes are answered by the async handlers",
+      all(r is not None and r[0] == 200 for r in native)
+      and asyncio.run(asgi_app._native(
+          make_scope("GET", "/api/v1/places/search?lat=1&lon=2"))) is None)
+check("GET /users/ and /users/<id> match the Flask app",
+      same_as_wsgi("/api/v1/users/")
+      and same_as_wsgi(f"/api/v1/users/{owner['id']}")
+      and same_as_wsgi("/api/v1/users/?email=ASA@example.com"))
+check("GET /amenities/ and /amenities/<id> match the Flask app",
+      same_as_wsgi("/api/v1/amenities/?limit=1")
+      and same_as_wsgi(f"/api/v1/amenities/{wifi['id']}"))
+check("GET /places/ with filters and projections matches the Flask app",
+      same_as_wsgi("/api/v1/places/")
+      and same_as_wsgi("/api/v1/places/?min_price=50&sort=rating")
+      and same_as_wsgi("/api/v1/places/?fields=id,title,owner"))
+check("GET /places/<id> matches the Flask app, projections included",
+      same_as_wsgi(f"/api/v1/places/{place['id']}")
+      and same_as_wsgi(f"/api/v1/places/{place['id']}?embed=owner"
+                       "&reviews_limit=1"))
+
+status, headers, _ = call(asgi_app, "GET", f"/api/v1/places/{place['id']}")
+status, _, data = call(asgi_app, "GET", f"/api/v1/places/{place['id']}",
+                       headers={"If-None-Match": headers["etag"]})
+check("If-None-Match with the current ETag gives 304, no body",
+      status == 304 and data == b"")
+
+# --- handed to the Flask app -------------------------------------------------
+status, _, data = call(asgi_app, "POST", "/api/v1/reviews/",
+                       {"text": "Fast", "rating": 5,
+                        "user_id": owner["id"], "place_id": place["id"]})
+review = json.loads(data)
+check("POST goes through the Flask app (201, review created)",
+      status == 201 and facade.get_review(review["id"]) is not None)
+check("GET /reviews/<id> matches the Flask app",
+      same_as_wsgi(f"/api/v1/reviews/{review['id']}"))
+check("Not found, bad arguments and bad projections answer as Flask does",
+      same_as_wsgi("/api/v1/places/nope")
+      and same_as_wsgi("/api/v1/places/?limit=0")
+      and same_as_wsgi("/api/v1/places/?fields=nope")
+      and same_as_wsgi("/api/v1/users/?cursor=garbage"))
+status, headers, data = call(asgi_app, "GET", "/api/v1/places/export")
+check("Streamed NDJSON exports are relayed through the bridge",
+      status == 200 and headers["content-type"] == "application/x-ndjson"
+      and json.loads(data.splitlines()[0])["id"] == place["id"])
+status, _, _ = call(asgi_app, "DELETE", f"/api/v1/reviews/{review['id']}")
+check("DELETE goes through the Flask app",
+      status == 200 and facade.get_review(review["id"]) is None)
+
+# --- async facade ------------------------------------------------------------
+# (reads block, writes block): only I/O goes to the thread pool
+expected = {"memory": (False, False), "durable": (False, True),
+            "sqlite": (True, True)}[Config.REPOSITORY]
+check("Only calls waiting for I/O are sent to the thread pool",
+      blocking_calls(facade.repo) == expected)
+with tempfile.TemporaryDirectory() as tmp:
+    always = DurableRepository(tmp, MODELS, sync="always")
+    check("Durable reads go to the pool when writers fsync under a lock",
+          blocking_calls(always) == (True, True))
+    always.close()
+async_facade = AsyncFacade(facade, threads=2)
+found = asyncio.run(async_facade.get_user(owner["id"]))
+check("AsyncFacade methods are coroutine versions of the facade's",
+      found.id == owner["id"])
+async_facade.close()
+
+summary()
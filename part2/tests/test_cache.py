@@ -0,0 +1,34 @@
+"""
+Tests for the extended-place cache.
+Run:  python tests/test_cache.py
+"""
+from helpers import check, summary
+from app.services.cache import LRUCache
+
+print("\n--- Cache Tests ---")
+
+# --- LRU eviction and TTL ----------------------------------------------------
+now = [0.0]
+cache = LRUCache(maxsize=2, ttl=10, clock=lambda: now[0])
+cache.set("a", 1)
+cache.set("b", 2)
+check("Cached value is returned", cache.get("a") == 1)
+cache.set("c", 3)  # evicts "b", the least recently used
+check("Least recently used entry is evicted", cache.get("b") is None)
+check("Recently used entry survives", cache.get("a") == 1)
+now[0] = 11
+check("Expired entry is a miss", cache.get("c") is None)
+
+cache.set("d", 4)
+cache.invalidate("d")
+check("Invalidated entry is a miss", cache.get("d") is None)
+
+stats = cache.stats()
+check("Stats count hits and misses", stats["hits"] == 2
+      and stats["misses"] == 3)
+check("Stats count evictions", stats["evictions"] == 1)
+check("Stats count expirations and invalidations",
+      stats["expirations"] == 1 and stats["invalidations"] == 1)
+check("Hit ratio is hits / lookups", stats["hit_ratio"] == 2 / 5)
+
+summary()
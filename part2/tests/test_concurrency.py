@@ -0,0 +1,152 @@
+"""
+Stress test: 32 threads creating places and creating, re-rating and
+deleting reviews at once, then a check that every link and rating
+total is still consistent. Runs against every storage backend.
+Run:  python tests/test_concurrency.py
+"""
+import os
+import random
+import tempfile
+import threading
+
+from helpers import check, summary
+from app.persistence.locks import RWLock
+from app.services.facade import HBnBFacade
+from config import Config
+
+THREADS = 32
+OPS_PER_THREAD = 40
+
+print("\n--- Concurrency Tests ---")
+
+
+# --- RWLock basics -----------------------------------------------------------
+lock = RWLock()
+events = []
+
+
+def reader():
+    with lock.read():
+        events.append("read")
+
+
+with lock.write():
+    with lock.read():  # the writer may also read
+        pass
+    t = threading.Thread(target=reader)
+    t.start()
+    t.join(0.2)
+    check("A reader waits while a writer holds the lock", events == [])
+t.join()
+check("The reader runs once the writer is done", events == ["read"])
+
+with lock.read():
+    try:
+        with lock.write():
+            upgraded = True
+    except RuntimeError:
+        upgraded = False
+check("Upgrading a read lock is refused", upgraded is False)
+
+
+# --- stress ------------------------------------------------------------------
+def hammer(f, users, places, errors, seed):
+    rnd = random.Random(seed)
+    mine = []  # reviews this thread created and has not deleted yet
+    try:
+        for _ in range(OPS_PER_THREAD):
+            op = rnd.random()
+            if op < 0.1:
+                places.append(f.create_place({
+                    "title": "P", "price": rnd.randint(1, 500),
+                    "latitude": 0, "longitude": 0,
+                    "owner_id": rnd.choice(users).id}).id)
+            elif op < 0.6 or not mine:
+                mine.append(f.create_review({
+                    "text": "t", "rating": rnd.randint(1, 5),
+                    "user_id": rnd.choice(users).id,
+                    "place_id": rnd.choice(places)}).id)
+            elif op < 0.75:
+                f.update_review(rnd.choice(mine),
+                                {"rating": rnd.randint(1, 5)})
+            elif op < 0.9:
+                f.delete_review(mine.pop(rnd.randrange(len(mine))))
+            else:
+                f.get_place(rnd.choice(places))
+    except Exception as e:  # reported by the checks below
+        errors.append(repr(e))
+
+
+def consistent(f):
+    """Return a list of broken links (empty when all is well)."""
+    broken = []
+    reviews = f.repo.get_all("Review")
+    for model_name, field in (("Place", "place_id"), ("User", "user_id")):
+        for obj in f.repo.get_all(model_name):
+            expected = {r.id for r in reviews if getattr(r, field) == obj.id}
+            if set(obj.review_ids) != expected:
+                broken.append((model_name, obj.id))
+    for user in f.repo.get_all("User"):
+        owned = {p.id for p in f.repo.find_by("Place", "owner_id", user.id)}
+        if set(user.place_ids) != owned:
+            broken.append(("User.place_ids", user.id))
+    return broken
+
+
+def run_stress(label, config):
+    f = HBnBFacade(config)
+    users = [f.create_user({"first_name": "U", "last_name": str(i),
+                            "email": f"u{i}@example.com", "password": "x"})
+             for i in range(5)]
+    places = [f.create_place({"title": "Seed", "price": 10, "latitude": 0,
+                              "longitude": 0, "owner_id": users[0].id}).id
+              for _ in range(3)]
+    errors = []
+    threads = [threading.Thread(target=hammer,
+                                args=(f, users, places, errors, seed))
+               for seed in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    check(f"{label}: no thread raised", errors == [])
+    if errors:
+        print("        first error:", errors[0])
+    check(f"{label}: review and place links are consistent",
+          consistent(f) == [])
+    check(f"{label}: rating totals match the reviews",
+          f.check_rating_totals() == [])
+    check(f"{label}: every created place is stored",
+          f.repo.count("Place") == len(places))
+    return f
+
+
+class MemoryConfig(Config):
+    REPOSITORY = "memory"
+
+
+class SQLiteConfig(Config):
+    REPOSITORY = "sqlite"
+    SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "stress.db")
+
+
+class DurableConfig(Config):
+    REPOSITORY = "durable"
+    DURABLE_DIR = tempfile.mkdtemp()
+    DURABLE_SNAPSHOT_EVERY = 500  # snapshots run while threads write
+
+
+run_stress("memory", MemoryConfig)
+run_stress("sqlite", SQLiteConfig)
+f = run_stress("durable", DurableConfig)
+f.repo.close()
+reloaded = HBnBFacade(DurableConfig)
+check("durable: a reopen rebuilds the same data",
+      all(reloaded.repo.count(m) == f.repo.count(m)
+          for m in ("User", "Place", "Review"))
+      and consistent(reloaded) == []
+      and reloaded.check_rating_totals() == [])
+reloaded.repo.close()
+
+summary()
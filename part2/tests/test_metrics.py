@@ -0,0 +1,89 @@
+"""
+Tests for the opt-in instrumentation and GET /metrics.
+Run:  python tests/test_metrics.py
+"""
+import glob
+import logging
+import pstats
+import tempfile
+
+from helpers import app, check, client, post, summary
+from run import create_app
+from app.api.metrics import CountingRepository, Histogram
+from app.services.facade import facade
+from config import Config
+
+print("\n--- Metrics Tests ---")
+
+# --- disabled by default -----------------------------------------------------
+check("Without HBNB_METRICS there is no /metrics route",
+      client.get("/metrics").status_code == 404)
+check("... and no request hooks or repository wrapper",
+      not app.before_request_funcs and not app.after_request_funcs
+      and not isinstance(facade.repo, CountingRepository))
+
+# --- histogram ---------------------------------------------------------------
+hist = Histogram((1, 5))
+for value in (0.5, 1, 3, 9):
+    hist.observe(value)
+check("Histogram buckets are cumulative, bounds inclusive",
+      hist.cumulative() == [(1, 2), (5, 3), ("+Inf", 4)]
+      and hist.sum == 13.5 and hist.count == 4)
+
+# --- enabled -----------------------------------------------------------------
+profile_dir = tempfile.mkdtemp()
+
+
+class MetricsConfig(Config):
+    METRICS_ENABLED = True
+    PROFILE_SAMPLE_RATE = 1.0
+    PROFILE_DIR = profile_dir
+    REPOSITORY_CALLS_WARN = 3
+
+
+metrics_app = create_app(MetricsConfig)
+metrics_client = metrics_app.test_client()
+warnings = []
+
+
+class Collect(logging.Handler):
+    def emit(self, record):
+        warnings.append(record.getMessage())
+
+
+metrics_app.logger.addHandler(Collect(logging.WARNING))
+
+_, owner = post("/api/v1/users/", {"first_name": "Mia", "last_name": "Tric",
+                                   "email": "mia@example.com",
+                                   "password": "pw"})
+metrics_client.get(f"/api/v1/users/{owner['id']}")
+metrics_client.get("/api/v1/users/nope")
+r = metrics_client.get("/metrics")
+text = r.get_data(as_text=True)
+check("GET /metrics answers the Prometheus text format",
+      r.status_code == 200 and r.content_type.startswith("text/plain")
+      and "# TYPE hbnb_request_duration_seconds histogram" in text)
+check("Latency is labelled by URL rule, not by id",
+      'hbnb_request_duration_seconds_count{method="GET",'
+      'endpoint="/api/v1/users/<string:user_id>"} 2' in text)
+check("Requests are counted by status",
+      'endpoint="/api/v1/users/<string:user_id>",status="200"} 1' in text
+      and 'endpoint="/api/v1/users/<string:user_id>",status="404"} 1'
+      in text)
+check("Repository calls per request are recorded",
+      'hbnb_request_repository_calls_sum{method="GET",'
+      'endpoint="/api/v1/users/<string:user_id>"} 2' in text
+      and 'hbnb_repository_calls_total{method="get"}' in text)
+check("Place cache counters are exported",
+      "hbnb_place_cache_hits_total" in text
+      and "hbnb_place_cache_entries" in text)
+
+metrics_client.get("/api/v1/places/?limit=5")
+check("A request above REPOSITORY_CALLS_WARN is logged",
+      any("/api/v1/places/" in w and "repository calls" in w
+          for w in warnings))
+dumps = glob.glob(f"{profile_dir}/*.prof")
+check("Sampled requests are saved as cProfile dumps",
+      len(dumps) >= 3 and pstats.Stats(dumps[0]).total_calls > 0)
+
+summary()
@@ -0,0 +1,143 @@
+"""
+Tests for the slotted models (no HTTP involved).
+Run:  python tests/test_models.py
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from helpers import check, summary
+from app.models import ids as id_strategies
+from app.models import timestamps
+from app.models.user import User
+from app.models.place import Place
+from app.models.review import Review
+from app.models.id_set import IdSet
+
+print("\n--- Model Tests ---")
+
+# --- slots instead of a per-object __dict__ ----------------------------------
+user = User("Eve", "Stone", "eve@example.com", "secret")
+review = Review("Fine", 4, user.id, "some-place")
+check("Models have no __dict__",
+      not hasattr(user, "__dict__") and not hasattr(review, "__dict__"))
+check("to_dict follows the FIELDS list",
+      list(review.to_dict()) == list(Review.FIELDS))
+check("User.to_dict leaves the password out",
+      "_password" not in user.to_dict() and "password" not in user.to_dict())
+check("to_record keeps the password",
+      user.to_record()["_password"] == "secret")
+
+# --- update() only touches editable fields -----------------------------------
+user.update({"first_name": "Evelyn", "id": "hacked", "is_admin": True,
+             "review_count": 99})
+check("Editable field is updated", user.first_name == "Evelyn")
+check("id, unknown and read-only fields are ignored",
+      user.id != "hacked" and user.review_count == 0
+      and "is_admin" not in user.to_dict())
+review.update({"place_id": "other-place", "rating": 5})
+check("A review keeps its place", review.place_id == "some-place"
+      and review.rating == 5)
+
+# --- records round-trip, older records get defaults --------------------------
+copy = User.from_record(user.to_record())
+check("from_record rebuilds the same object",
+      copy.to_record() == user.to_record())
+old = user.to_record()
+del old["average_rating"], old["review_count"]
+check("Missing rating fields fall back to defaults",
+      User.from_record(old).review_count == 0)
+place = Place("Hut", "", 10, 1, 1, user.id)
+check("Place round-trips", Place.from_record(place.to_record()).to_dict()
+      == place.to_dict())
+
+# --- relationship ids are insertion-ordered sets -----------------------------
+ids = IdSet(["b", "a"])
+check("IdSet.add reports a new id", ids.add("c") is True)
+check("IdSet.add ignores a duplicate", ids.add("a") is False)
+check("IdSet.discard reports a removed id",
+      ids.discard("b") is True and ids.discard("b") is False)
+check("IdSet keeps insertion order", list(ids) == ["a", "c"])
+place.amenity_ids.add("wifi")
+place.update({"amenity_ids": ["pool", "wifi", "pool"]})
+check("update() turns an id list into an IdSet",
+      isinstance(place.amenity_ids, IdSet)
+      and place.to_dict()["amenity_ids"] == ["pool", "wifi"])
+check("from_record restores IdSets",
+      isinstance(Place.from_record(place.to_record()).review_ids, IdSet))
+
+# --- integer timestamps ------------------------------------------------------
+fresh = Review("Fresh", 3, user.id, "some-place")
+before = fresh.updated_at
+fresh.update({"text": "Fresher"})
+check("Timestamps are epoch microseconds, and update() moves updated_at",
+      type(fresh.created_at) is int and fresh.updated_at > before
+      and fresh.created_at == before)
+rendered = fresh.to_dict()["created_at"]
+utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+check("to_dict renders them as ISO-8601 (UTC)",
+      abs(datetime.fromisoformat(rendered) - utc_now) < timedelta(minutes=1)
+      and timestamps.from_iso(rendered) == fresh.created_at)
+old_record = {**fresh.to_record(), "created_at": "2024-05-01T12:30:00",
+              "updated_at": "2024-05-01T12:30:00.000001"}
+old = Review.from_record(old_record)
+check("from_record reads the ISO strings of older records",
+      old.created_at == 1714566600000000
+      and old.updated_at == old.created_at + 1
+      and old.to_dict()["created_at"] == "2024-05-01T12:30:00")
+stamps = [timestamps.now() for _ in range(1000)]
+check("now() never repeats", stamps == sorted(set(stamps)))
+
+# --- id strategies -----------------------------------------------------------
+new_ids = [User("Ida", "Order", f"ida{i}@example.com", "x").id
+           for i in range(2000)]
+check("New ids are UUIDv7 strings, in creation order",
+      all(uuid.UUID(i).version == 7 and str(uuid.UUID(i)) == i
+          for i in new_ids[:10])
+      and new_ids == sorted(new_ids) and len(set(new_ids)) == len(new_ids))
+id_strategies.set_strategy("uuid4")
+check("The uuid4 strategy gives random UUIDs",
+      uuid.UUID(Review("x", 1, "u", "p").id).version == 4)
+id_strategies.set_strategy("uuid7")
+try:
+    id_strategies.set_strategy("serial")
+    unknown_rejected = False
+except ValueError:
+    unknown_rejected = True
+check("An unknown strategy is refused", unknown_rejected)
+
+# --- compiled schemas --------------------------------------------------------
+def rejects(make):
+    """The ValueError message make() raises, or None."""
+    try:
+        make()
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+check("A rating sent as a string is refused",
+      rejects(lambda: Review("x", "5", "u", "p"))
+      == "rating must be an integer between 1 and 5")
+check("A boolean is not an integer",
+      rejects(lambda: Review("x", True, "u", "p")) is not None)
+check("A missing reference id is refused",
+      rejects(lambda: Review("x", 3, None, "p")) == "user_id is required")
+place = Place("Loft", None, 80, 1, 2, "owner")
+check("Integer numbers are stored as floats, description defaults to ''",
+      type(place.price) is float and type(place.latitude) is float
+      and place.description == "" and list(place.amenity_ids) == [])
+check("Amenity ids must be strings",
+      rejects(lambda: Place("Loft", "", 80, 1, 2, "owner", [1]))
+      == "amenity_ids must be a list of strings")
+check("A bad email is refused",
+      rejects(lambda: User("A", "B", "nope", "pw")) == "Invalid email format")
+review = Review("Fine", 3, "u", "p")
+stamp = review.updated_at
+check("update() with one bad value changes nothing",
+      rejects(lambda: review.update({"text": "Great", "rating": "5"}))
+      is not None and review.text == "Fine" and review.updated_at == stamp)
+check("check_changes() returns only the editable fields sent",
+      Review.check_changes({"rating": 4, "id": "x", "user_id": "u2"})
+      == {"rating": 4})
+
+summary()
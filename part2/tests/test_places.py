@@ -4,7 +4,8 @@ Run:  python tests/test_places.py
 
 Places need an existing User and Amenity, so we create them first.
 """
-from helpers import check, post, get, put, summary
+from helpers import (check, post, post_ndjson, get, get_if_none_match,
+                     get_ndjson, get_with_headers, put, summary)
 
 print("\n--- Place Tests ---")
 
@@ -46,11 +47,42 @@ check("GET /places/<id> returns 200", status == 200)
 check("GET returns extended owner info", isinstance(data.get("owner"), dict))
 check("GET returns amenities list", len(data.get("amenities", [])) == 1)
 
+# --- conditional GET ---------------------------------------------------------
+_, _, headers = get_with_headers(f"/api/v1/places/{PLACE_ID}")
+PLACE_ETAG = headers.get("ETag")
+check("GET /places/<id> sends an ETag", bool(PLACE_ETAG))
+status, headers = get_if_none_match(f"/api/v1/places/{PLACE_ID}", PLACE_ETAG)
+check("Matching If-None-Match returns 304 with the ETag",
+      status == 304 and headers.get("ETag") == PLACE_ETAG)
+status, _ = get_if_none_match(f"/api/v1/places/{PLACE_ID}", '"other"')
+check("Other If-None-Match returns 200", status == 200)
+
+# --- cached place follows changes to its owner and amenities ---------------
+put(f"/api/v1/amenities/{AMENITY_ID}", {"name": "Heated Pool"})
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Renamed amenity shows on a cached place",
+      data["amenities"][0]["name"] == "Heated Pool")
+status, _ = get_if_none_match(f"/api/v1/places/{PLACE_ID}", PLACE_ETAG)
+check("Renamed amenity changes the place's ETag", status == 200)
+
+put(f"/api/v1/users/{OWNER_ID}", {"first_name": "Robert"})
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Renamed owner shows on a cached place",
+      data["owner"]["first_name"] == "Robert")
+
 # --- list all ----------------------------------------------------------------
 status, data = get("/api/v1/places/")
 check("GET /places/ returns 200", status == 200)
 check("At least one place in list", len(data) >= 1)
 check("List items include owner info", isinstance(data[0].get("owner"), dict))
+check("List items include amenity names",
+      data[0]["amenities"] == [{"id": AMENITY_ID, "name": "Heated Pool"}])
+_, _, headers = get_with_headers("/api/v1/places/?limit=5")
+LIST_ETAG = headers.get("ETag")
+status, _ = get_if_none_match("/api/v1/places/?limit=5", LIST_ETAG)
+check("Unchanged listing returns 304", status == 304)
+status, _ = get_if_none_match("/api/v1/places/?limit=6", LIST_ETAG)
+check("Listing ETag depends on the query", status == 200)
 
 # --- update ------------------------------------------------------------------
 status, data = put(f"/api/v1/places/{PLACE_ID}", {
@@ -60,6 +92,125 @@ status, data = put(f"/api/v1/places/{PLACE_ID}", {
 check("PUT /places/<id> returns 200", status == 200)
 check("Title was updated", data.get("title") == "Great Flat")
 check("Price was updated", data.get("price") == 120.0)
+status, _ = get_if_none_match("/api/v1/places/?limit=5", LIST_ETAG)
+check("Updating a place changes the listing ETag", status == 200)
+
+# --- sparse fieldsets and embedding -----------------------------------------
+_, guest = post("/api/v1/users/", {"first_name": "Gus", "last_name": "Guest",
+                                   "email": "gus@example.com",
+                                   "password": "pass"})
+for rating in (5, 3, 4):
+    post("/api/v1/reviews/", {"text": f"Rated {rating}", "rating": rating,
+                              "user_id": guest["id"], "place_id": PLACE_ID})
+
+MAP_VIEW = "fields=id,title,latitude,longitude,price"
+status, data = get(f"/api/v1/places/?{MAP_VIEW}")
+check("?fields= returns only those fields",
+      status == 200 and set(data[0]) == {"id", "title", "latitude",
+                                         "longitude", "price"})
+status, data = get(f"/api/v1/places/{PLACE_ID}?{MAP_VIEW}")
+check("?fields= works on GET /places/<id>",
+      data == {"id": PLACE_ID, "title": "Great Flat", "latitude": 48.85,
+               "longitude": 2.35, "price": 120.0})
+status, data = get(f"/api/v1/places/{PLACE_ID}?embed=owner")
+check("?embed=owner drops amenities and reviews, keeps other fields",
+      data["owner"]["id"] == OWNER_ID and "amenities" not in data
+      and "reviews" not in data and data["review_count"] == 3)
+status, data = get(f"/api/v1/places/{PLACE_ID}?fields=id,reviews"
+                   "&reviews_limit=2")
+check("fields= embeds the relations it lists; reviews_limit caps reviews",
+      set(data) == {"id", "reviews"}
+      and [r["rating"] for r in data["reviews"]] == [5, 3])
+status, data = get(f"/api/v1/places/?embed=reviews&reviews_limit=1"
+                   "&limit=1")
+check("reviews_limit applies to listings",
+      len(data[0]["reviews"]) == 1 and "owner" not in data[0])
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Without parameters the place is fully extended",
+      len(data["reviews"]) == 3 and data["owner"] and data["amenities"])
+status, data = get(f"/api/v1/places/{PLACE_ID}?embed=reviews&reviews_limit=1")
+check("Projection cut from the cached place",
+      [r["rating"] for r in data["reviews"]] == [5] and "owner" not in data)
+
+_, _, headers = get_with_headers(f"/api/v1/places/{PLACE_ID}?{MAP_VIEW}")
+check("A projection has its own ETag", headers["ETag"] != PLACE_ETAG
+      and headers["ETag"] != get_with_headers(
+          f"/api/v1/places/{PLACE_ID}")[2]["ETag"])
+status, _ = get(f"/api/v1/places/{PLACE_ID}?fields=id,secret")
+check("Unknown field returns 400", status == 400)
+status, _ = get(f"/api/v1/places/?embed=guests")
+check("Unknown embed returns 400", status == 400)
+status, _ = get(f"/api/v1/places/{PLACE_ID}?fields=id,owner&embed=reviews")
+check("Field not embedded returns 400", status == 400)
+status, _ = get(f"/api/v1/places/{PLACE_ID}?reviews_limit=-1")
+check("Negative reviews_limit returns 400", status == 400)
+
+# --- geo search --------------------------------------------------------------
+_, london = post("/api/v1/places/", {
+    "title": "London Loft",
+    "price": 80.0,
+    "latitude": 51.5,
+    "longitude": -0.12,
+    "owner_id": OWNER_ID,
+})
+_, fiji = post("/api/v1/places/", {
+    "title": "Fiji Hut",
+    "price": 60.0,
+    "latitude": -17.0,
+    "longitude": 179.9,
+    "owner_id": OWNER_ID,
+})
+
+status, data = get("/api/v1/places/search?lat=48.86&lon=2.34&radius_km=10")
+check("GET /places/search returns 200", status == 200)
+check("Radius search only finds the nearby place",
+      [p["id"] for p in data] == [PLACE_ID])
+check("Search results carry distance_km", 0 < data[0]["distance_km"] < 10)
+
+status, data = get("/api/v1/places/search?lat=48.86&lon=2.34&radius_km=400")
+check("Wider radius finds both places, nearest first",
+      [p["id"] for p in data] == [PLACE_ID, london["id"]])
+
+status, data = get("/api/v1/places/search?bbox=-1,50,1,52")
+check("Bounding-box search finds the place inside",
+      [p["id"] for p in data] == [london["id"]])
+
+status, data = get("/api/v1/places/search?bbox=179,-18,-179,-16")
+check("Bounding box crossing the antimeridian works",
+      [p["id"] for p in data] == [fiji["id"]])
+
+status, data = get("/api/v1/places/search?lat=-17&lon=-179.95&radius_km=50")
+check("Radius search crossing the antimeridian works",
+      [p["id"] for p in data] == [fiji["id"]])
+
+status, _ = get("/api/v1/places/search?lat=48.86&lon=2.34")
+check("Search without radius_km returns 400", status == 400)
+
+status, _ = get("/api/v1/places/search?bbox=1,2,3")
+check("Search with a malformed bbox returns 400", status == 400)
+
+# --- price / amenity filters -------------------------------------------------
+status, data = get("/api/v1/places/?max_price=100")
+check("GET /places/?max_price=100 returns cheaper places only",
+      sorted(p["title"] for p in data) == ["Fiji Hut", "London Loft"])
+
+status, data = get(f"/api/v1/places/?min_price=100&amenity_ids={AMENITY_ID}")
+check("Price + amenity filter returns the matching place",
+      [p["id"] for p in data] == [PLACE_ID])
+
+status, data = get(f"/api/v1/places/?max_price=100&amenity_ids={AMENITY_ID}")
+check("Filters are combined (no cheap place has the amenity)", data == [])
+
+status, data = get("/api/v1/places/?amenity_ids=fake-amenity-id")
+check("Unknown amenity filter returns an empty list", data == [])
+
+_, everything = get("/api/v1/places/")
+status, data = get("/api/v1/places/?amenity_ids=")
+check("Empty amenity filter is ignored",
+      status == 200 and data == everything)
+status, data = get(f"/api/v1/places/?amenity_ids={AMENITY_ID},")
+check("Trailing comma in the amenity filter is ignored",
+      PLACE_ID in [p["id"] for p in data])
 
 # --- validation errors -------------------------------------------------------
 status, _ = post("/api/v1/places/", {
@@ -130,4 +281,43 @@ check("GET with fake id returns 404", status == 404)
 status, _ = put("/api/v1/places/fake-id-000", {"title": "Ghost"})
 check("PUT with fake id returns 404", status == 404)
 
+# --- bulk creation -----------------------------------------------------------
+def bulk_place(i, owner_id=OWNER_ID):
+    return {"title": f"Bulk {i}", "price": 20.0, "latitude": 1.0,
+            "longitude": 1.0, "owner_id": owner_id,
+            "amenity_ids": [AMENITY_ID]}
+
+
+status, data = post_ndjson("/api/v1/places/batch",
+                           [bulk_place(i) for i in range(3)])
+check("POST /places/batch accepts NDJSON", status == 201
+      and len(data["ids"]) == 3)
+status, place = get(f"/api/v1/places/{data['ids'][0]}")
+check("Batch place is extended with owner and amenities",
+      place["owner"]["id"] == OWNER_ID
+      and place["amenities"][0]["id"] == AMENITY_ID)
+
+status, data = post("/api/v1/places/batch?atomic=false",
+                    [bulk_place(3), bulk_place(4, "fake-owner"),
+                     bulk_place(5)])
+check("Non-atomic batch creates the valid items (207)",
+      status == 207 and data["ids"][0] and data["ids"][2]
+      and data["ids"][1] is None)
+check("Non-atomic batch reports the failed item",
+      data["errors"] == [{"index": 1, "message": "owner not found"}])
+status, data = post("/api/v1/places/batch",
+                    [bulk_place(6), bulk_place(7, "fake-owner")])
+_, listing = get("/api/v1/places/?limit=1000")
+check("Atomic batch with a missing owner creates nothing",
+      status == 400 and "Bulk 6" not in {p["title"] for p in listing})
+
+# --- NDJSON export -----------------------------------------------------------
+status, mimetype, exported = get_ndjson("/api/v1/places/export")
+check("GET /places/export streams NDJSON",
+      status == 200 and mimetype == "application/x-ndjson")
+check("Export has every place, oldest first",
+      [p["id"] for p in exported] == [p["id"] for p in listing])
+_, first = get(f"/api/v1/places/{listing[0]['id']}")
+check("Exported place matches GET /places/<id>", exported[0] == first)
+
 summary()
@@ -0,0 +1,466 @@
+"""
+Tests for the persistence layer (no HTTP involved).
+Run:  python tests/test_repository.py
+"""
+import os
+import tempfile
+
+from helpers import check, summary
+from app.persistence.durable_repository import DurableRepository, _frame
+from app.persistence.repository import DuplicateError, InMemoryRepository
+from app.persistence.sqlite_repository import SQLiteRepository
+from app.models.user import User
+from app.models.place import Place
+from app.models.review import Review
+from app.models.amenity import Amenity
+from app.models.id_set import IdSet
+from app.services.facade import HBnBFacade
+from config import Config
+
+print("\n--- Repository Tests ---")
+
+# --- setup -------------------------------------------------------------------
+repo = InMemoryRepository()
+user = User("Dan", "Green", "dan@example.com", "pass")
+repo.add(user)
+place_a = Place("Flat A", "", 50, 10.0, 10.0, user.id)
+place_b = Place("Flat B", "", 60, 11.0, 11.0, user.id)
+repo.add(place_a)
+repo.add(place_b)
+r1 = Review("Nice", 4, user.id, place_a.id)
+r2 = Review("Okay", 3, user.id, place_a.id)
+r3 = Review("Bad", 1, user.id, place_b.id)
+for r in (r1, r2, r3):
+    repo.add(r)
+
+# --- find_by uses the secondary indexes --------------------------------------
+found = repo.find_by("Review", "place_id", place_a.id)
+check("find_by returns only the place's reviews", found == [r1, r2])
+check("find_by on user_id returns all user reviews",
+      len(repo.find_by("Review", "user_id", user.id)) == 3)
+check("find_by on owner_id returns owned places",
+      repo.find_by("Place", "owner_id", user.id) == [place_a, place_b])
+check("find_by with unknown value returns []",
+      repo.find_by("Review", "place_id", "nope") == [])
+check("find_by on a non-indexed field still works",
+      repo.find_by("Review", "rating", 1) == [r3])
+
+# --- get_many resolves a batch of ids in one call ---------------------------
+many = repo.get_many("Review", [r1.id, "nope", r3.id])
+check("get_many returns found objects keyed by id",
+      many == {r1.id: r1, r3.id: r3})
+
+# --- page() walks a bucket in (created_at, id) order -------------------------
+in_order = sorted([r1, r2, r3], key=lambda r: (r.created_at, r.id))
+items, cursor = repo.page("Review", 2)
+check("page returns the first 2 reviews in order", items == in_order[:2])
+items, cursor = repo.page("Review", 2, cursor)
+check("page with cursor returns the rest",
+      items == in_order[2:] and cursor is None)
+items, _ = repo.page("Review", 10, field="place_id", value=place_b.id)
+check("page can be filtered on an indexed field", items == [r3])
+place_a_order = [r for r in in_order if r.place_id == place_a.id]
+items, cursor = repo.page("Review", 1, field="place_id", value=place_a.id)
+check("page by field returns the oldest match first",
+      items == place_a_order[:1] and cursor is not None)
+items, cursor = repo.page("Review", 1, cursor, field="place_id",
+                          value=place_a.id)
+check("page by field with cursor returns the next match",
+      items == place_a_order[1:] and cursor is None)
+items, _ = repo.page("Review", 10, since=in_order[1].created_at)
+check("page(since=) starts at the first object created at that time",
+      items == in_order[1:])
+
+# --- spatial grid index ------------------------------------------------------
+check("within_bbox finds places inside the box",
+      repo.within_bbox("Place", 9.5, 9.5, 10.5, 10.5) == [place_a])
+repo.update("Place", place_b.id, {"latitude": 10.2, "longitude": 10.2})
+check("within_bbox follows a moved place",
+      {p.id for p in repo.within_bbox("Place", 9.5, 9.5, 10.5, 10.5)}
+      == {place_a.id, place_b.id})
+check("within_bbox on an empty area returns []",
+      repo.within_bbox("Place", -50, -50, -40, -40) == [])
+
+# --- sorted price index and amenity inverted index ---------------------------
+check("count_range counts prices in range",
+      repo.count_range("Place", "price", 40, 55) == 1)
+check("find_range returns places in price order",
+      repo.find_range("Place", "price", None, None) == [place_a, place_b])
+place_c = Place("Flat C", "", 70, 12.0, 12.0, user.id, ["wifi", "pool"])
+repo.add(place_c)
+check("count_by on a list field counts each element",
+      repo.count_by("Place", "amenity_ids", "pool") == 1)
+repo.update("Place", place_c.id, {"amenity_ids": ["wifi"], "price": 45})
+check("Amenity index follows an update",
+      repo.find_by("Place", "amenity_ids", "pool") == []
+      and repo.find_by("Place", "amenity_ids", "wifi") == [place_c])
+check("Price index follows an update",
+      repo.find_range("Place", "price", 40, 55) == [place_c, place_a])
+repo.delete("Place", place_c.id)
+check("Deleted place leaves the price index",
+      repo.count_range("Place", "price") == 2)
+
+# --- indexes follow updates and deletes --------------------------------------
+repo.update("User", user.id, {"email": "daniel@example.com"})
+check("Index follows an email update",
+      repo.find_by("User", "email", "daniel@example.com") == [user])
+check("Old email no longer indexed",
+      repo.find_by("User", "email", "dan@example.com") == [])
+
+version = repo.version("Review")
+repo.delete("Review", r1.id)
+check("Deleted review leaves the index",
+      repo.find_by("Review", "place_id", place_a.id) == [r2])
+check("Deleted review leaves the paged index",
+      repo.page("Review", 10, field="place_id", value=place_a.id)[0] == [r2])
+repo.modify("Review", r3.id, lambda r: setattr(r, "place_id", place_a.id))
+moved, _ = repo.page("Review", 10, field="place_id", value=place_a.id)
+check("Paged index follows a place_id update",
+      moved == sorted([r2, r3], key=lambda r: (r.created_at, r.id))
+      and repo.page("Review", 10, field="place_id",
+                    value=place_b.id)[0] == [])
+repo.modify("Review", r3.id, lambda r: setattr(r, "place_id", place_b.id))
+check("Delete bumps the bucket version", repo.version("Review") != version)
+version = repo.version("Review")
+repo.delete("Review", r1.id)
+check("Nothing deleted keeps the version", repo.version("Review") == version)
+
+# --- unique email index ------------------------------------------------------
+def rejects_duplicate(write):
+    try:
+        write()
+    except DuplicateError:
+        return True
+    return False
+
+
+def check_unique_email(label, store):
+    first = User("Uma", "One", "uma@example.com", "pw")
+    store.add(first)
+    check(f"{label}: find_unique ignores case",
+          store.find_unique("User", "email", "UMA@example.com").id
+          == first.id)
+    check(f"{label}: add with a taken email raises DuplicateError",
+          rejects_duplicate(lambda: store.add(
+              User("Uma", "Two", "Uma@Example.com", "pw"))))
+    second = User("Ulf", "Two", "ulf@example.com", "pw")
+    store.add(second)
+    check(f"{label}: update to a taken email raises, keeps the old one",
+          rejects_duplicate(lambda: store.update(
+              "User", second.id, {"email": "uma@example.com"}))
+          and store.get("User", second.id).email == "ulf@example.com"
+          and store.find_unique("User", "email", "ulf@example.com"))
+    store.update("User", second.id, {"email": "ulf2@example.com"})
+    check(f"{label}: a freed email can be taken again",
+          store.find_unique("User", "email", "ulf@example.com") is None)
+    store.add(User("Ulf", "Three", "ulf@example.com", "pw"))
+
+
+check_unique_email("Memory", InMemoryRepository())
+unique_db = os.path.join(tempfile.mkdtemp(), "unique.db")
+check_unique_email("SQLite", SQLiteRepository(unique_db, (User,)))
+
+old_db = os.path.join(tempfile.mkdtemp(), "old.db")
+old = SQLiteRepository(old_db, (User,), unique_indexes={})
+old.add(User("Old", "One", "old@example.com", "pw"))
+old.add(User("Old", "Two", "OLD@example.com", "pw"))
+old.close()
+try:
+    SQLiteRepository(old_db, (User,))
+    refused = False
+except ValueError:
+    refused = True
+check("SQLite refuses to index emails already duplicated", refused)
+
+# --- SQLite backend: same interface, data survives a reopen -----------------
+tmp_dir = tempfile.mkdtemp()
+db_path = os.path.join(tmp_dir, "hbnb.db")
+models = (User, Amenity, Place, Review)
+sql = SQLiteRepository(db_path, models)
+sql.add(user)
+sql.add(place_a)
+sql.add(r2)
+check("SQLite get returns a copy with the same data",
+      sql.get("User", user.id).to_dict() == user.to_dict())
+check("SQLite keeps the private password",
+      sql.get("User", user.id)._password == "pass")
+check("SQLite get_many skips missing ids",
+      list(sql.get_many("Place", [place_a.id, "nope"])) == [place_a.id])
+sql.add(r3)
+items, cursor = sql.page("Review", 1)
+check("SQLite page returns one item and a cursor", len(items) == 1 and cursor)
+items, cursor = sql.page("Review", 1, cursor)
+check("SQLite page with cursor reaches the end", len(items) == 1
+      and cursor is None)
+items, _ = sql.page("Review", 10, since=r3.created_at)
+check("SQLite page(since=)", [r.id for r in items] == [r3.id])
+stored_at = sql._conn().execute('SELECT created_at FROM "Review" '
+                                "WHERE id = ?", (r3.id,)).fetchone()[0]
+check("SQLite orders by ISO strings, as in older databases",
+      stored_at == r3.to_dict()["created_at"])
+check("SQLite within_bbox",
+      [p.id for p in sql.within_bbox("Place", 9, 9, 11, 11)] == [place_a.id])
+check("SQLite count_range on price",
+      sql.count_range("Place", "price", 40, 60) == 1)
+sql.add(Place("Flat S", "", 90, 1.0, 1.0, user.id, ["wifi"]))
+check("SQLite find_by on a list field",
+      [p.title for p in sql.find_by("Place", "amenity_ids", "wifi")]
+      == ["Flat S"])
+check("SQLite count_by on a list field",
+      sql.count_by("Place", "amenity_ids", "wifi") == 1)
+check("SQLite exists()", sql.exists("Place", place_a.id))
+check("SQLite find_by on place_id",
+      [r.id for r in sql.find_by("Review", "place_id", place_a.id)] == [r2.id])
+updated = sql.update("Place", place_a.id, {"title": "Flat A+"})
+check("SQLite update returns the updated object", updated.title == "Flat A+")
+check("SQLite update returns None for unknown id",
+      sql.update("Place", "nope", {"title": "x"}) is None)
+check("SQLite delete returns True", sql.delete("Review", r2.id) is True)
+check("SQLite second delete returns False",
+      sql.delete("Review", r2.id) is False)
+version = sql.version("Place")
+sql.update("Place", place_a.id, {"title": "Flat A+"})
+check("SQLite update bumps the table version", sql.version("Place") != version)
+bulk = [Amenity(f"Bulk {i}") for i in range(3)]
+sql.add_many(bulk)
+changed = sql.modify_many("Amenity", [a.id for a in bulk] + ["nope"],
+                          lambda a: a.update({"name": a.name + "!"}))
+check("SQLite add_many + modify_many (missing ids skipped)",
+      len(changed) == 3 and sql.get("Amenity", bulk[0].id).name == "Bulk 0!")
+sql.close()
+
+reopened = SQLiteRepository(db_path, models)
+check("SQLite data survives a reopen",
+      reopened.get("Place", place_a.id).title == "Flat A+")
+check("SQLite get_all after reopen", len(reopened.get_all("User")) == 1)
+reopened.close()
+
+# --- two processes sharing one SQLite file ----------------------------------
+class SharedConfig(Config):
+    REPOSITORY = "sqlite"
+    SQLITE_PATH = os.path.join(tmp_dir, "shared.db")
+
+
+# Two facades = two "workers", each with its own connections and cache
+worker1, worker2 = HBnBFacade(SharedConfig), HBnBFacade(SharedConfig)
+host = worker1.create_user({"first_name": "S", "last_name": "H",
+                            "email": "sh@example.com", "password": "x"})
+shared = worker1.create_place({"title": "Shared", "price": 10, "latitude": 0,
+                               "longitude": 0, "owner_id": host.id})
+check("Worker 2 sees worker 1's place",
+      worker2.get_place(shared.id)["title"] == "Shared")
+worker1.update_place(shared.id, {"title": "Shared v2"})
+check("Worker 2's cached place is invalidated by worker 1's update",
+      worker2.get_place(shared.id)["title"] == "Shared v2")
+check("Both workers compute the same place version",
+      worker1.place_version(shared.id) == worker2.place_version(shared.id))
+worker1.create_review({"text": "ok", "rating": 5, "user_id": host.id,
+                       "place_id": shared.id})
+check("Worker 2 sees the new review",
+      len(worker2.get_place(shared.id)["reviews"]) == 1)
+quiet = worker1.create_place({"title": "Quiet", "price": 10, "latitude": 0,
+                              "longitude": 0, "owner_id": host.id})
+worker3 = HBnBFacade(SharedConfig)  # started after every change
+check("A worker started later computes the same versions",
+      worker1.place_version(shared.id) == worker3.place_version(shared.id)
+      and worker1.place_version(quiet.id) == worker3.place_version(quiet.id))
+
+import app.persistence.sqlite_repository as sqlite_module
+sqlite_module._CHANGE_LOG_SIZE = 5  # prune aggressively
+before = worker2.place_version(shared.id)
+for _ in range(1000):
+    worker1.repo.publish("place", "noise")
+worker1.update_place(shared.id, {"title": "Shared v3"})
+check("A worker that fell behind the log starts afresh",
+      worker2.get_place(shared.id)["title"] == "Shared v3"
+      and worker2.place_version(shared.id) != before)
+worker4 = HBnBFacade(SharedConfig)
+check("Workers agree on a place whose changes were pruned from the log",
+      len({w.place_version(quiet.id)
+           for w in (worker1, worker2, worker3, worker4)}) == 1)
+for worker in (worker1, worker2, worker3, worker4):
+    worker.repo.close()
+
+# --- references share one id string per object ------------------------------
+def copy_id(obj_id):
+    """An equal but distinct string, like an id parsed from JSON."""
+    return "".join(list(obj_id))
+
+
+shared = InMemoryRepository()
+shared.add(user)
+shared.add(place_a)
+wifi = Amenity("Wifi")
+shared.add(wifi)
+review = Review("Shared", 5, copy_id(user.id), copy_id(place_a.id))
+shared.add(review)
+check("add() swaps referenced ids for the stored objects' own",
+      review.place_id is place_a.id and review.user_id is user.id)
+shared.update("Place", place_a.id, {"amenity_ids": [copy_id(wifi.id)]})
+check("modify() does the same for a replaced id list",
+      next(iter(place_a.amenity_ids)) is wifi.id)
+orphan = Review("Orphan", 3, user.id, "not-stored")
+shared.add(orphan)
+check("Ids of objects that are not stored are kept",
+      orphan.place_id == "not-stored")
+place_a.amenity_ids = IdSet()  # back to how the later tests expect it
+
+# --- durable in-memory store: write-ahead log + snapshots --------------------
+durable_dir = os.path.join(tmp_dir, "durable")
+dur = DurableRepository(durable_dir, models)
+check("Empty directory loads nothing", dur.loaded == (0, 0))
+dur.add(user)
+dur.add(place_a)
+dur.add(r3)
+dur.update("Place", place_a.id, {"title": "Logged"})
+dur.delete("Review", r3.id)
+dur.close()
+
+dur = DurableRepository(durable_dir, models)
+check("Reopen replays adds, updates and deletes",
+      dur.get("Place", place_a.id).title == "Logged"
+      and dur.get("Review", r3.id) is None and dur.loaded == (0, 5))
+check("Replayed objects keep private fields and indexes",
+      dur.get("User", user.id)._password == "pass"
+      and [p.id for p in dur.find_by("Place", "owner_id", user.id)]
+      == [place_a.id])
+dur.snapshot()
+dur.update("User", user.id, {"first_name": "After"})
+dur.close()
+check("Snapshot drops the old log segments",
+      sorted(os.listdir(durable_dir)) == ["LOCK", "snapshot-00000003.snap",
+                                          "wal-00000003.log"])
+
+# A crash in the middle of a write leaves a torn frame at the end
+wal_path = os.path.join(durable_dir, "wal-00000003.log")
+wal_size = os.path.getsize(wal_path)
+with open(wal_path, "ab") as log:
+    log.write(b"\x40\x00\x00\x00garbage")
+dur = DurableRepository(durable_dir, models)
+check("Reopen loads the snapshot, then the log after it",
+      dur.loaded == (2, 1) and dur.get("User", user.id).first_name == "After")
+check("A torn last frame is ignored and cut off",
+      os.path.getsize(wal_path) == wal_size)
+try:
+    DurableRepository(durable_dir, models)
+    locked = False
+except RuntimeError:
+    locked = True
+check("A directory that is already open cannot be opened again", locked)
+dur.close()
+dur = DurableRepository(durable_dir, models)
+check("close() unlocks the directory", dur.get("User", user.id) is not None)
+dur.close()
+
+# Facade transactions hold model locks: their writes must not wait for
+# the disk until the locks are released
+dur = DurableRepository(os.path.join(tmp_dir, "deferred"), models)
+with dur.transaction("User"):
+    dur.add(User("Tx", "T", "tx@example.com", "pw"))
+    waited_inside = dur._synced == dur._appended
+check("Writes in a transaction wait for the disk once it ends",
+      not waited_inside and dur._synced == dur._appended)
+dur.close()
+
+# A snapshot written while two users swap emails may hold both with the
+# same one; the segment after it finishes the swap
+swap_dir = os.path.join(tmp_dir, "swap")
+dur = DurableRepository(swap_dir, models)
+ann = User("Ann", "A", "ann@example.com", "pw")
+bob = User("Bob", "B", "bob@example.com", "pw")
+dur.add(ann)
+dur.add(bob)
+dur.snapshot()
+caught = [u.to_record() for u in (ann, bob)]
+caught[1]["email"] = "ann@example.com"  # Bob serialized mid-swap
+dur.update("User", ann.id, {"email": "tmp@example.com"})
+dur.update("User", bob.id, {"email": "ann@example.com"})
+dur.update("User", ann.id, {"email": "bob@example.com"})
+dur.close()
+snap_path = [os.path.join(swap_dir, name) for name in os.listdir(swap_dir)
+             if name.startswith("snapshot-")][0]
+with open(snap_path, "wb") as snap:
+    for record in caught:
+        snap.write(_frame(["p", "User", record]))
+dur = DurableRepository(swap_dir, models)
+check("A snapshot caught mid email swap still loads",
+      dur.get("User", ann.id).email == "bob@example.com"
+      and dur.find_unique("User", "email", "ann@example.com").id == bob.id)
+try:
+    dur.add(User("Eve", "E", "BOB@example.com", "pw"))
+    enforced = False
+except DuplicateError:
+    enforced = True
+check("Unique emails are enforced again after the replay", enforced)
+dur.close()
+
+
+class DurableConfig(Config):
+    REPOSITORY = "durable"
+    DURABLE_DIR = os.path.join(tmp_dir, "facade")
+    DURABLE_SNAPSHOT_EVERY = 5
+
+
+f = HBnBFacade(DurableConfig)
+host = f.create_user({"first_name": "D", "last_name": "R",
+                      "email": "dr@example.com", "password": "x"})
+home = f.create_place({"title": "Home", "price": 10, "latitude": 0,
+                       "longitude": 0, "owner_id": host.id})
+for rating in (2, 4):
+    f.create_review({"text": "ok", "rating": rating, "user_id": host.id,
+                     "place_id": home.id})
+f.repo.close()
+f = HBnBFacade(DurableConfig)
+restored = f.get_place(home.id)
+check("Facade state survives a restart (automatic snapshots on)",
+      len(restored["reviews"]) == 2 and restored["average_rating"] == 3.0
+      and f.repo.loaded[0] > 0)
+stored = f.repo.get("Place", home.id)
+check("Reloaded references share the stored id strings",
+      all(f.repo.get("Review", rid).place_id is stored.id
+          and any(rid is r for r in f.repo.get("User", host.id).review_ids)
+          for rid in stored.review_ids)
+      and stored.owner_id is f.repo.get("User", host.id).id)
+f.repo.close()
+
+# --- facade filters: smallest candidate set first ----------------------------
+class MemoryConfig(Config):
+    REPOSITORY = "memory"
+
+
+f = HBnBFacade(MemoryConfig)
+owner = f.create_user({"first_name": "F", "last_name": "G",
+                       "email": "fg@example.com", "password": "x"})
+pool = f.create_amenity({"name": "Pool"})
+wifi = f.create_amenity({"name": "WiFi"})
+for i in range(20):
+    f.create_place({"title": f"P{i}", "price": 10 * i, "latitude": 0,
+                    "longitude": 0, "owner_id": owner.id,
+                    "amenity_ids": [wifi.id] + ([pool.id] if i % 5 == 0
+                                                else [])})
+# --- rating totals consistency check -----------------------------------------
+rated = f.list_places(1)[0][0]
+f.create_review({"text": "ok", "rating": 4, "user_id": owner.id,
+                 "place_id": rated["id"]})
+f.repo.get("Place", rated["id"]).rating_sum = 99  # simulate drift
+problems = f.check_rating_totals()
+check("check_rating_totals reports the drifted place",
+      problems == [("Place", rated["id"], (1, 99), (1, 4))])
+f.check_rating_totals(fix=True)
+check("check_rating_totals(fix=True) repairs it",
+      f.check_rating_totals() == []
+      and f.get_place(rated["id"])["average_rating"] == 4.0)
+
+page1, cursor = f.list_places(2, min_price=0, max_price=150,
+                              amenity_ids=[pool.id, wifi.id])
+check("Rare amenity drives the filter", len(page1) == 2 and cursor)
+page2, cursor = f.list_places(2, cursor, min_price=0, max_price=150,
+                              amenity_ids=[pool.id, wifi.id])
+check("Filtered listing continues from the cursor",
+      {p["title"] for p in page1 + page2} == {"P0", "P5", "P10", "P15"}
+      and cursor is None)
+page, _ = f.list_places(3, amenity_ids=[wifi.id], min_price=100)
+check("Common filter walks places in order",
+      len(page) == 3 and all(p["price"] >= 100 for p in page))
+
+summary()
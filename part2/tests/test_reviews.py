@@ -4,7 +4,8 @@ Run:  python tests/test_reviews.py
 
 Reviews need an existing User and Place, so we create them first.
 """
-from helpers import check, post, get, put, delete, summary
+from helpers import (app, check, post, post_ndjson, get, get_if_none_match,
+                     get_ndjson, get_with_headers, put, delete, summary)
 
 print("\n--- Review Tests ---")
 
@@ -46,6 +47,10 @@ REVIEW_ID = review["id"]
 status, data = get(f"/api/v1/reviews/{REVIEW_ID}")
 check("GET /reviews/<id> returns 200", status == 200)
 check("Text matches", data.get("text") == "Really enjoyed my stay!")
+_, _, headers = get_with_headers(f"/api/v1/reviews/{REVIEW_ID}")
+status, _ = get_if_none_match(f"/api/v1/reviews/{REVIEW_ID}",
+                              headers.get("ETag"))
+check("Unchanged review returns 304", status == 304)
 
 # --- review appears in place's review list -----------------------------------
 status, data = get(f"/api/v1/places/{PLACE_ID}/reviews")
@@ -61,6 +66,58 @@ status, data = put(f"/api/v1/reviews/{REVIEW_ID}", {
 check("PUT /reviews/<id> returns 200", status == 200)
 check("Text was updated", data.get("text") == "Absolutely fantastic!")
 
+# --- rating totals -----------------------------------------------------------
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Place counts its review", data.get("review_count") == 1)
+check("Place average_rating is the review rating",
+      data.get("average_rating") == 5.0)
+
+_, second = post("/api/v1/reviews/", {
+    "text": "Fine",
+    "rating": 2,
+    "user_id": OWNER_ID,
+    "place_id": PLACE_ID,
+})
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Average follows a second review", data.get("average_rating") == 3.5)
+
+put(f"/api/v1/reviews/{second['id']}", {"rating": 4})
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Average follows a rating change", data.get("average_rating") == 4.5)
+
+status, data = get(f"/api/v1/users/{OWNER_ID}")
+check("User totals count the reviews they wrote",
+      data.get("review_count") == 2 and data.get("average_rating") == 4.5)
+
+_, other = post("/api/v1/places/", {
+    "title": "Cabin",
+    "price": 40.0,
+    "latitude": 45.0,
+    "longitude": 6.0,
+    "owner_id": OWNER_ID,
+})
+post("/api/v1/reviews/", {
+    "text": "Cold",
+    "rating": 1,
+    "user_id": OWNER_ID,
+    "place_id": other["id"],
+})
+status, data = get("/api/v1/places/?sort=rating")
+check("GET /places/?sort=rating lists best rated first",
+      [p["id"] for p in data] == [PLACE_ID, other["id"]])
+
+status, _ = get("/api/v1/places/?sort=price")
+check("GET /places/ with an unknown sort returns 400", status == 400)
+
+delete(f"/api/v1/reviews/{second['id']}")
+status, data = get(f"/api/v1/places/{PLACE_ID}")
+check("Average follows a deleted review",
+      data.get("review_count") == 1 and data.get("average_rating") == 5.0)
+
+result = app.test_cli_runner().invoke(args=["check-ratings"])
+check("check-ratings finds nothing wrong",
+      "0 inconsistent object(s) found" in result.output)
+
 # --- validation errors -------------------------------------------------------
 status, _ = post("/api/v1/reviews/", {
     "text": "Meh",
@@ -102,6 +159,20 @@ status, _ = post("/api/v1/reviews/", {
 })
 check("POST with fake place_id returns 400", status == 400)
 
+status, data = post("/api/v1/reviews/", {
+    "text": "Good",
+    "rating": "3",
+    "user_id": OWNER_ID,
+    "place_id": PLACE_ID,
+})
+check("POST with a string rating returns 400 with the field's message",
+      status == 400
+      and data["message"] == "rating must be an integer between 1 and 5")
+
+status, data = post("/api/v1/reviews/", ["not", "an", "object"])
+check("POST with a JSON array body returns 400",
+      status == 400 and data["message"] == "body must be a JSON object")
+
 status, _ = put(f"/api/v1/reviews/{REVIEW_ID}", {"rating": 6})
 check("PUT with rating > 5 returns 400", status == 400)
 
@@ -132,4 +203,58 @@ check("DELETE already-deleted review returns 404", status == 404)
 status, _ = delete("/api/v1/reviews/fake-id-000")
 check("DELETE with fake id returns 404", status == 404)
 
+# --- bulk creation -----------------------------------------------------------
+batch = [{"text": f"Bulk {i}", "rating": rating, "user_id": OWNER_ID,
+          "place_id": PLACE_ID} for i, rating in enumerate((5, 3, 4))]
+status, data = post("/api/v1/reviews/batch", batch)
+check("POST /reviews/batch returns 201", status == 201
+      and len(data["ids"]) == 3)
+_, place = get(f"/api/v1/places/{PLACE_ID}")
+check("Batch reviews are linked to the place, in order",
+      [r["id"] for r in place["reviews"]][-3:] == data["ids"])
+check("Batch reviews update the rating totals",
+      place["review_count"] == 3 and place["average_rating"] == 4.0)
+
+status, data = post_ndjson("/api/v1/reviews/batch?atomic=false", [
+    {"text": "ok", "rating": 2, "user_id": OWNER_ID, "place_id": PLACE_ID},
+    {"text": "ghost", "rating": 2, "user_id": "fake", "place_id": PLACE_ID},
+    {"text": "range", "rating": 9, "user_id": OWNER_ID,
+     "place_id": PLACE_ID},
+    {"text": "schema", "user_id": OWNER_ID, "place_id": PLACE_ID},
+])
+check("Non-atomic review batch reports every failed item",
+      status == 207 and [e["index"] for e in data["errors"]] == [1, 2, 3])
+_, place = get(f"/api/v1/places/{PLACE_ID}")
+check("Only the valid review was added", place["review_count"] == 4)
+
+status, data = post("/api/v1/reviews/batch", [
+    {"text": "ok", "rating": 2, "user_id": OWNER_ID, "place_id": PLACE_ID},
+    "not an object",
+])
+check("A batch item that is not an object is rejected",
+      status == 400 and data["errors"] == [
+          {"index": 1, "message": "item must be a JSON object"}])
+
+# --- ?since= on a place's reviews --------------------------------------------
+_, listing = get(f"/api/v1/places/{PLACE_ID}/reviews")
+since = listing[2]["created_at"]
+status, recent = get(f"/api/v1/places/{PLACE_ID}/reviews?since={since}")
+check("?since= lists the reviews created at that time or later",
+      status == 200 and recent == listing[2:])
+_, an_hour_earlier = get(f"/api/v1/places/{PLACE_ID}/reviews"
+                        f"?since={since}%2B01:00")
+_, an_hour_later = get(f"/api/v1/places/{PLACE_ID}/reviews"
+                       f"?since={since}-01:00")
+check("?since= with an offset is converted to UTC",
+      an_hour_earlier == listing and an_hour_later == [])
+status, _ = get(f"/api/v1/places/{PLACE_ID}/reviews?since=yesterday")
+check("?since= that is not ISO-8601 returns 400", status == 400)
+
+# --- NDJSON export -----------------------------------------------------------
+status, _, exported = get_ndjson("/api/v1/reviews/export")
+_, listing = get(f"/api/v1/places/{PLACE_ID}/reviews")
+check("GET /reviews/export streams every review",
+      status == 200 and len(exported) == len(listing) + 1
+      and all(r in exported for r in listing))
+
 summary()
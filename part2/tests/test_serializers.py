@@ -0,0 +1,90 @@
+"""
+Tests for the precompiled serializers: same output as flask-restx marshal().
+Run:  python tests/test_serializers.py
+"""
+import json
+
+from flask_restx import marshal
+
+from helpers import check, client, post, summary
+from app.api.v1 import serializers
+from app.api.v1.places import place_output_model, place_search_model
+from app.api.v1.users import user_output_model
+
+print("\n--- Serializer Tests ---")
+
+# --- compiled functions match marshal() --------------------------------------
+place = {
+    "id": "p1", "title": "Loft", "description": "", "price": 80,
+    "latitude": "1.5", "longitude": 2.0, "owner_id": "u1",
+    "amenity_ids": ["a1", "a2"],
+    "owner": {"id": "u1", "first_name": "Ann", "last_name": "Lee",
+              "email": "not in the model"},
+    "amenities": [{"id": "a1", "name": "WiFi"}],
+    "reviews": [{"id": "r1", "text": "Nice", "rating": "4"}],
+    "review_count": 1, "average_rating": 4, "created_at": "2024-01-01",
+    "updated_at": "2024-01-02", "rating_sum": 4,
+}
+serialize = serializers.serializer(place_output_model)
+check("Extended place: same dict as marshal()",
+      serialize(place) == marshal(place, place_output_model))
+check("Numbers are converted like marshal() (price -> float)",
+      type(serialize(place)["price"]) is float
+      and serialize(place)["reviews"][0]["rating"] == 4)
+check("Keys outside the model are dropped",
+      "rating_sum" not in serialize(place)
+      and "email" not in serialize(place)["owner"])
+
+sparse = {"id": "p2", "owner": None, "amenity_ids": None}
+check("Missing keys, None nested and None lists match marshal()",
+      serialize(sparse) == marshal(sparse, place_output_model))
+check("Inherited model includes the parent's fields",
+      serializers.serializer(place_search_model)(
+          dict(place, distance_km=1.25))
+      == marshal(dict(place, distance_km=1.25), place_search_model))
+check("keys= outputs only those fields, converted the same way",
+      serializers.serializer(place_output_model, ("id", "price"))(place)
+      == {"id": "p1", "price": 80.0})
+try:
+    serializers.serializer(place_output_model, ("id", "secret"))
+    rejected = False
+except ValueError:
+    rejected = True
+check("keys= rejects fields outside the model", rejected)
+all_keys = tuple(place_output_model)
+for i in range(serializers.PROJECTION_CACHE_SIZE * 2):
+    serializers.serializer(place_output_model,
+                           tuple(k for j, k in enumerate(all_keys)
+                                 if i >> j & 1))
+check("Compiled projections are bounded",
+      serializers._projection.cache_info().currsize
+      <= serializers.PROJECTION_CACHE_SIZE)
+user = {"id": "u1", "first_name": "Ann", "last_name": "Lee",
+        "email": "ann@example.com", "_password": "secret"}
+check("User: password is never output",
+      serializers.serializer(user_output_model)(user)
+      == marshal(user, user_output_model))
+
+# --- encoder -----------------------------------------------------------------
+check("dumps() returns compact JSON bytes",
+      json.loads(serializers.dumps({"a": [1, 2.5, None]}))
+      == {"a": [1, 2.5, None]})
+saved, serializers.orjson = serializers.orjson, None
+check("dumps() falls back to the json module without orjson",
+      serializers.dumps({"a": "é"}) == '{"a":"\\u00e9"}'.encode())
+serializers.orjson = saved
+
+# --- routes and Swagger ------------------------------------------------------
+_, owner = post("/api/v1/users/", {"first_name": "Ann", "last_name": "Lee",
+                                   "email": "ann@example.com",
+                                   "password": "pw"})
+r = client.get(f"/api/v1/users/{owner['id']}")
+check("Serialized route answers JSON with the model's keys",
+      r.mimetype == "application/json"
+      and set(r.get_json()) == set(user_output_model))
+spec = client.get("/api/v1/swagger.json").get_json()
+responses = spec["paths"]["/places/{place_id}"]["get"]["responses"]
+check("Swagger still documents the output model",
+      responses["200"]["schema"]["$ref"] == "#/definitions/PlaceOutput")
+
+summary()
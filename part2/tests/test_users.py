@@ -2,7 +2,8 @@
 Tests for User endpoints.
 Run:  python tests/test_users.py
 """
-from helpers import check, post, get, put, summary
+from helpers import (check, post, get, get_if_none_match, get_ndjson,
+                     get_with_headers, put, summary)
 
 print("\n--- User Tests ---")
 
@@ -26,6 +27,15 @@ status, data = get(f"/api/v1/users/{USER_ID}")
 check("GET /users/<id> returns 200", status == 200)
 check("Returned user has correct email", data.get("email") == "alice@example.com")
 
+# --- conditional GET ---------------------------------------------------------
+_, _, headers = get_with_headers(f"/api/v1/users/{USER_ID}")
+USER_ETAG = headers.get("ETag")
+status, _ = get_if_none_match(f"/api/v1/users/{USER_ID}", USER_ETAG)
+check("Unchanged user returns 304", status == 304)
+put(f"/api/v1/users/{USER_ID}", {"last_name": "Smyth"})
+status, _ = get_if_none_match(f"/api/v1/users/{USER_ID}", USER_ETAG)
+check("Updated user returns 200 again", status == 200)
+
 # --- list all ----------------------------------------------------------------
 status, data = get("/api/v1/users/")
 check("GET /users/ returns 200", status == 200)
@@ -62,6 +72,36 @@ status, _ = post("/api/v1/users/", {
 })
 check("POST with empty password returns 400", status == 400)
 
+# --- unique email ------------------------------------------------------------
+status, data = post("/api/v1/users/", {
+    "first_name": "Alice",
+    "last_name": "Again",
+    "email": "ALICE@example.com",
+    "password": "secret123",
+})
+check("POST with a registered email (other case) returns 400",
+      status == 400 and "email" in data["message"])
+_, other = post("/api/v1/users/", {"first_name": "Olga", "last_name": "Other",
+                                   "email": "olga@example.com",
+                                   "password": "pw"})
+_, before = get(f"/api/v1/users/{other['id']}")
+status, _ = put(f"/api/v1/users/{other['id']}",
+                {"first_name": "Hacked", "last_name": "Name",
+                 "email": "alice@example.com"})
+check("PUT to a registered email returns 400", status == 400)
+_, data = get(f"/api/v1/users/{other['id']}")
+check("Rejected PUT keeps the old email", data["email"] == "olga@example.com")
+check("Rejected PUT changes none of the other fields either", data == before)
+status, _ = put(f"/api/v1/users/{other['id']}", {"email": "Olga@Example.com"})
+check("A user can change the case of their own email", status == 200)
+
+status, data = get("/api/v1/users/?email=Alice@Example.COM")
+check("GET /users/?email= finds the user, case-insensitively",
+      status == 200 and [u["id"] for u in data] == [USER_ID])
+status, data = get("/api/v1/users/?email=nobody@example.com")
+check("GET /users/?email= with an unknown email returns []",
+      status == 200 and data == [])
+
 # --- not found ---------------------------------------------------------------
 status, _ = get("/api/v1/users/fake-id-000")
 check("GET with fake id returns 404", status == 404)
@@ -69,4 +109,36 @@ check("GET with fake id returns 404", status == 404)
 status, _ = put("/api/v1/users/fake-id-000", {"first_name": "Ghost"})
 check("PUT with fake id returns 404", status == 404)
 
+# --- bulk creation -----------------------------------------------------------
+batch = [{"first_name": "Bulk", "last_name": str(i),
+          "email": f"bulk{i}@example.com", "password": "pw"}
+         for i in range(3)]
+status, data = post("/api/v1/users/batch", batch)
+check("POST /users/batch returns 201 and one id per item",
+      status == 201 and len(data["ids"]) == 3 and data["errors"] == [])
+status, user = get(f"/api/v1/users/{data['ids'][2]}")
+check("Batch users are stored in order", user.get("last_name") == "2")
+
+status, data = post("/api/v1/users/batch",
+                    [dict(batch[0], email="bulk-new@example.com"),
+                     {"first_name": "No", "last_name": "Email",
+                      "email": "not-an-email", "password": "pw"}])
+check("Atomic batch with a bad item returns 400 with its index",
+      status == 400 and data["errors"][0]["index"] == 1)
+status, data = post("/api/v1/users/batch?atomic=false",
+                    [dict(batch[0], email="bulk3@example.com"), batch[1],
+                     dict(batch[0], email="BULK3@example.com")])
+check("Batch rejects registered and repeated emails",
+      status == 207 and data["ids"][0] and data["ids"][1:] == [None, None]
+      and [e["message"] for e in data["errors"]]
+      == ["email already in use"] * 2)
+status, data = post("/api/v1/users/batch", {"first_name": "Not a list"})
+check("Batch body that is not an array returns 400", status == 400)
+
+# --- NDJSON export -----------------------------------------------------------
+status, _, exported = get_ndjson("/api/v1/users/export")
+_, listing = get("/api/v1/users/?limit=1000")
+check("GET /users/export streams the same users as the listing",
+      status == 200 and exported == listing)
+
 summary()